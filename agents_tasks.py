@@ -1,202 +1,278 @@
-from crewai import Agent, Task, Crew, Process
-from crewai.tasks import TaskOutput 
-from crewai_tools import WebsiteSearchTool, ScrapeWebsiteTool
-from crewai import LLM
-from custom_tools import fetch_stock_data, fetch_stock_financials, fetch_stock_news
 import os
+from functools import lru_cache
 
-# Initialize tools
-search_tool = WebsiteSearchTool()
-scrape_tool = ScrapeWebsiteTool()
-
-# Create LLM instance with Groq configuration
-llm = LLM(
-    model="groq/llama3-8b-8192",
-    api_key=os.getenv("GROQ_API_KEY"),
-    base_url="https://api.groq.com/openai/v1",
-    temperature=0.1,
-    max_tokens=2048
-)
-
-# Data collection agent - Use custom tools instead of problematic web tools
-data_collector = Agent(
-    role="Stock Data Collector",
-    goal="Efficiently gather stock market data for financial analysis using available data sources.",
-    backstory=("A reliable financial data collector who specializes in extracting comprehensive stock market data from financial APIs and databases."),
-    tools=[],  # Remove problematic web tools, use custom functions
-    verbose=True,
-    max_iter=3,
-    allow_delegation=False,
-    llm=llm,
-)
-
-data_collection_task = Task(
-    description="""
-    Collect comprehensive stock data for {company_stock}. 
-    
-    Your task is to gather the following key financial metrics:
-    - Current stock price information (open, close, high, low)
-    - P/E ratio and EPS
-    - Market capitalization
-    - Revenue and financial ratios
-    - Recent trading volume
-    - Dividend information if available
-    
-    Use the ticker symbol format and provide a structured summary of all collected data.
-    """,
-    expected_output="A comprehensive report containing all relevant financial metrics and stock data for the specified company.",
-    agent=data_collector,
-    async_execution=False,
-)
-
-# News Researcher with better error handling
-news_reader = Agent(
-    role="Financial News Analyst",
-    goal="Analyze and summarize recent financial news and market developments.",
-    backstory=("A financial news analyst who specializes in identifying and summarizing key market developments and news that impact stock performance."),
-    tools=[],  # Remove problematic web tools
-    verbose=True,
-    max_iter=3,
-    allow_delegation=False,
-    llm=llm,
-)
-
-news_reader_task = Task(
-    description="""
-    Research and analyze recent financial news for {company_stock}.
-    
-    Focus on:
-    - Recent earnings reports or announcements
-    - Market developments affecting the company
-    - Industry news and trends
-    - Analyst recommendations or rating changes
-    - Any significant corporate events
-    
-    Provide a structured summary of the most important news items.
-    """,
-    expected_output="A detailed summary of recent financial news and developments related to the company, organized by importance and relevance.",
-    agent=news_reader,
-    async_execution=False,
-)
-
-# Stock Market Researcher with simplified approach
-stock_market_researcher = Agent(
-    role="Market Research Analyst",
-    goal="Provide comprehensive market analysis and industry insights.",
-    backstory=("An experienced market analyst who provides detailed analysis of market conditions, industry trends, and competitive positioning."),
-    tools=[],  # Remove problematic web tools
-    verbose=True,
-    max_iter=3,
-    allow_delegation=False,
-    max_execution_time=120,
-    max_retry_limit=2,
-    llm=llm,
-)
-
-stock_market_research_task = Task( 
-    description="""
-    Conduct comprehensive market research analysis for {company_stock}.
-    
-    Analyze the following areas:
-    1. Current market trends affecting the company's sector
-    2. Industry position and competitive landscape
-    3. Market conditions and economic factors
-    4. Risk factors and growth opportunities
-    5. Technical analysis indicators if relevant
-    
-    Provide insights based on available market data and general industry knowledge.
-    """,
-    expected_output="A comprehensive market analysis report covering industry trends, competitive position, risks, and opportunities.",
-    agent=stock_market_researcher,
-    async_execution=False,
-)
-
-# Financial Analyst with enhanced reporting
-financial_analyst = Agent(
-    role="Senior Financial Analyst",
-    goal="Create comprehensive financial analysis reports based on collected data and research.",
-    backstory=("A senior financial analyst with expertise in equity research, financial modeling, and investment analysis. Specializes in creating detailed, actionable investment reports."),
-    verbose=True,
-    max_iter=3,
-    allow_delegation=False,
-    llm=llm,
-)
-
-financial_analysis_task = Task(
-    description="""
-    Create a comprehensive stock analysis report for {company_stock} based on all collected data and research.
-    
-    Your report should include:
-    1. Executive Summary
-    2. Company Overview
-    3. Financial Performance Analysis
-    4. Market Position and Competitive Analysis
-    5. Recent News and Developments
-    6. Risk Assessment
-    7. Investment Recommendation
-    8. Conclusion
-    
-    Use all the information gathered from previous tasks to provide a well-structured, professional analysis.
-    """,
-    expected_output="""
-    A comprehensive stock analysis report in the following format:
-    
-    # Stock Analysis Report: [Company Name]
-    
-    ## Executive Summary
-    [Brief overview of key findings and recommendation]
-    
-    ## Company Overview
-    [Basic company information and business description]
-    
-    ## Financial Performance Analysis
-    [Analysis of financial metrics, ratios, and performance]
-    
-    ## Market Position and Industry Analysis
-    [Competitive position and market conditions]
-    
-    ## Recent News and Developments
-    [Summary of relevant news and events]
-    
-    ## Risk Assessment
-    [Key risks and challenges]
-    
-    ## Investment Recommendation
-    [Clear recommendation with rationale]
-    
-    ## Conclusion
-    [Final summary and key takeaways]
-    """,
-    agent=financial_analyst,
-    output_file="stock_report.txt",
-    async_execution=False,
-    context=[data_collection_task, news_reader_task, stock_market_research_task],
-)
-
-# Manager agent with improved configuration
-manager = Agent(
-    role="Senior Portfolio Manager",
-    goal="Oversee the entire stock analysis process and ensure high-quality, comprehensive research output.",
-    backstory=(
-        "A senior portfolio manager with over 15 years of experience in equity research and investment analysis. "
-        "Expert in coordinating research teams and ensuring thorough, accurate financial analysis. "
-        "Responsible for maintaining research quality standards and delivering actionable investment insights."
-    ),
-    allow_delegation=True,
-    verbose=True,
-    max_iter=5,
-    llm=llm,
-)
-
-# Create crew with sequential process for better error handling
-crew = Crew(
-    agents=[data_collector, news_reader, stock_market_researcher, financial_analyst],
-    tasks=[data_collection_task, news_reader_task, stock_market_research_task, financial_analysis_task],
-    process=Process.sequential,  # Changed from hierarchical to sequential for better stability
-    manager_agent=manager,
-    full_output=True,
-    verbose=True, 
-    memory=False,  # Disable memory to avoid chromadb issues
-    planning=False,  # Keep planning disabled
-    max_rpm=10,  # Add rate limiting
-)
\ No newline at end of file
+# crewai, the web tools and the LLM wrapper are imported inside the factories
+# below: they pull in litellm and pydantic models, and importing this module
+# should stay cheap for every Streamlit script run.
+
+# Run the three independent research tasks concurrently. The analyst task is
+# synchronous, so the crew waits for all of them before synthesis. LLM calls
+# from every branch, crew and process are paced by the shared rate scheduler.
+PARALLEL_RESEARCH = os.getenv("PARALLEL_RESEARCH", "true").lower() in ("1", "true", "yes")
+
+# Stream LLM output so the UI can show each agent's answer while it is generated
+STREAM_LLM_TOKENS = os.getenv("STREAM_LLM_TOKENS", "true").lower() in ("1", "true", "yes")
+
+# Give the market researcher the cached web tools (see web_cache)
+WEB_RESEARCH = os.getenv("WEB_RESEARCH", "true").lower() in ("1", "true", "yes")
+
+
+_WEB_RESEARCH_HINT = """
+        You may read or search one or two pages such as https://finance.yahoo.com/quote/{company_stock}/profile
+        with your web tools when the data above leaves a question open.
+        """
+
+
+@lru_cache(maxsize=None)
+def get_tools() -> dict:
+    """Build the web tools on first use; pages and embeddings come from the local web cache."""
+    from web_tools import CachedScrapeWebsiteTool, CachedWebsiteSearchTool
+
+    return {
+        "search_tool": CachedWebsiteSearchTool(),
+        "scrape_tool": CachedScrapeWebsiteTool(),
+    }
+
+
+@lru_cache(maxsize=None)
+def get_llm():
+    """Create the shared Groq LLM (responses cached locally when LLM_CACHE is set)."""
+    from llm_cache import CachedLLM
+
+    return CachedLLM(
+        model="groq/llama3-8b-8192",
+        api_key=os.getenv("GROQ_API_KEY"),
+        base_url="https://api.groq.com/openai/v1",
+        temperature=0.1,
+        max_tokens=2048,
+        stream=STREAM_LLM_TOKENS,
+    )
+
+
+def build_crew(llm=None):
+    """Build the agents, tasks and crew for one stock analysis report."""
+    from crewai import Agent, Task, Crew, Process
+    from llm_cache import CachedLLM
+    from rate_limiter import LLM_RATE_LIMIT
+
+    llm = llm or get_llm()
+    # Only CachedLLM goes through the shared scheduler
+    paced = LLM_RATE_LIMIT and isinstance(llm, CachedLLM)
+
+    # Data collection agent - formats data prefetched by custom_tools before kickoff
+    data_collector = Agent(
+        role="Stock Data Collector",
+        goal="Efficiently gather stock market data for financial analysis using available data sources.",
+        backstory=("A reliable financial data collector who specializes in extracting comprehensive stock market data from financial APIs and databases."),
+        tools=[],  # Data is prefetched and injected into the task description
+        verbose=True,
+        max_iter=1,  # A single formatting pass over the prefetched data
+        allow_delegation=False,
+        llm=llm,
+    )
+
+    data_collection_task = Task(
+        description="""
+        Organize the stock data for {company_stock} that was fetched from Yahoo Finance below.
+    
+        Stock data:
+        {stock_data}
+    
+        Financial statements:
+        {financials}
+    
+        Present the following key financial metrics:
+        - Current stock price information (open, close, high, low)
+        - P/E ratio and EPS
+        - Market capitalization
+        - Revenue and financial ratios
+        - Recent trading volume
+        - Dividend information if available
+    
+        Use only the figures given above; mark anything missing as not available instead of estimating it.
+        Provide a structured summary of all collected data in under 250 words.
+        """,
+        expected_output="A comprehensive report containing all relevant financial metrics and stock data for the specified company.",
+        agent=data_collector,
+        async_execution=PARALLEL_RESEARCH,
+    )
+
+    # News Researcher with better error handling
+    news_reader = Agent(
+        role="Financial News Analyst",
+        goal="Analyze and summarize recent financial news and market developments.",
+        backstory=("A financial news analyst who specializes in identifying and summarizing key market developments and news that impact stock performance."),
+        tools=[],  # News is prefetched and injected into the task description
+        verbose=True,
+        max_iter=1,  # A single summarization pass over the prefetched news
+        allow_delegation=False,
+        llm=llm,
+    )
+
+    news_reader_task = Task(
+        description="""
+        Analyze the recent financial news for {company_stock} fetched from Yahoo Finance below.
+    
+        {news}
+    
+        Focus on:
+        - Recent earnings reports or announcements
+        - Market developments affecting the company
+        - Industry news and trends
+        - Analyst recommendations or rating changes
+        - Any significant corporate events
+    
+        Only summarize the news items listed above.
+        Provide a structured summary of the most important news items in under 250 words.
+        """,
+        expected_output="A detailed summary of recent financial news and developments related to the company, organized by importance and relevance.",
+        agent=news_reader,
+        async_execution=PARALLEL_RESEARCH,
+    )
+
+    # Stock Market Researcher with simplified approach
+    stock_market_researcher = Agent(
+        role="Market Research Analyst",
+        goal="Provide comprehensive market analysis and industry insights.",
+        backstory=("An experienced market analyst who provides detailed analysis of market conditions, industry trends, and competitive positioning."),
+        tools=list(get_tools().values()) if WEB_RESEARCH else [],
+        verbose=True,
+        max_iter=3,
+        allow_delegation=False,
+        max_execution_time=120,
+        max_retry_limit=2,
+        llm=llm,
+    )
+
+    stock_market_research_task = Task( 
+        description="""
+        Conduct comprehensive market research analysis for {company_stock}.
+    
+        Analyze the following areas:
+        1. Current market trends affecting the company's sector
+        2. Industry position and competitive landscape
+        3. Market conditions and economic factors
+        4. Risk factors and growth opportunities
+        5. Technical analysis indicators if relevant
+    
+        Technical indicators computed from the daily price history:
+        {technicals}
+    
+        Provide insights based on available market data and general industry knowledge, in under 300 words.
+        """ + (_WEB_RESEARCH_HINT if WEB_RESEARCH else ""),
+        expected_output="A comprehensive market analysis report covering industry trends, competitive position, risks, and opportunities.",
+        agent=stock_market_researcher,
+        async_execution=PARALLEL_RESEARCH,
+    )
+
+    # Financial Analyst with enhanced reporting
+    financial_analyst = Agent(
+        role="Senior Financial Analyst",
+        goal="Create comprehensive financial analysis reports based on collected data and research.",
+        backstory=("A senior financial analyst with expertise in equity research, financial modeling, and investment analysis. Specializes in creating detailed, actionable investment reports."),
+        verbose=True,
+        max_iter=3,
+        allow_delegation=False,
+        llm=llm,
+    )
+
+    financial_analysis_task = Task(
+        description="""
+        Create a comprehensive stock analysis report for {company_stock} based on all collected data and research.
+    
+        Your report should include:
+        1. Executive Summary
+        2. Company Overview
+        3. Financial Performance Analysis
+        4. Market Position and Competitive Analysis
+        5. Recent News and Developments
+        6. Risk Assessment
+        7. Investment Recommendation
+        8. Conclusion
+    
+        Use all the information gathered from previous tasks to provide a well-structured, professional analysis.
+        """,
+        expected_output="""
+        A comprehensive stock analysis report in the following format:
+    
+        # Stock Analysis Report: [Company Name]
+    
+        ## Executive Summary
+        [Brief overview of key findings and recommendation]
+    
+        ## Company Overview
+        [Basic company information and business description]
+    
+        ## Financial Performance Analysis
+        [Analysis of financial metrics, ratios, and performance]
+    
+        ## Market Position and Industry Analysis
+        [Competitive position and market conditions]
+    
+        ## Recent News and Developments
+        [Summary of relevant news and events]
+    
+        ## Risk Assessment
+        [Key risks and challenges]
+    
+        ## Investment Recommendation
+        [Clear recommendation with rationale]
+    
+        ## Conclusion
+        [Final summary and key takeaways]
+        """,
+        agent=financial_analyst,
+        async_execution=False,
+        context=[data_collection_task, news_reader_task, stock_market_research_task],
+    )
+
+    # Manager agent with improved configuration
+    manager = Agent(
+        role="Senior Portfolio Manager",
+        goal="Oversee the entire stock analysis process and ensure high-quality, comprehensive research output.",
+        backstory=(
+            "A senior portfolio manager with over 15 years of experience in equity research and investment analysis. "
+            "Expert in coordinating research teams and ensuring thorough, accurate financial analysis. "
+            "Responsible for maintaining research quality standards and delivering actionable investment insights."
+        ),
+        allow_delegation=True,
+        verbose=True,
+        max_iter=5,
+        llm=llm,
+    )
+
+    # Create crew with sequential process for better error handling
+    return Crew(
+        agents=[data_collector, news_reader, stock_market_researcher, financial_analyst],
+        tasks=[data_collection_task, news_reader_task, stock_market_research_task, financial_analysis_task],
+        process=Process.sequential,  # Changed from hierarchical to sequential for better stability
+        manager_agent=manager,
+        full_output=True,
+        verbose=True, 
+        memory=False,  # Disable memory to avoid chromadb issues
+        planning=False,  # Keep planning disabled
+        # The shared scheduler in rate_limiter paces requests and tokens across
+        # crews; the per-crew limit is the fallback whenever calls bypass it
+        max_rpm=None if paced else 10,
+    )
+
+
+@lru_cache(maxsize=None)
+def get_crew():
+    """Return the process-wide crew, building it on first use.
+
+    The result is memoized for the life of the process, so every Streamlit
+    session and rerun shares one crew; runs kick off copies of it.
+    """
+    return build_crew()
+
+
+def __getattr__(name):
+    # Keep `from agents_tasks import crew` (and the tools and llm) working lazily
+    if name == "crew":
+        return get_crew()
+    if name == "llm":
+        return get_llm()
+    if name in ("search_tool", "scrape_tool"):
+        return get_tools()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
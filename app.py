@@ -1,7 +1,6 @@
 import os
+import time
 import streamlit as st
-import markdown
-import pdfkit
 
 # Import config first to set environment variables
 from config import initialize_app
@@ -9,9 +8,12 @@ from config import initialize_app
 # Initialize the app configuration
 initialize_app()
 
-# Now import the crew after config is set
-from agents_tasks import crew
-from custom_tools import send_report
+# Now import the report service after config is set
+from report_service import ReportResult, get_report_service
+from email_queue import get_email_queue
+from report_render import RenderedReport, content_digest, render_report
+from ticker_index import get_ticker_index, is_explicit_symbol
+from artifact_store import get_artifact_store
 
 st.title("Stock Analysis Report Generator")
 
@@ -22,33 +24,133 @@ if 'report_generated' not in st.session_state:
 if 'crew_output' not in st.session_state:
     st.session_state['crew_output'] = None
 
+if 'report_result' not in st.session_state:
+    st.session_state['report_result'] = None
+
+# Earlier reports are kept per run in the artifact store and can be reopened without regenerating them
+with st.sidebar:
+    st.markdown("### Past Reports")
+    past_reports = get_artifact_store().list(limit=20)
+    if past_reports:
+        past = st.selectbox(
+            "Stored reports",
+            past_reports,
+            format_func=lambda a: f"{a.ticker} · {time.strftime('%Y-%m-%d %H:%M', time.localtime(a.created_at))}",
+        )
+        if st.button("Open Report"):
+            stored = get_artifact_store().load(past.run_id)
+            if stored is not None:
+                st.session_state['report_result'] = ReportResult(past.ticker, stored, past.created_at, past.run_id)
+                st.session_state['crew_output'] = stored
+                st.session_state['report_generated'] = True
+            else:
+                st.error("That report is no longer stored.")
+    else:
+        st.caption("No stored reports yet.")
+
 # Input field to enter the company name
 company_name = st.text_input("Enter Company Name or Stock Ticker", "")
 
+# Resolve the input against the local listing index as it is typed; no network or LLM involved
+if company_name.strip():
+    ticker_index = get_ticker_index()
+    resolution = ticker_index.resolve(company_name)
+    if resolution is not None:
+        st.caption(f"Resolved to {resolution.label()}")
+    else:
+        suggestions = ticker_index.suggest(company_name)
+        # Unlisted input is only sent as typed when it reads as a ticker and the user confirms it
+        as_entered = company_name.strip().lstrip("$").upper()
+        if is_explicit_symbol(company_name):
+            options = [None] + suggestions
+        else:
+            options = suggestions + ([None] if is_explicit_symbol("$" + as_entered) else [])
+        if options:
+            choice = st.selectbox(
+                "Did you mean",
+                options,
+                format_func=lambda s: f"Use ticker \"{as_entered}\" as entered" if s is None else s.label(),
+            )
+            company_name = choice.symbol if choice is not None else "$" + as_entered
+
+# Seconds between progress refreshes while a report is running
+REPORT_POLL_SECONDS = float(os.getenv("REPORT_POLL_SECONDS", "0.5"))
+
+
+@st.fragment(run_every=REPORT_POLL_SECONDS)
+def report_progress():
+    """Show this session's running report as it arrives, without blocking the script.
+
+    The crew runs on the report service's worker thread. This fragment reruns
+    on a timer, folds the events published since its last run into one
+    section per agent (in arrival order) and, once the job is done, stores the
+    result and reruns the whole app to show the report.
+    """
+    job = st.session_state['report_job']
+    progress = st.session_state['report_progress']
+    events = job.events_since(progress['index'])
+    progress['index'] += len(events)
+    for event in events:
+        if event.kind == "prefetch":
+            progress['market_data'] = event.data.get("stock_data", "")
+        elif event.kind == "token":
+            progress['sections'][event.section] = progress['sections'].get(event.section, "") + event.text
+        elif event.kind == "task":
+            progress['sections'][event.section] = event.text
+
+    if job.done:
+        del st.session_state['report_job']
+        try:
+            result = job.result()
+            crew_output = result.crew_output
+            st.session_state['crew_output'] = crew_output
+            st.session_state['report_result'] = result
+
+            # Crew output logs
+            print(f"\nRaw Output:\n {crew_output.raw}")
+            print(f"\nTasks Output:\n {crew_output.tasks_output}")
+            print(f"\nToken Usage:\n {crew_output.token_usage}")
+
+            st.session_state['report_notice'] = ("success", f"Report for {job.ticker} generated successfully!")
+            st.session_state['report_generated'] = True
+        except Exception as e:
+            st.session_state['report_notice'] = ("error", f"An error occurred while generating the report: {str(e)}")
+            print(f"Error details: {e}")
+            st.session_state['report_generated'] = False
+        st.rerun()
+
+    with st.status(f"Generating stock analysis report for {job.ticker}...", expanded=True):
+        if progress['market_data']:
+            with st.expander("Market data", expanded=False):
+                st.text(progress['market_data'])
+        for name, text in progress['sections'].items():
+            st.markdown(f"#### {name}")
+            st.markdown(text)
+
 # Button to generate the stock analysis report
-if st.button("Generate Report"):
+if st.button("Generate Report", disabled=st.session_state.get('report_job') is not None):
     if company_name != "":
-        with st.spinner("Generating stock analysis report..."):
-            try:
-                crew_output = crew.kickoff(inputs={"company_stock": company_name})
-                st.session_state['crew_output'] = crew_output
-                
-                # Crew output logs 
-                print(f"\nRaw Output:\n {crew_output.raw}")
-                print(f"\nTasks Output:\n {crew_output.tasks_output}")
-                print(f"\nToken Usage:\n {crew_output.token_usage}")
-                
-                st.success(f"Report for {company_name} generated successfully!")
-                st.session_state['report_generated'] = True
-                
-            except Exception as e:
-                st.error(f"An error occurred while generating the report: {str(e)}")
-                print(f"Error details: {e}")
-                st.session_state['report_generated'] = False
+        try:
+            # Shared across sessions: identical tickers join one crew run or reuse a fresh report
+            st.session_state['report_job'] = get_report_service().start(company_name)
+            st.session_state['report_progress'] = {'index': 0, 'sections': {}, 'market_data': None}
+        except Exception as e:
+            st.error(f"An error occurred while generating the report: {str(e)}")
+            print(f"Error details: {e}")
+            st.session_state['report_generated'] = False
     else:
         st.error("Please enter a valid company name or stock ticker.")
         st.session_state['report_generated'] = False  
 
+# Progress of this session's running report; the fragment stops once the job is done
+if st.session_state.get('report_job') is not None:
+    report_progress()
+
+notice = st.session_state.pop('report_notice', None)
+if notice is not None:
+    kind, message = notice
+    (st.success if kind == "success" else st.error)(message)
+
 # Check if the report has been generated 
 if st.session_state['report_generated'] and st.session_state['crew_output']:
     crew_output = st.session_state['crew_output']
@@ -59,24 +161,51 @@ if st.session_state['report_generated'] and st.session_state['crew_output']:
 
     # Save and convert report to different formats
     try:
-        # Save stock analysis report 
-        with open("stock_report.txt", "r", encoding='utf-8') as file:
-            markdown_text = file.read()
+        # Use this session's report rather than the shared output file
+        markdown_text = crew_output.raw
 
-        # Convert to HTML
-        html = markdown.markdown(markdown_text)
-        with open("stock_report.html", "w", encoding='utf-8') as file:
-            file.write(html)
+        report_result = st.session_state['report_result']
+        run_id = report_result.run_id if report_result is not None else None
+        artifact = get_artifact_store().get(run_id) if run_id else None
+        stored_files = artifact.files if artifact is not None else []
 
-        # Convert HTML to PDF report (only if wkhtmltopdf is available)
-        try:
-            config = pdfkit.configuration(wkhtmltopdf=r"C:\Program Files\wkhtmltopdf\bin\wkhtmltopdf.exe")
-            pdfkit.from_file("stock_report.html", "stock_report.pdf", configuration=config)
-            pdf_available = True
-        except Exception as pdf_error:
+        # A reopened report serves the HTML and PDF stored with its run; otherwise
+        # convert once per report content and let reruns reuse the cached bytes
+        rendered = None
+        if "report.html" in stored_files and "report.pdf" in stored_files:
+            stored_html = get_artifact_store().read(run_id, "report.html")
+            stored_pdf = get_artifact_store().read(run_id, "report.pdf")
+            if stored_html is not None and stored_pdf is not None:
+                rendered = RenderedReport(content_digest(markdown_text), stored_html, stored_pdf)
+        if rendered is None:
+            rendered = render_report(markdown_text)
+        pdf_available = rendered.pdf is not None
+        if not pdf_available:
             st.warning("PDF generation failed. Please ensure wkhtmltopdf is installed.")
-            print(f"PDF generation error: {pdf_error}")
-            pdf_available = False
+
+        # Keep each rendered file with this run's stored report, including a PDF that only succeeds on a later rerun
+        file_stem = "stock_report"
+        if run_id:
+            file_stem = f"{report_result.ticker}_{run_id}"
+            missing = {}
+            if "report.html" not in stored_files:
+                missing["report.html"] = rendered.html_bytes
+            if "report.pdf" not in stored_files and pdf_available:
+                missing["report.pdf"] = rendered.pdf
+            if artifact is not None and missing:
+                try:
+                    get_artifact_store().add_files(run_id, missing)
+                except (KeyError, OSError) as store_error:
+                    # Retention may prune the run between the lookup and the write
+                    print(f"Could not store rendered files for report {run_id}: {store_error}")
+
+        # Download the rendered report
+        col_pdf, col_html = st.columns(2)
+        with col_pdf:
+            if pdf_available:
+                st.download_button("Download PDF", rendered.pdf, file_name=f"{file_stem}.pdf", mime="application/pdf")
+        with col_html:
+            st.download_button("Download HTML", rendered.html_bytes, file_name=f"{file_stem}.html", mime="text/html")
 
         # Display chain of thought reasoning and API call metrics 
         with st.expander("Show Chain of Thought"):
@@ -89,7 +218,7 @@ if st.session_state['report_generated'] and st.session_state['crew_output']:
 
         # Send report by email
         st.markdown("## Send Report via Email")
-        email_address = st.text_input("Enter your email", "")
+        email_address = st.text_input("Enter email addresses (comma-separated)", "")
         if st.button("Send Email"):
             if email_address and pdf_available:
                 try:
@@ -101,10 +230,14 @@ if st.session_state['report_generated'] and st.session_state['crew_output']:
                     else:
                         subject = f"Stock Analysis Report: {company_name}"  
                         body = "Please find the attached stock analysis report." 
-                        file_name = "stock_report.pdf"
+                        file_name = f"{file_stem}.pdf"
 
-                        send_report(sender_email, email_address, password, subject, body, file_name)
-                        st.success(f"Email sent successfully to {email_address}!")
+                        # Delivered in the background over pooled SMTP connections
+                        st.session_state['email_job'] = get_email_queue(sender_email, password).submit(
+                            email_address, subject, body, file_name,
+                            attachment=rendered.pdf, attachment_key=rendered.digest,
+                        )
+                        st.info(f"Report queued for delivery to {email_address}.")
                         
                 except Exception as email_error:
                     st.error(f"Failed to send email: {str(email_error)}")
@@ -112,6 +245,21 @@ if st.session_state['report_generated'] and st.session_state['crew_output']:
                 st.error("Cannot send email: PDF generation failed.")
             else:
                 st.error("Please enter a valid email address.")
+
+        # Report the outcome of the last queued delivery once it has finished
+        email_job = st.session_state.get('email_job')
+        if email_job is not None and email_job.done():
+            del st.session_state['email_job']
+            try:
+                result = email_job.result()
+                if result.delivered:
+                    st.success(f"Email sent successfully to {', '.join(result.delivered)}!")
+                if result.refused:
+                    st.warning(f"Email refused for {', '.join(result.refused)}.")
+            except Exception as email_error:
+                st.error(f"Failed to send email: {str(email_error)}")
+        elif email_job is not None:
+            st.info("Email delivery in progress...")
                 
     except Exception as file_error:
         st.error(f"Error processing report files: {str(file_error)}")
\ No newline at end of file
@@ -0,0 +1,225 @@
+"""Per-run report artifacts on disk, indexed in SQLite.
+
+Every report run gets its own directory, ARTIFACT_DIR/<TICKER>/<run id>/,
+holding report.md, meta.json (tasks and token usage) and, once the app has
+rendered it, report.html and report.pdf. A run directory is written under a
+temporary name and renamed into place, and later files are replaced
+atomically, so readers never see a half-written report and concurrent runs
+never share a file. ARTIFACT_DIR/index.sqlite3 lists the runs by ticker and
+date; the oldest runs beyond the retention limits are deleted after each save.
+"""
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+
+ARTIFACT_DIR = os.getenv("ARTIFACT_DIR", "reports")
+# Runs kept per ticker, runs kept in total and the age after which any run is deleted
+ARTIFACT_MAX_PER_TICKER = int(os.getenv("ARTIFACT_MAX_PER_TICKER", "20"))
+ARTIFACT_MAX_REPORTS = int(os.getenv("ARTIFACT_MAX_REPORTS", "1000"))
+ARTIFACT_MAX_AGE_DAYS = float(os.getenv("ARTIFACT_MAX_AGE_DAYS", "90"))
+
+REPORT_FILE = "report.md"
+META_FILE = "meta.json"
+
+
+def new_run_id() -> str:
+    """Sortable run id: UTC timestamp plus a random suffix."""
+    return time.strftime("%Y%m%dT%H%M%SZ", time.gmtime()) + "-" + uuid.uuid4().hex[:8]
+
+
+def _write_atomic(path: str, content):
+    tmp_path = f"{path}.{uuid.uuid4().hex[:6]}.tmp"
+    mode, encoding = ("wb", None) if isinstance(content, bytes) else ("w", "utf-8")
+    with open(tmp_path, mode, encoding=encoding) as file:
+        file.write(content)
+    os.replace(tmp_path, path)
+
+
+class Artifact:
+    """Index entry for one stored report run."""
+
+    def __init__(self, run_id: str, ticker: str, created_at: float, path: str, files: list):
+        self.run_id = run_id
+        self.ticker = ticker
+        self.created_at = created_at
+        self.path = path
+        self.files = files
+
+    def file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def age(self) -> float:
+        return time.time() - self.created_at
+
+    def to_dict(self) -> dict:
+        return {"run_id": self.run_id, "ticker": self.ticker, "created_at": self.created_at, "files": self.files}
+
+
+class StoredReport:
+    """A report loaded back from the store, with the CrewOutput attributes the UI reads."""
+
+    def __init__(self, raw: str, meta: dict):
+        self.raw = raw
+        self.tasks_output = meta.get("tasks", [])
+        self.token_usage = meta.get("token_usage")
+
+
+class ArtifactStore:
+    """Directory-per-run report store with a SQLite index and retention limits."""
+
+    def __init__(self, root: str = ARTIFACT_DIR, max_per_ticker: int = ARTIFACT_MAX_PER_TICKER,
+                 max_reports: int = ARTIFACT_MAX_REPORTS, max_age_days: float = ARTIFACT_MAX_AGE_DAYS):
+        self.root = root
+        self.max_per_ticker = max_per_ticker
+        self.max_reports = max_reports
+        self.max_age = max_age_days * 86400
+        self._lock = threading.Lock()
+
+        os.makedirs(root, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(root, "index.sqlite3"), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS reports (
+                run_id TEXT PRIMARY KEY,
+                ticker TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                path TEXT NOT NULL,
+                files TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_reports_ticker ON reports(ticker, created_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_reports_created ON reports(created_at)")
+        self._conn.commit()
+
+    def save(self, run_id: str, ticker: str, markdown_text: str, meta: dict = None,
+             created_at: float = None) -> Artifact:
+        """Store a finished report under its own directory and index it."""
+        ticker = ticker.upper()
+        created_at = created_at or time.time()
+        path = os.path.join(self.root, ticker, run_id)
+        tmp_path = os.path.join(self.root, ticker, f".{run_id}.tmp")
+        os.makedirs(tmp_path)
+        meta = dict(meta or {}, run_id=run_id, ticker=ticker, created_at=created_at)
+        with open(os.path.join(tmp_path, REPORT_FILE), "w", encoding="utf-8") as file:
+            file.write(markdown_text)
+        with open(os.path.join(tmp_path, META_FILE), "w", encoding="utf-8") as file:
+            json.dump(meta, file, indent=2, default=str)
+        os.replace(tmp_path, path)
+
+        files = [REPORT_FILE, META_FILE]
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO reports (run_id, ticker, created_at, path, files) VALUES (?, ?, ?, ?, ?)",
+                (run_id, ticker, created_at, path, json.dumps(files)),
+            )
+            expired = self._prune()
+            self._conn.commit()
+        for old_path in expired:
+            shutil.rmtree(old_path, ignore_errors=True)
+            try:
+                os.rmdir(os.path.dirname(old_path))
+            except OSError:
+                pass  # The ticker still has other runs
+        return Artifact(run_id, ticker, created_at, path, files)
+
+    def add_files(self, run_id: str, files: dict):
+        """Add or replace files ({name: bytes or str}) in a stored run, e.g. its rendered HTML and PDF."""
+        artifact = self.get(run_id)
+        if artifact is None:
+            raise KeyError(f"Unknown report run {run_id}")
+        for name, content in files.items():
+            if os.path.basename(name) != name:
+                raise ValueError(f"Invalid artifact name {name!r}")
+            _write_atomic(artifact.file(name), content)
+        names = list(dict.fromkeys(artifact.files + list(files)))
+        with self._lock:
+            self._conn.execute("UPDATE reports SET files = ? WHERE run_id = ?", (json.dumps(names), run_id))
+            self._conn.commit()
+
+    def get(self, run_id: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT run_id, ticker, created_at, path, files FROM reports WHERE run_id = ?", (run_id,)
+            ).fetchone()
+        return self._artifact(row)
+
+    def latest(self, ticker: str):
+        """Return the newest stored run for ticker, or None."""
+        found = self.list(ticker, limit=1)
+        return found[0] if found else None
+
+    def list(self, ticker: str = None, since: float = None, until: float = None, limit: int = 50) -> list:
+        """Stored runs, newest first, optionally for one ticker and a created_at range."""
+        clauses, params = [], []
+        for clause, value in (("ticker = ?", ticker.upper() if ticker else None),
+                              ("created_at >= ?", since), ("created_at < ?", until)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT run_id, ticker, created_at, path, files FROM reports {where} "
+                f"ORDER BY created_at DESC LIMIT ?", (*params, limit)
+            ).fetchall()
+        return [self._artifact(row) for row in rows]
+
+    def read(self, run_id: str, name: str = REPORT_FILE):
+        """Return a stored file's content (str for .md/.json/.html, bytes otherwise), or None."""
+        artifact = self.get(run_id)
+        if artifact is None or name not in artifact.files:
+            return None
+        binary = not name.endswith((".md", ".json", ".html"))
+        try:
+            with open(artifact.file(name), "rb" if binary else "r", encoding=None if binary else "utf-8") as file:
+                return file.read()
+        except FileNotFoundError:
+            return None
+
+    def load(self, run_id: str):
+        """Return a StoredReport for a run, or None if it is gone."""
+        markdown_text = self.read(run_id)
+        if markdown_text is None:
+            return None
+        return StoredReport(markdown_text, json.loads(self.read(run_id, META_FILE) or "{}"))
+
+    @staticmethod
+    def _artifact(row):
+        if row is None:
+            return None
+        return Artifact(row[0], row[1], row[2], row[3], json.loads(row[4]))
+
+    def _prune(self) -> list:
+        """Delete index rows beyond the retention limits and return their directories."""
+        rows = self._conn.execute(
+            """
+            SELECT run_id, path FROM (
+                SELECT run_id, path, created_at,
+                       ROW_NUMBER() OVER (PARTITION BY ticker ORDER BY created_at DESC) AS ticker_rank,
+                       ROW_NUMBER() OVER (ORDER BY created_at DESC) AS overall_rank
+                FROM reports
+            )
+            WHERE ticker_rank > ? OR overall_rank > ? OR created_at < ?
+            """,
+            (self.max_per_ticker, self.max_reports, time.time() - self.max_age),
+        ).fetchall()
+        self._conn.executemany("DELETE FROM reports WHERE run_id = ?", [(run_id,) for run_id, _ in rows])
+        return [path for _, path in rows]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_artifact_store() -> ArtifactStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ArtifactStore()
+        return _store
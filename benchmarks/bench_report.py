@@ -0,0 +1,303 @@
+"""Offline end-to-end benchmark of one stock report run.
+
+yfinance is replaced by fixtures (see fixtures.py) and the Groq request by a
+deterministic fake with a fixed latency per call, so the numbers measure this
+code base rather than the network. The fake sits at the provider level
+(llm_cache._provider_call), so every call still goes through the real
+CachedLLM: its response cache (emptied before each run), the rate scheduler
+(with limits too high to throttle) and its spans and token counts:
+
+    python benchmarks/bench_report.py [--ticker AAPL] [--runs 3] [--llm-latency 0.2]
+    python benchmarks/bench_report.py --save-baseline
+    python benchmarks/bench_report.py --compare [--tolerance 0.25]
+    python benchmarks/bench_report.py --record AAPL   # store a real fixture (needs network)
+
+Each run starts with empty market data and LLM caches, prefetches the report inputs,
+kicks off a copy of the full crew and renders the result the way app.py does.
+Reported per run: prefetch and per-fetcher latency, per-task latency, tokens
+per task and for the crew, render time and peak traced memory. --compare
+exits with status 1 when a timing or token count is worse than the baseline
+by more than the tolerance.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline_report.json")
+
+# Everything below must be set before the application modules are imported;
+# all local state goes to a scratch directory, never to the real db/ and reports/
+_WORK_DIR = tempfile.mkdtemp(prefix="bench_report_")
+os.environ.update({
+    "YF_CACHE_PATH": os.path.join(_WORK_DIR, "yf_cache.sqlite3"),
+    "PRICE_STORE_DIR": os.path.join(_WORK_DIR, "prices"),
+    "NEWS_STORE_PATH": os.path.join(_WORK_DIR, "news.sqlite3"),
+    "WEB_CACHE_PATH": os.path.join(_WORK_DIR, "web_cache.sqlite3"),
+    "ARTIFACT_DIR": os.path.join(_WORK_DIR, "reports"),
+    "TRACE_PATH": os.path.join(_WORK_DIR, "traces.jsonl"),
+    "TRACE_PROFILE_DIR": os.path.join(_WORK_DIR, "profiles"),
+    "LLM_CACHE": "true",
+    "LLM_CACHE_PATH": os.path.join(_WORK_DIR, "llm_cache.sqlite3"),
+    "LLM_RATE_LIMIT": "true",
+    "LLM_RATE_DB_PATH": os.path.join(_WORK_DIR, "llm_rate.sqlite3"),
+    "GROQ_RPM": "100000",
+    "GROQ_TPM": "1000000000",
+    "STREAM_LLM_TOKENS": "false",
+    "GROQ_API_KEY": os.environ.get("GROQ_API_KEY", "benchmark"),
+    "LITELLM_LOCAL_MODEL_COST_MAP": "True",
+    "CREWAI_DISABLE_TELEMETRY": "true",
+    "CREWAI_TRACING_ENABLED": "false",
+    "OTEL_SDK_DISABLED": "true",
+})
+sys.path.insert(0, ROOT)
+
+import fixtures  # noqa: E402
+
+# Timings below this many seconds are never reported as regressions
+_NOISE_FLOOR = 0.005
+
+
+def _install_fake_provider(latency: float, completion_tokens: int):
+    """Replace the Groq request under CachedLLM with a deterministic local answer per agent."""
+    import llm_cache
+
+    def fake_provider_call(llm, messages, tools=None, callbacks=None, available_functions=None,
+                           from_task=None, from_agent=None, **kwargs):
+        prompt = messages if isinstance(messages, str) else "\n".join(
+            str(m.get("content", "")) for m in messages)
+        time.sleep(latency)
+
+        role = getattr(from_agent, "role", "Agent")
+        sentence = f"{role} finding based on the supplied figures. "
+        body = (sentence * (completion_tokens * 4 // len(sentence) + 1))[:completion_tokens * 4]
+        answer = f"Thought: I now know the final answer\nFinal Answer: ## {role}\n\n{body}"
+
+        usage = {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(answer) // 4}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        llm._track_token_usage_internal(usage)
+        return answer
+
+    llm_cache._provider_call = fake_provider_call
+
+
+def _timed(fn, timings: dict, name: str):
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            timings[name] = timings.get(name, 0.0) + time.perf_counter() - started
+    return wrapper
+
+
+def run_once(crew, ticker: str, run_index: int) -> dict:
+    """Run prefetch, the crew and rendering once from cold caches; return the metrics."""
+    import custom_tools
+    import llm_cache
+    import market_data
+    import news_store
+    import report_render
+    from price_store import PriceStore
+    from tracing import bind_task, task_tokens as bound_task_tokens, unbind_task
+
+    market_data.clear_cache()
+    news_store.get_news_store().clear()
+    llm_cache.get_response_cache().clear()
+    market_data._price_store = PriceStore(root=os.path.join(_WORK_DIR, f"prices_{run_index}"))
+    report_render._cache.clear()
+
+    tools = {}
+    originals = {}
+    for name in ("fetch_stock_data", "fetch_stock_financials", "fetch_stock_news", "fetch_technical_indicators"):
+        originals[name] = getattr(custom_tools, name)
+        setattr(custom_tools, name, _timed(originals[name], tools, name))
+
+    try:
+        started = time.perf_counter()
+        inputs = custom_tools.prefetch_report_inputs(ticker)
+        prefetch = time.perf_counter() - started
+    finally:
+        for name, fn in originals.items():
+            setattr(custom_tools, name, fn)
+
+    # The same per-run copy ReportService makes; it must keep CachedLLM on every agent
+    run_crew = crew.copy()
+    llms = [agent.llm for agent in run_crew.agents] + [run_crew.manager_agent.llm]
+    if not all(isinstance(llm, llm_cache.CachedLLM) for llm in llms):
+        raise RuntimeError("the crew copy lost CachedLLM; LLM calls would skip the cache and scheduler")
+    # The agents are verbose; keep their transcript out of the benchmark output
+    run_crew.verbose = False
+    for agent in run_crew.agents:
+        agent.verbose = False
+    for task in run_crew.tasks:
+        bind_task(task.id, task=task.agent.role if task.agent else task.name)
+
+    started = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            crew_output = run_crew.kickoff(inputs=inputs)
+        crew_seconds = time.perf_counter() - started
+        tasks, task_tokens = {}, {}
+        for task in run_crew.tasks:
+            name = task.agent.role if task.agent else task.name or str(task.id)
+            tasks[name] = task.execution_duration or 0.0
+            task_tokens[name] = bound_task_tokens(task.id)
+    finally:
+        for task in run_crew.tasks:
+            unbind_task(task.id)
+
+    # Same path app.py takes once the report is done
+    started = time.perf_counter()
+    rendered = report_render.render_report(crew_output.raw)
+    render_cold = time.perf_counter() - started
+    started = time.perf_counter()
+    report_render.render_report(crew_output.raw)
+    render_cached = time.perf_counter() - started
+
+    # llm_total is what CachedLLM counted per task; crew_total is crewai's own
+    # usage tally from the provider responses
+    usage = crew_output.token_usage
+    return {
+        "prefetch_s": prefetch,
+        "tools_s": tools,
+        "crew_s": crew_seconds,
+        "tasks_s": tasks,
+        "render_cold_s": render_cold,
+        "render_cached_s": render_cached,
+        "pdf": rendered.pdf is not None,
+        "total_s": prefetch + crew_seconds + render_cold,
+        "tokens": {
+            "by_task": task_tokens,
+            "llm_total": sum(task_tokens.values()),
+            "crew_total": usage.total_tokens if usage else 0,
+            "crew_requests": usage.successful_requests if usage else 0,
+        },
+    }
+
+
+def _median(runs: list):
+    """Median of every numeric leaf across runs (booleans are taken from the first run)."""
+    first = runs[0]
+    if isinstance(first, dict):
+        return {key: _median([run[key] for run in runs]) for key in first}
+    if isinstance(first, bool) or not isinstance(first, (int, float)):
+        return first
+    if all(isinstance(run, int) for run in runs):
+        return statistics.median_low(runs)
+    return statistics.median(runs)
+
+
+def _flatten(data: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def print_results(result: dict):
+    for name, value in _flatten(result["metrics"]).items():
+        if name.endswith("_s") or "_s." in name:
+            print(f"{name:<56}{value:>12.3f}s")
+        elif isinstance(value, float):
+            print(f"{name:<56}{value:>12.1f}")
+        else:
+            print(f"{name:<56}{value:>12,}")
+    print(f"{'pdf rendered':<56}{str(result['metrics']['pdf']):>12}")
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list:
+    """Print current vs baseline for every metric and return the names that regressed."""
+    current, previous = _flatten(result["metrics"]), _flatten(baseline["metrics"])
+    regressions = []
+    print(f"\n{'metric':<56}{'baseline':>12}{'current':>12}{'change':>9}")
+    for name, value in current.items():
+        if name not in previous:
+            continue
+        before = previous[name]
+        change = (value - before) / before if before else 0.0
+        is_timing = name.endswith("_s") or "_s." in name
+        worse = value > before * (1 + tolerance) and (not is_timing or value - before > _NOISE_FLOOR)
+        flag = "  REGRESSION" if worse else ""
+        print(f"{name:<56}{before:>12.3f}{value:>12.3f}{change:>+9.1%}{flag}")
+        if worse:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ticker", default="AAPL")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="seconds per fake LLM call")
+    parser.add_argument("--completion-tokens", type=int, default=300, help="tokens per fake LLM answer")
+    parser.add_argument("--yf-latency", type=float, default=0.05, help="seconds per fixture request")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before failing")
+    parser.add_argument("--record", metavar="TICKER", help="record a real yfinance fixture and exit")
+    args = parser.parse_args()
+
+    if args.record:
+        print(f"Recorded {fixtures.record_fixture(args.record)}")
+        return 0
+
+    fixtures.install(latency=args.yf_latency)
+    _install_fake_provider(args.llm_latency, args.completion_tokens)
+    from agents_tasks import build_crew, get_llm
+
+    crew = build_crew(llm=get_llm())
+    runs = [run_once(crew, args.ticker, i) for i in range(args.runs)]
+
+    # Memory is traced in a separate run so tracemalloc does not slow the timed ones
+    tracemalloc.start()
+    run_once(crew, args.ticker, args.runs)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    metrics = _median(runs)
+    metrics["peak_traced_mb"] = peak / 2**20
+    result = {
+        "settings": {key: getattr(args, key) for key in
+                     ("ticker", "runs", "llm_latency", "completion_tokens", "yf_latency")},
+        "metrics": metrics,
+    }
+
+    print(f"Median of {args.runs} runs for {args.ticker} "
+          f"(LLM {args.llm_latency}s/call, yfinance {args.yf_latency}s/request)\n")
+    print_results(result)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump(result, file, indent=2, sort_keys=True)
+        print(f"\nBaseline written to {args.baseline}")
+
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f"\nNo baseline at {args.baseline}; run with --save-baseline first")
+            return 1
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+        if baseline.get("settings") != result["settings"]:
+            print(f"\nNote: baseline settings differ: {baseline.get('settings')}")
+        regressions = compare(result, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+"""Import-time benchmark for the crew module.
+
+Each scenario runs in a fresh interpreter so module caches do not carry over:
+
+    python benchmarks/bench_startup.py [--runs 5]
+
+"import" is what every cold start pays now that the crew is built lazily.
+"import + crew" and "import + crew + tools" reproduce what importing the
+module used to cost when agents, crew and web tools were built eagerly.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = {
+    "import": "import agents_tasks",
+    "import + crew": "import agents_tasks; agents_tasks.get_crew()",
+    "import + crew + tools": "import agents_tasks; agents_tasks.get_crew(); agents_tasks.get_tools()",
+}
+
+_TIMER = (
+    "import time; _t = time.perf_counter(); {code}; "
+    "print('elapsed=%f' % (time.perf_counter() - _t), flush=True)"
+)
+
+
+def time_scenario(code: str, runs: int) -> list:
+    env = dict(os.environ)
+    # The LLM only needs a key to be constructed; nothing is sent
+    env.setdefault("GROQ_API_KEY", "benchmark")
+    # Keep litellm from downloading its model cost map during the measurement
+    env.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+    timings = []
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, "-c", _TIMER.format(code=code)],
+            cwd=ROOT,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        elapsed = [line for line in completed.stdout.splitlines() if line.startswith("elapsed=")]
+        if not elapsed:
+            raise RuntimeError((completed.stderr.strip().splitlines() or ["no output"])[-1])
+        timings.append(float(elapsed[-1].split("=", 1)[1]))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per scenario")
+    args = parser.parse_args()
+
+    print(f"{'scenario':<24}{'median (s)':>12}{'min (s)':>10}")
+    for name, code in SCENARIOS.items():
+        try:
+            timings = time_scenario(code, args.runs)
+        except RuntimeError as e:
+            print(f"{name:<24}{'failed':>12}  {e}")
+            continue
+        print(f"{name:<24}{statistics.median(timings):>12.3f}{min(timings):>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
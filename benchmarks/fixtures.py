@@ -0,0 +1,191 @@
+"""Offline stand-ins for yfinance used by the benchmarks.
+
+Recorded fixtures are pickles of one ticker's info, price history, statements
+and news, written by ``record_fixture`` (which needs network access). Tickers
+without a recording get a synthetic fixture generated from a fixed seed, so a
+benchmark run is repeatable on any machine without network access.
+"""
+import hashlib
+import os
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+_STATEMENT_ROWS = {
+    "income_stmt": ["Total Revenue", "Gross Profit", "Operating Income", "Net Income"],
+    "balance_sheet": ["Total Assets", "Total Debt", "Stockholders Equity", "Current Assets",
+                      "Current Liabilities", "Cash And Cash Equivalents"],
+    "cashflow": ["Operating Cash Flow", "Capital Expenditure", "Free Cash Flow",
+                 "Investing Cash Flow", "Financing Cash Flow"],
+}
+
+
+def _seed(ticker: str) -> int:
+    return int.from_bytes(hashlib.sha256(ticker.encode("utf-8")).digest()[:4], "little")
+
+
+def synthetic_fixture(ticker: str, years: int = 6) -> dict:
+    """Generate a deterministic fixture with the same shapes yfinance returns."""
+    rng = np.random.default_rng(_seed(ticker))
+    end = pd.Timestamp.today().normalize()
+    index = pd.bdate_range(end=end, periods=years * 252, tz="America/New_York", name="Date")
+
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, len(index))))
+    spread = np.abs(rng.normal(0, 0.01, len(index))) * close
+    history = pd.DataFrame({
+        "Open": close + rng.normal(0, 0.3, len(index)),
+        "High": close + spread,
+        "Low": close - spread,
+        "Close": close,
+        "Volume": rng.integers(5_000_000, 50_000_000, len(index)).astype(float),
+    }, index=index)
+
+    periods = pd.to_datetime([f"{end.year - i}-09-30" for i in range(1, 5)])
+    revenue = 1e10 * (1 + np.arange(4)[::-1] * 0.08)
+    values = {
+        "Total Revenue": revenue, "Gross Profit": revenue * 0.42, "Operating Income": revenue * 0.28,
+        "Net Income": revenue * 0.21, "Total Assets": revenue * 1.6, "Total Debt": revenue * 0.5,
+        "Stockholders Equity": revenue * 0.7, "Current Assets": revenue * 0.6,
+        "Current Liabilities": revenue * 0.55, "Cash And Cash Equivalents": revenue * 0.2,
+        "Operating Cash Flow": revenue * 0.3, "Capital Expenditure": revenue * -0.05,
+        "Free Cash Flow": revenue * 0.25, "Investing Cash Flow": revenue * -0.1,
+        "Financing Cash Flow": revenue * -0.15,
+    }
+    statements = {
+        name: pd.DataFrame([values[row] for row in rows], index=rows, columns=periods)
+        for name, rows in _STATEMENT_ROWS.items()
+    }
+
+    last = history.iloc[-1]
+    info = {
+        "longName": f"{ticker} Holdings Inc.", "sector": "Technology", "industry": "Consumer Electronics",
+        "currentPrice": round(last["Close"], 2), "previousClose": round(history["Close"].iloc[-2], 2),
+        "open": round(last["Open"], 2), "dayHigh": round(last["High"], 2), "dayLow": round(last["Low"], 2),
+        "fiftyTwoWeekHigh": round(history["High"].iloc[-252:].max(), 2),
+        "fiftyTwoWeekLow": round(history["Low"].iloc[-252:].min(), 2),
+        "marketCap": int(last["Close"] * 1.5e10), "volume": int(last["Volume"]),
+        "averageVolume": int(history["Volume"].iloc[-63:].mean()), "trailingPE": 28.4, "trailingEps": 6.1,
+        "totalRevenue": int(revenue[0]), "debtToEquity": 71.4, "dividendYield": 0.5, "bookValue": 4.3,
+        "priceToBook": 40.2, "beta": 1.2,
+    }
+    now = int(end.timestamp())
+    # Five stories, three of them also carried by a second outlet, as syndicated news usually is
+    stories = [
+        f"{ticker} beats quarterly revenue estimates on strong demand",
+        f"Analysts raise {ticker} price target after earnings call",
+        f"{ticker} announces expanded share buyback program",
+        "Federal Reserve leaves interest rates unchanged",
+        f"{ticker} faces regulatory review over new product launch",
+    ]
+    headlines = stories + [f"{title} - report" for title in stories[:3]]
+    news = [
+        {"title": title, "publisher": "Fixture Wire" if i < len(stories) else "Fixture Daily",
+         "link": f"https://example.com/{ticker.lower()}/{i + 1}", "providerPublishTime": now - i * 3600}
+        for i, title in enumerate(headlines)
+    ]
+    return {"info": info, "history": history, "news": news, **statements}
+
+
+def fixture_path(ticker: str, directory: str = FIXTURE_DIR) -> str:
+    return os.path.join(directory, f"{ticker.upper()}.pkl")
+
+
+def record_fixture(ticker: str, directory: str = FIXTURE_DIR) -> str:
+    """Download one ticker from yfinance and store it as a fixture (needs network access)."""
+    stock = yf.Ticker(ticker)
+    fixture = {
+        "info": stock.info,
+        "history": stock.history(period="max", auto_adjust=True),
+        "news": stock.news,
+        "income_stmt": stock.income_stmt,
+        "balance_sheet": stock.balance_sheet,
+        "cashflow": stock.cashflow,
+    }
+    os.makedirs(directory, exist_ok=True)
+    path = fixture_path(ticker, directory)
+    with open(path, "wb") as file:
+        pickle.dump(fixture, file)
+    return path
+
+
+def load_fixture(ticker: str, directory: str = FIXTURE_DIR) -> dict:
+    """Return the recorded fixture for ticker, or a synthetic one if none was recorded."""
+    path = fixture_path(ticker, directory)
+    if os.path.exists(path):
+        with open(path, "rb") as file:
+            return pickle.load(file)
+    return synthetic_fixture(ticker.upper())
+
+
+class FixtureTicker:
+    """Drop-in for ``yf.Ticker`` serving a fixture, with a fixed delay per request."""
+
+    def __init__(self, ticker: str, fixture: dict, latency: float = 0.0):
+        self.ticker = ticker.upper()
+        self._fixture = fixture
+        self._latency = latency
+
+    def _get(self, name: str):
+        if self._latency:
+            time.sleep(self._latency)
+        return self._fixture[name]
+
+    @property
+    def info(self):
+        return dict(self._get("info"))
+
+    @property
+    def news(self):
+        return list(self._get("news"))
+
+    @property
+    def income_stmt(self):
+        return self._get("income_stmt").copy()
+
+    @property
+    def balance_sheet(self):
+        return self._get("balance_sheet").copy()
+
+    @property
+    def cashflow(self):
+        return self._get("cashflow").copy()
+
+    def history(self, period=None, start=None, end=None, **kwargs):
+        history = self._get("history")
+        if start is not None:
+            history = history[history.index >= pd.Timestamp(start).tz_localize(history.index.tz)]
+        if end is not None:
+            history = history[history.index < pd.Timestamp(end).tz_localize(history.index.tz)]
+        return history.copy()
+
+
+def install(latency: float = 0.0, directory: str = FIXTURE_DIR):
+    """Replace ``yf.Ticker`` and ``yf.download`` with fixture-backed versions.
+
+    Returns a function that puts the real ones back.
+    """
+    fixtures = {}
+    original_ticker, original_download = yf.Ticker, yf.download
+
+    def ticker(symbol, *args, **kwargs):
+        symbol = symbol.upper()
+        if symbol not in fixtures:
+            fixtures[symbol] = load_fixture(symbol, directory)
+        return FixtureTicker(symbol, fixtures[symbol], latency)
+
+    def download(tickers, start=None, end=None, group_by="column", **kwargs):
+        symbols = tickers.split() if isinstance(tickers, str) else list(tickers)
+        frames = {s.upper(): ticker(s).history(start=start, end=end) for s in symbols}
+        return pd.concat(frames, axis=1)
+
+    yf.Ticker, yf.download = ticker, download
+
+    def restore():
+        yf.Ticker, yf.download = original_ticker, original_download
+
+    return restore
@@ -1,22 +1,45 @@
 import yfinance as yf
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.base import MIMEBase
-from email.mime.application import MIMEApplication
-from email import encoders
 import requests
 import json
+import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from market_data import MAX_FETCH_WORKERS, get_info, get_history, get_histories, get_statements
+from indicators import indicator_table, format_indicator_summary
+from fundamentals import fundamentals_table, format_ratio_history
+from news_store import NEWS_TOP_K, ranked_news
+from payloads import Financials, NewsDigest, Quote, Technicals, serialize_task
+from email_queue import get_email_queue
+from tracing import traced
+
+# Price history window used for technical indicators (long enough for a 200-day SMA)
+HISTORY_PERIOD = os.getenv("HISTORY_PERIOD", "1y")
+
+# Feed the crew compact serialized payloads instead of the long prose fetcher output
+COMPACT_PAYLOADS = os.getenv("COMPACT_PAYLOADS", "true").lower() in ("1", "true", "yes")
+
+def _technical_summary(hist) -> str:
+    """Summarize a price history as a compact block of technical indicators."""
+    table = indicator_table({"ticker": hist})
+    return format_indicator_summary(table.iloc[0], as_of=hist.index[-1].date())
+
+@traced("tool.fetch_stock_data")
+def fetch_stock_data(ticker: str, structured: bool = False):
+    """Fetch comprehensive stock data and historical market data with error handling.
+
+    With structured=True a payloads.Quote is returned instead of text (without
+    the technical summary) and errors are raised rather than returned.
+    """
+    if structured:
+        stock_info = get_info(ticker)
+        if not stock_info:
+            raise ValueError(f"Could not fetch data for ticker {ticker}")
+        return Quote.from_info(ticker, stock_info)
 
-def fetch_stock_data(ticker: str) -> str:
-    """Fetch comprehensive stock data and historical market data with error handling."""
     try:
-        stock = yf.Ticker(ticker)
-        
-        # Fetch current stock information and history of prices
-        stock_info = stock.info
-        hist = stock.history(period="1mo")
+        # Fetch current stock information and history of prices (cached)
+        stock_info = get_info(ticker)
+        hist = get_history(ticker, period=HISTORY_PERIOD)
         
         # Handle case where stock info might be empty
         if not stock_info:
@@ -47,14 +70,9 @@ def fetch_stock_data(ticker: str) -> str:
             f"Beta: {stock_info.get('beta', 'N/A')}\n\n"
         )
 
-        # Add historical data if available
+        # Add a compact technical summary of the price history if available
         if not hist.empty:
-            output += "Historical Stock Prices (Past Month):\n"
-            for date, row in hist.tail(10).iterrows():  # Last 10 days
-                output += (
-                    f"Date: {date.date()}, Open: ${row['Open']:.2f}, High: ${row['High']:.2f}, "
-                    f"Low: ${row['Low']:.2f}, Close: ${row['Close']:.2f}, Volume: {row['Volume']}\n"
-                )
+            output += _technical_summary(hist)
         else:
             output += "Historical data not available.\n"
 
@@ -63,16 +81,45 @@ def fetch_stock_data(ticker: str) -> str:
     except Exception as e:
         return f"Error fetching stock data for {ticker}: {str(e)}"
 
-def fetch_stock_financials(ticker: str) -> str:
-    """Fetch financial statements for the stock with error handling."""
+@traced("tool.fetch_technical_indicators")
+def fetch_technical_indicators(ticker: str, structured: bool = False):
+    """Fetch price history and summarize it as technical indicators.
+
+    With structured=True a payloads.Technicals is returned and errors are raised.
+    """
+    if structured:
+        hist = get_history(ticker, period=HISTORY_PERIOD)
+        if hist.empty:
+            raise ValueError(f"No price history for {ticker}")
+        return Technicals.from_row(ticker, indicator_table({ticker: hist}).iloc[0], as_of=hist.index[-1].date())
+
     try:
-        stock = yf.Ticker(ticker)
-        
-        # Try to get financial data
+        hist = get_history(ticker, period=HISTORY_PERIOD)
+        if hist.empty:
+            return f"Technical indicators not available for {ticker}"
+        return _technical_summary(hist)
+
+    except Exception as e:
+        return f"Error computing technical indicators for {ticker}: {str(e)}"
+
+def fetch_indicator_table(tickers: list):
+    """Return a (ticker x indicator) DataFrame for many tickers computed in one vectorized pass."""
+    tickers = list(dict.fromkeys(t.strip().upper() for t in tickers if t and t.strip()))
+    return indicator_table(get_histories(tickers, period=HISTORY_PERIOD))
+
+@traced("tool.fetch_stock_financials")
+def fetch_stock_financials(ticker: str, structured: bool = False):
+    """Fetch financial statements for the stock with error handling.
+
+    With structured=True a payloads.Financials is returned and errors are raised.
+    """
+    if structured:
+        return Financials.from_statements(ticker, get_statements(ticker), fundamentals_table(ticker))
+
+    try:
+        # Try to get financial data (cached)
         try:
-            income_stmt = stock.income_stmt
-            balance_sheet = stock.balance_sheet
-            cash_flow = stock.cashflow
+            income_stmt, balance_sheet, cash_flow = get_statements(ticker)
         except Exception:
             return f"Financial statements not available for {ticker}"
 
@@ -111,27 +158,39 @@ def fetch_stock_financials(ticker: str) -> str:
                 if metric in cash_flow.index:
                     value = cash_flow.loc[metric, recent_year]
                     output += f"{metric}: ${value:,.0f}\n"
+            output += "\n"
+
+        # Add growth, margin, leverage and cash-conversion trends across all periods
+        output += format_ratio_history(fundamentals_table(ticker))
 
         return output
     
     except Exception as e:
         return f"Error fetching financial data for {ticker}: {str(e)}"
 
-def fetch_stock_news(ticker: str) -> str:
-    """Fetch recent news articles related to the company stock with error handling."""
+@traced("tool.fetch_stock_news")
+def fetch_stock_news(ticker: str, structured: bool = False):
+    """Fetch recent news articles related to the company stock with error handling.
+
+    Syndicated copies of a story are collapsed and the remaining stories are
+    ranked by recency and relevance (see news_store). With structured=True a
+    payloads.NewsDigest is returned and errors are raised.
+    """
+    if structured:
+        return NewsDigest.from_items(ticker, ranked_news(ticker), limit=NEWS_TOP_K)
+
     try:
-        stock = yf.Ticker(ticker)
-        news_items = stock.news
+        news_items = ranked_news(ticker)
         
         if not news_items:
             return f"No recent news available for {ticker}"
         
         # Format the news into a readable summary
         news_summary = []
-        for i, item in enumerate(news_items[:7]):  # Limit to top 7 news articles
-            title = item.get('title', 'No title available')
-            publisher = item.get('publisher', 'Unknown publisher')
-            link = item.get('link', 'No link available')
+        for i, item in enumerate(news_items):
+            title = item.get('title') or 'No title available'
+            publisher = item.get('publisher') or 'Unknown publisher'
+            link = item.get('link') or 'No link available'
             
             # Try to get publish time
             publish_time = item.get('providerPublishTime', 0)
@@ -140,7 +199,9 @@ def fetch_stock_news(ticker: str) -> str:
             else:
                 publish_date = 'Date not available'
             
-            summary = f"{i+1}. {title} - {publisher} ({publish_date})\n   Link: {link}\n"
+            sources = item.get('sources', 1)
+            carried = f", {sources} sources" if sources > 1 else ""
+            summary = f"{i+1}. {title} - {publisher} ({publish_date}{carried})\n   Link: {link}\n"
             news_summary.append(summary)
         
         # Join all summaries into a single string
@@ -149,13 +210,108 @@ def fetch_stock_news(ticker: str) -> str:
     except Exception as e:
         return f"Error fetching news for {ticker}: {str(e)}"
 
+def fetch_stocks_bulk(tickers: list, max_workers: int = MAX_FETCH_WORKERS) -> dict:
+    """Fetch stock data, financials and news for many tickers at once.
+
+    Price history for every ticker is pulled in one ``yf.download`` call; the
+    per-ticker info, statements and news requests then run on a bounded thread
+    pool. Returns {ticker: {"stock_data": str, "financials": str, "news": str}}
+    with the same text the single-ticker fetchers produce.
+    """
+    tickers = list(dict.fromkeys(t.strip().upper() for t in tickers if t and t.strip()))
+    if not tickers:
+        return {}
+
+    try:
+        # Warm the history cache for all tickers with a single download
+        get_histories(tickers, period=HISTORY_PERIOD)
+    except Exception as e:
+        print(f"Bulk history download failed, falling back to per-ticker requests: {e}")
+
+    fetchers = {
+        "stock_data": fetch_stock_data,
+        "financials": fetch_stock_financials,
+        "news": fetch_stock_news,
+    }
+
+    results = {ticker: {} for ticker in tickers}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            (ticker, name): pool.submit(fetcher, ticker)
+            for ticker in tickers
+            for name, fetcher in fetchers.items()
+        }
+        for (ticker, name), future in futures.items():
+            results[ticker][name] = future.result()
+
+    return results
+
+# Kickoff inputs that share a task prompt, and so one PAYLOAD_TOKEN_BUDGET
+_TASK_PAYLOADS = (("stock_data", "financials"), ("news",), ("technicals",))
+
+
+def _structured_payload(fetcher, ticker: str, label: str):
+    """Return a fetcher's structured result, or a line describing why it is unavailable."""
+    try:
+        return fetcher(ticker, structured=True)
+    except Exception as e:
+        return f"{label} not available for {ticker}: {e}\n"
+
+@traced("tool.prefetch_report_inputs")
+def prefetch_report_inputs(ticker: str) -> dict:
+    """Fetch stock data, financials and news concurrently and return crew kickoff inputs.
+
+    Running the fetchers directly before kickoff means the data collector and
+    news agents receive real figures in their prompts instead of spending LLM
+    iterations producing them.
+    """
+    ticker = ticker.strip().upper()
+    if COMPACT_PAYLOADS:
+        fetchers = {
+            "stock_data": (fetch_stock_data, "Stock data"),
+            "technicals": (fetch_technical_indicators, "Technical indicators"),
+            "financials": (fetch_stock_financials, "Financial statements"),
+            "news": (fetch_stock_news, "News"),
+        }
+        with ThreadPoolExecutor(max_workers=len(fetchers)) as pool:
+            futures = {name: pool.submit(_structured_payload, fetcher, ticker, label)
+                       for name, (fetcher, label) in fetchers.items()}
+            payloads = {name: future.result() for name, future in futures.items()}
+
+        inputs = {"company_stock": ticker}
+        for names in _TASK_PAYLOADS:
+            ready = [name for name in names if not isinstance(payloads[name], str)]
+            inputs.update(zip(ready, serialize_task([payloads[name] for name in ready])))
+            inputs.update((name, payloads[name]) for name in names if name not in ready)
+        return inputs
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        stock_future = pool.submit(fetch_stock_data, ticker)
+        financial_future = pool.submit(fetch_stock_financials, ticker)
+        news_future = pool.submit(fetch_stock_news, ticker)
+
+        stock_data = stock_future.result()
+
+        return {
+            "company_stock": ticker,
+            "stock_data": stock_data,
+            # Price history is cached by now, so this is a local computation
+            "technicals": fetch_technical_indicators(ticker),
+            "financials": financial_future.result(),
+            "news": news_future.result(),
+        }
+
 def get_stock_analysis_summary(ticker: str) -> str:
     """Get a comprehensive summary combining all stock data."""
     try:
-        # Fetch all data
-        stock_data = fetch_stock_data(ticker)
-        financial_data = fetch_stock_financials(ticker)
-        news_data = fetch_stock_news(ticker)
+        # Fetch all data concurrently
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            stock_future = pool.submit(fetch_stock_data, ticker)
+            financial_future = pool.submit(fetch_stock_financials, ticker)
+            news_future = pool.submit(fetch_stock_news, ticker)
+            stock_data = stock_future.result()
+            financial_data = financial_future.result()
+            news_data = news_future.result()
         
         # Combine all data
         full_summary = f"""
@@ -175,43 +331,33 @@ Analysis completed at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
     except Exception as e:
         return f"Error generating comprehensive analysis for {ticker}: {str(e)}"
 
-def send_report(sender_email, receiver_email, password, subject, body, file_name):
-    """Send report via email with improved error handling."""
+@traced("email.send")
+def send_report(sender_email, receiver_email, password, subject, body, file_name, attachment=None,
+                attachment_key=None):
+    """Send report via email with improved error handling.
+
+    Delivery goes through the pooled background queue in email_queue and this
+    call waits for it; use get_email_queue().submit() to send without waiting.
+    receiver_email may be a comma-separated list. When attachment bytes are
+    given they are sent as file_name instead of reading the file from disk.
+    """
     try:
-        # Create a multipart message container
-        message = MIMEMultipart()
-        message['From'] = sender_email  
-        message['To'] = receiver_email  
-        message['Subject'] = subject  
-
-        # Attach the text body of the email
-        message.attach(MIMEText(body, 'plain'))
-
-        # Check if file exists before attaching
-        import os
-        if not os.path.exists(file_name):
-            raise FileNotFoundError(f"File {file_name} not found")
-
-        # Open the file and attach it
-        with open(file_name, "rb") as attachment:
-            part = MIMEBase("application", "octet-stream")
-            part.set_payload(attachment.read())
-            encoders.encode_base64(part)
-            
-            # Add header for attachment
-            part.add_header(
-                "Content-Disposition",
-                f"attachment; filename={os.path.basename(file_name)}",
-            )
-            message.attach(part)
-
-        # Send the email
-        server = smtplib.SMTP_SSL('smtp.gmail.com', 465)
-        server.login(sender_email, password)
-        server.sendmail(sender_email, receiver_email, message.as_string())
-        server.quit()
+        if attachment is None:
+            # Check if file exists before attaching
+            if not os.path.exists(file_name):
+                raise FileNotFoundError(f"File {file_name} not found")
+
+            with open(file_name, "rb") as file:
+                attachment = file.read()
+
+        result = get_email_queue(sender_email, password).submit(
+            receiver_email, subject, body, file_name, attachment, attachment_key
+        ).result()
+        if result.refused:
+            print(f"Email refused for: {', '.join(result.refused)}")
         print("Email sent successfully!")
-        
+        return result
+
     except Exception as e:
         print(f"Error sending email: {e}")
-        raise e
\ No newline at end of file
+        raise e
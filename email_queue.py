@@ -0,0 +1,255 @@
+import base64
+import hashlib
+import os
+import queue
+import smtplib
+import ssl
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from email.mime.base import MIMEBase
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from tracing import span
+
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "465"))
+# "ssl" (implicit TLS), "starttls" or "none" (e.g. a local aiosmtpd test server)
+SMTP_SECURITY = os.getenv("SMTP_SECURITY", "ssl").lower()
+# Authenticated connections kept open and shared by the delivery workers
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "2"))
+# Idle pooled connections older than this are closed instead of reused
+SMTP_IDLE_SECONDS = float(os.getenv("SMTP_IDLE_SECONDS", "60"))
+SMTP_MAX_RETRIES = int(os.getenv("SMTP_MAX_RETRIES", "3"))
+SMTP_RETRY_BACKOFF = float(os.getenv("SMTP_RETRY_BACKOFF", "2"))
+# Recipients per message; larger lists are split into several envelopes
+SMTP_MAX_RECIPIENTS = int(os.getenv("SMTP_MAX_RECIPIENTS", "50"))
+
+# Encoded attachments kept in memory, keyed by content hash
+_ATTACHMENT_CACHE_SIZE = 16
+# Transient failures worth retrying; 5xx replies other than these are permanent
+_TRANSIENT_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, TimeoutError)
+
+
+def _is_transient(error: Exception) -> bool:
+    if isinstance(error, _TRANSIENT_ERRORS):
+        return True
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+class SMTPConnectionPool:
+    """Bounded pool of logged-in SMTP connections.
+
+    Connections are reused while they are younger than idle_seconds and still
+    answer NOOP; broken ones are discarded and replaced on the next checkout.
+    """
+
+    def __init__(self, host: str = SMTP_HOST, port: int = SMTP_PORT, username: str = None, password: str = None,
+                 security: str = SMTP_SECURITY, size: int = SMTP_POOL_SIZE, idle_seconds: float = SMTP_IDLE_SECONDS):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.security = security
+        self.idle_seconds = idle_seconds
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self.opened = 0
+
+    def _connect(self) -> smtplib.SMTP:
+        if self.security == "ssl":
+            conn = smtplib.SMTP_SSL(self.host, self.port, context=ssl.create_default_context(), timeout=30)
+        else:
+            conn = smtplib.SMTP(self.host, self.port, timeout=30)
+        try:
+            if self.security == "starttls":
+                conn.starttls(context=ssl.create_default_context())
+            conn.ehlo_or_helo_if_needed()
+            # Plain local test servers usually do not offer AUTH
+            if self.username and self.password and (self.security != "none" or conn.has_extn("auth")):
+                conn.login(self.username, self.password)
+        except BaseException:
+            conn.close()
+            raise
+        self.opened += 1
+        return conn
+
+    def acquire(self) -> smtplib.SMTP:
+        self._slots.acquire()
+        try:
+            while True:
+                try:
+                    conn, last_used = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._connect()
+                if time.monotonic() - last_used < self.idle_seconds:
+                    try:
+                        if conn.noop()[0] == 250:
+                            return conn
+                    except (smtplib.SMTPException, OSError):
+                        pass
+                self._close(conn)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, conn: smtplib.SMTP, broken: bool = False):
+        if broken:
+            self._close(conn)
+        else:
+            self._idle.put((conn, time.monotonic()))
+        self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close(conn)
+
+    @staticmethod
+    def _close(conn: smtplib.SMTP):
+        try:
+            conn.quit()
+        except (smtplib.SMTPException, OSError):
+            conn.close()
+
+
+class DeliveryResult:
+    """Outcome of one queued email: who it reached, who refused it and how many attempts it took."""
+
+    def __init__(self, delivered: list, refused: dict, attempts: int):
+        self.delivered = delivered
+        self.refused = refused
+        self.attempts = attempts
+
+
+class EmailQueue:
+    """Background delivery of report emails over pooled SMTP connections.
+
+    submit() returns immediately with a Future; worker threads build the
+    message, send it to every recipient (in envelopes of up to
+    SMTP_MAX_RECIPIENTS, with the list hidden from recipients) and retry
+    transient failures with exponential backoff. Attachments are base64
+    encoded once per distinct content and reused for every message.
+    """
+
+    def __init__(self, sender: str, pool: SMTPConnectionPool, workers: int = SMTP_POOL_SIZE,
+                 max_retries: int = SMTP_MAX_RETRIES, backoff: float = SMTP_RETRY_BACKOFF,
+                 max_recipients: int = SMTP_MAX_RECIPIENTS):
+        self.sender = sender
+        self.pool = pool
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_recipients = max_recipients
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="email")
+        self._attachments = OrderedDict()
+        self._attachments_lock = threading.Lock()
+
+    def submit(self, recipients, subject: str, body: str, file_name: str = None, attachment: bytes = None,
+               attachment_key: str = None) -> Future:
+        """Queue a message for recipients (a list or a comma/semicolon separated string)."""
+        if isinstance(recipients, str):
+            recipients = recipients.replace(";", ",").split(",")
+        recipients = list(dict.fromkeys(r.strip() for r in recipients if r and r.strip()))
+        if not recipients:
+            raise ValueError("No recipients given")
+
+        encoded = None
+        if attachment is not None:
+            encoded = self._encoded_attachment(attachment, attachment_key)
+        return self._executor.submit(self._deliver, recipients, subject, body, file_name, encoded)
+
+    def _encoded_attachment(self, attachment: bytes, key: str = None) -> str:
+        key = key or hashlib.sha256(attachment).hexdigest()
+        with self._attachments_lock:
+            encoded = self._attachments.get(key)
+            if encoded is not None:
+                self._attachments.move_to_end(key)
+                return encoded
+
+        encoded = base64.encodebytes(attachment).decode("ascii")
+        with self._attachments_lock:
+            self._attachments[key] = encoded
+            while len(self._attachments) > _ATTACHMENT_CACHE_SIZE:
+                self._attachments.popitem(last=False)
+        return encoded
+
+    def _message(self, to_header: str, subject: str, body: str, file_name: str, encoded: str) -> str:
+        message = MIMEMultipart()
+        message["From"] = self.sender
+        message["To"] = to_header
+        message["Subject"] = subject
+        message.attach(MIMEText(body, "plain"))
+        if encoded is not None:
+            part = MIMEBase("application", "octet-stream")
+            part.set_payload(encoded)
+            part["Content-Transfer-Encoding"] = "base64"
+            part.add_header("Content-Disposition", f"attachment; filename={os.path.basename(file_name)}")
+            message.attach(part)
+        return message.as_string()
+
+    def _deliver(self, recipients: list, subject: str, body: str, file_name: str, encoded: str) -> DeliveryResult:
+        delivered, refused, attempts = [], {}, 0
+        for start in range(0, len(recipients), self.max_recipients):
+            batch = recipients[start:start + self.max_recipients]
+            to_header = batch[0] if len(recipients) == 1 else "undisclosed-recipients:;"
+            message = self._message(to_header, subject, body, file_name, encoded)
+            batch_refused, batch_attempts = self._send_with_retry(batch, message)
+            attempts += batch_attempts
+            refused.update(batch_refused)
+            delivered.extend(r for r in batch if r not in batch_refused)
+        return DeliveryResult(delivered, refused, attempts)
+
+    def _send_with_retry(self, batch: list, message: str):
+        for attempt in range(1, self.max_retries + 2):
+            with span("email.smtp", recipients=len(batch), attempt=attempt, bytes=len(message)):
+                conn = None
+                try:
+                    # Connecting and logging in fail transiently too (refused, timeouts, dropped sessions)
+                    conn = self.pool.acquire()
+                    refused = conn.sendmail(self.sender, batch, message)
+                except smtplib.SMTPRecipientsRefused as e:
+                    # Every recipient was refused; the connection itself is still fine
+                    self.pool.release(conn)
+                    return {r: str(reply) for r, reply in e.recipients.items()}, attempt
+                except Exception as e:
+                    if conn is not None:
+                        self.pool.release(conn, broken=True)
+                    if not _is_transient(e) or attempt > self.max_retries:
+                        raise
+                    delay = self.backoff * 2 ** (attempt - 1)
+                    print(f"Email delivery attempt {attempt} failed ({e}); retrying in {delay:.0f}s")
+                else:
+                    self.pool.release(conn)
+                    return {r: str(reply) for r, reply in refused.items()}, attempt
+            time.sleep(delay)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.pool.close()
+
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+def get_email_queue(sender: str = None, password: str = None) -> EmailQueue:
+    """Return the process-wide delivery queue for a sender (SENDER_EMAIL by default)."""
+    sender = sender or os.getenv("SENDER_EMAIL")
+    password = password or os.getenv("EMAIL_PASSWORD")
+    if not sender:
+        raise ValueError("No sender configured; set SENDER_EMAIL")
+    with _queues_lock:
+        email_queue = _queues.get(sender)
+        if email_queue is None or email_queue.pool.password != password:
+            if email_queue is not None:
+                email_queue.pool.close()
+            pool = SMTPConnectionPool(username=sender, password=password)
+            email_queue = _queues[sender] = EmailQueue(sender, pool)
+        return email_queue
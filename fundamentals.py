@@ -0,0 +1,157 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from market_data import MAX_FETCH_WORKERS, STATEMENT_TTL, cached, get_statements
+
+STATEMENTS = ("income", "balance", "cashflow")
+
+# Line items used for ratios, with fallbacks for names that vary between filers
+_METRIC_CANDIDATES = {
+    "revenue": ["Total Revenue", "Operating Revenue"],
+    "gross_profit": ["Gross Profit"],
+    "operating_income": ["Operating Income", "Total Operating Income As Reported"],
+    "net_income": ["Net Income", "Net Income Common Stockholders"],
+    "total_assets": ["Total Assets"],
+    "total_debt": ["Total Debt"],
+    "equity": ["Stockholders Equity", "Total Equity Gross Minority Interest"],
+    "current_assets": ["Current Assets"],
+    "current_liabilities": ["Current Liabilities"],
+    "cash": ["Cash And Cash Equivalents", "Cash Cash Equivalents And Short Term Investments"],
+    "operating_cash_flow": ["Operating Cash Flow"],
+    "capex": ["Capital Expenditure"],
+    "free_cash_flow": ["Free Cash Flow"],
+}
+
+RATIO_COLUMNS = [
+    "revenue_growth", "net_income_growth", "gross_margin", "operating_margin", "net_margin",
+    "debt_to_equity", "debt_to_assets", "current_ratio", "cash_conversion", "fcf_margin", "roe",
+]
+
+
+def statements_long(ticker: str) -> pd.DataFrame:
+    """Return every period of a ticker's three statements as rows of (ticker, statement, metric, period, value)."""
+    frames = []
+    for statement, frame in zip(STATEMENTS, get_statements(ticker)):
+        if frame is None or frame.empty:
+            continue
+        long = frame.rename_axis(index="metric", columns="period").stack().rename("value").reset_index()
+        long["statement"] = statement
+        frames.append(long)
+
+    if not frames:
+        return pd.DataFrame(columns=["ticker", "statement", "metric", "period", "value"])
+
+    table = pd.concat(frames, ignore_index=True)
+    table["ticker"] = ticker.upper()
+    table["period"] = pd.to_datetime(table["period"])
+    table["value"] = pd.to_numeric(table["value"], errors="coerce")
+    return table[["ticker", "statement", "metric", "period", "value"]]
+
+
+def _coalesce(wide: pd.DataFrame, candidates: list) -> pd.Series:
+    """Return the first available line item among candidates for every row."""
+    present = [name for name in candidates if name in wide.columns]
+    if not present:
+        return pd.Series(np.nan, index=wide.index)
+    return wide[present].bfill(axis=1).iloc[:, 0]
+
+
+def compute_ratios(long: pd.DataFrame) -> pd.DataFrame:
+    """Pivot a long statements table to one row per (ticker, period) and add ratio columns."""
+    if long.empty:
+        return pd.DataFrame(columns=list(_METRIC_CANDIDATES) + RATIO_COLUMNS)
+
+    wide = long.pivot_table(index=["ticker", "period"], columns="metric", values="value", aggfunc="first")
+    wide = wide.sort_index()
+
+    base = pd.DataFrame({name: _coalesce(wide, names) for name, names in _METRIC_CANDIDATES.items()})
+    if base["free_cash_flow"].isna().all():
+        base["free_cash_flow"] = base["operating_cash_flow"] + base["capex"]
+
+    def denom(column):
+        # Zero denominators become NaN rather than infinities
+        return base[column].replace(0, np.nan)
+
+    grouped = base.groupby(level="ticker")
+    base["revenue_growth"] = grouped["revenue"].pct_change(fill_method=None)
+    base["net_income_growth"] = grouped["net_income"].pct_change(fill_method=None)
+    base["gross_margin"] = base["gross_profit"] / denom("revenue")
+    base["operating_margin"] = base["operating_income"] / denom("revenue")
+    base["net_margin"] = base["net_income"] / denom("revenue")
+    base["debt_to_equity"] = base["total_debt"] / denom("equity")
+    base["debt_to_assets"] = base["total_debt"] / denom("total_assets")
+    base["current_ratio"] = base["current_assets"] / denom("current_liabilities")
+    base["cash_conversion"] = base["operating_cash_flow"] / denom("net_income")
+    base["fcf_margin"] = base["free_cash_flow"] / denom("revenue")
+    base["roe"] = base["net_income"] / denom("equity")
+
+    return base
+
+
+# Ratios shown in prompts, in display order, and the ones rendered as percentages
+RATIO_LABELS = [
+    ("Revenue Growth", "revenue_growth"),
+    ("Gross Margin", "gross_margin"),
+    ("Operating Margin", "operating_margin"),
+    ("Net Margin", "net_margin"),
+    ("FCF Margin", "fcf_margin"),
+    ("Cash Conversion (OCF/NI)", "cash_conversion"),
+    ("Debt to Equity", "debt_to_equity"),
+    ("Current Ratio", "current_ratio"),
+    ("ROE", "roe"),
+]
+PERCENT_RATIOS = {"revenue_growth", "gross_margin", "operating_margin", "net_margin", "fcf_margin", "roe"}
+
+
+def fundamentals_table(ticker: str) -> pd.DataFrame:
+    """Return the multi-period fundamentals and ratios for one ticker, cached for STATEMENT_TTL seconds."""
+    return cached("fundamentals", ticker, lambda: compute_ratios(statements_long(ticker)), STATEMENT_TTL)
+
+
+def peer_fundamentals(tickers: list, max_workers: int = MAX_FETCH_WORKERS) -> pd.DataFrame:
+    """Return the fundamentals table for many tickers stacked on a (ticker, period) index."""
+    tickers = list(dict.fromkeys(t.strip().upper() for t in tickers if t and t.strip()))
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        tables = list(pool.map(fundamentals_table, tickers))
+
+    tables = [t for t in tables if not t.empty]
+    if not tables:
+        return compute_ratios(pd.DataFrame())
+    return pd.concat(tables).sort_index()
+
+
+def latest_ratios(table: pd.DataFrame) -> pd.DataFrame:
+    """Return the most recent period's ratios per ticker."""
+    if table.empty:
+        return pd.DataFrame(columns=RATIO_COLUMNS)
+    return table.groupby(level="ticker").tail(1).reset_index(level="period")[["period"] + RATIO_COLUMNS]
+
+
+def peer_comparison(tickers: list) -> pd.DataFrame:
+    """Latest ratios for a peer group with each ticker's percentile rank within the group."""
+    latest = latest_ratios(peer_fundamentals(tickers))
+    ranks = latest[RATIO_COLUMNS].rank(pct=True).add_suffix("_pct_rank")
+    return latest.join(ranks)
+
+
+def format_ratio_history(table: pd.DataFrame, periods: int = 4) -> str:
+    """Render the last few periods of key ratios for one ticker as compact text."""
+    if table.empty:
+        return ""
+
+    recent = table.tail(periods)
+    header = " | ".join(str(period.year) for period in recent.index.get_level_values("period"))
+    lines = [f"Key Ratios by Fiscal Period ({header}):"]
+    for label, column in RATIO_LABELS:
+        values = []
+        for value in recent[column]:
+            if pd.isna(value):
+                values.append("N/A")
+            elif column in PERCENT_RATIOS:
+                values.append(f"{value * 100:.1f}%")
+            else:
+                values.append(f"{value:.2f}")
+        lines.append(f"{label}: {' | '.join(values)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,352 @@
+"""Vectorized technical indicators over price histories.
+
+Every function accepts a 1-D series or a 2-D array shaped (time, tickers) and
+returns arrays of the same shape, so one call covers a whole watchlist. Values
+are NaN until a window has enough observations.
+"""
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS_PER_YEAR = 252
+
+# Default look-back windows, in trading days
+DEFAULT_WINDOWS = {
+    "sma": (20, 50, 200),
+    "ema": (12, 26),
+    "rsi": 14,
+    "macd": (12, 26, 9),
+    "bollinger": 20,
+    "bollinger_std": 2.0,
+    "atr": 14,
+    "volatility": 20,
+}
+
+
+def _as_2d(values) -> np.ndarray:
+    """Return values as a float array shaped (time, tickers)."""
+    arr = np.asarray(values, dtype=float)
+    if arr.ndim == 1:
+        arr = arr[:, None]
+    return arr
+
+
+def _rolling_sum(arr: np.ndarray, window: int) -> np.ndarray:
+    """Rolling sum along the time axis; windows containing a NaN are NaN."""
+    out = np.full(arr.shape, np.nan)
+    if window <= 0 or arr.shape[0] < window:
+        return out
+
+    nan_mask = np.isnan(arr)
+    has_nan = nan_mask.any()
+    if has_nan:
+        # NaN only in leading rows of every column (e.g. a diff): sum the rest directly
+        start = int(np.argmax(~nan_mask.all(axis=1)))
+        if start and not nan_mask[start:].any():
+            out[start:] = _rolling_sum(arr[start:], window)
+            return out
+
+    zero_row = np.zeros((1, arr.shape[1]))
+    csum = np.empty((arr.shape[0] + 1, arr.shape[1]))
+    csum[0] = 0.0
+    np.cumsum(np.where(nan_mask, 0.0, arr) if has_nan else arr, axis=0, out=csum[1:])
+    out[window - 1:] = csum[window:] - csum[:-window]
+    if has_nan:
+        missing = np.vstack([zero_row, np.cumsum(nan_mask, axis=0)])
+        out[window - 1:][(missing[window:] - missing[:-window]) > 0] = np.nan
+    return out
+
+
+def _rolling_std(arr: np.ndarray, window: int, ddof: int = 1) -> np.ndarray:
+    """Rolling standard deviation from running sums of x and x**2."""
+    # Centre each column first to keep the sum-of-squares numerically stable
+    centred = arr - np.nanmean(arr, axis=0) if arr.size else arr
+    s1 = _rolling_sum(centred, window)
+    s2 = _rolling_sum(centred * centred, window)
+    var = (s2 - s1 * s1 / window) / (window - ddof)
+    return np.sqrt(np.clip(var, 0.0, None))
+
+
+def _ffill(arr: np.ndarray) -> np.ndarray:
+    """Forward-fill NaNs along the time axis."""
+    idx = np.where(np.isnan(arr), 0, np.arange(arr.shape[0])[:, None])
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    return arr[idx, np.arange(arr.shape[1])]
+
+
+@lru_cache(maxsize=64)
+def _ewma_weights(alpha: float, block: int):
+    """Per-row factors of the closed-form EWMA for one block, shaped (block, 1).
+
+    Returns (decay ** -t, alpha * decay ** t, decay ** (t + 1)); they depend only on
+    alpha and the block length, so repeated calls (every ticker, every span of
+    the indicator table) reuse them. The arrays are read-only.
+    """
+    decay = 1.0 - alpha
+    powers = decay ** np.arange(block, dtype=float)[:, None]
+    weights = (1.0 / powers, alpha * powers, decay * powers)
+    for weight in weights:
+        weight.flags.writeable = False
+    return weights
+
+
+def _ewma(arr: np.ndarray, alpha: float, min_periods: int = 1) -> np.ndarray:
+    """Exponentially weighted mean y[t] = alpha * x[t] + (1 - alpha) * y[t - 1].
+
+    Each column is seeded with its first valid value and gaps are carried
+    forward. The recursion is solved in closed form with cumulative sums over
+    blocks short enough that the decay factors stay within float range, so the
+    work is vectorized over both time and tickers.
+    """
+    arr = _as_2d(arr)
+    n, k = arr.shape
+    out = np.full((n, k), np.nan)
+    if n == 0:
+        return out
+
+    valid = ~np.isnan(arr)
+    all_valid = valid.all()
+    if not all_valid:
+        # Rows missing in every column only at the start (a diff, an indicator's
+        # warm-up) need no filling; the recursion starts after them
+        start = int(np.argmax(valid.any(axis=1)))
+        if start and valid[start:].all():
+            out[start:] = _ewma(arr[start:], alpha, min_periods)
+            return out
+    if all_valid:
+        filled = arr
+    else:
+        filled = _ffill(arr)
+        first = np.argmax(valid, axis=0)
+        has_value = valid.any(axis=0)
+        # Back-fill the leading NaNs with the first value so y starts exactly there
+        seed = np.where(has_value, filled[first, np.arange(k)], 0.0)
+        filled = np.where(np.isnan(filled), seed, filled)
+
+    decay = 1.0 - alpha
+    if decay <= 0.0:
+        out[:] = filled
+    else:
+        block = min(n, max(1, int(500 / -np.log(decay))))
+        inverse, scaled, carried = _ewma_weights(alpha, block)
+        prev = filled[0]
+        for start in range(0, n, block):
+            x = filled[start:start + block]
+            rows = x.shape[0]
+            y = np.cumsum(x * inverse[:rows], axis=0)
+            y *= scaled[:rows]
+            y += carried[:rows] * prev
+            out[start:start + block] = y
+            prev = y[-1]
+
+    if all_valid:
+        out[:max(min_periods, 1) - 1] = np.nan
+    else:
+        counts = np.cumsum(valid, axis=0)
+        out[counts < max(min_periods, 1)] = np.nan
+    return out
+
+
+def sma(prices, window: int) -> np.ndarray:
+    """Simple moving average computed from cumulative sums."""
+    return _rolling_sum(_as_2d(prices), window) / window
+
+
+def ema(prices, span: int) -> np.ndarray:
+    """Exponential moving average with the usual 2 / (span + 1) smoothing."""
+    return _ewma(prices, 2.0 / (span + 1), min_periods=span)
+
+
+def rsi(close, window: int = 14) -> np.ndarray:
+    """Relative Strength Index using Wilder's smoothing."""
+    arr = _as_2d(close)
+    delta = np.diff(arr, axis=0, prepend=np.nan)
+    # Gains and losses side by side, so one smoothing pass covers both
+    averages = _ewma(np.hstack([np.clip(delta, 0, None), np.clip(-delta, 0, None)]), 1.0 / window, min_periods=window)
+    avg_gain, avg_loss = averages[:, :arr.shape[1]], averages[:, arr.shape[1]:]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    # No losses in the window means maximum strength
+    out[(avg_loss == 0) & ~np.isnan(avg_gain)] = 100.0
+    return out
+
+
+def macd(close, fast: int = 12, slow: int = 26, signal: int = 9):
+    """Return (macd line, signal line, histogram)."""
+    return _macd_from_emas(ema(close, fast), ema(close, slow), signal)
+
+
+def _macd_from_emas(fast_ema: np.ndarray, slow_ema: np.ndarray, signal: int):
+    line = fast_ema - slow_ema
+    signal_line = _ewma(line, 2.0 / (signal + 1), min_periods=signal)
+    return line, signal_line, line - signal_line
+
+
+def bollinger(close, window: int = 20, num_std: float = 2.0):
+    """Return (middle, upper, lower) Bollinger bands."""
+    arr = _as_2d(close)
+    middle = sma(arr, window)
+    std = _rolling_std(arr, window, ddof=0)
+    return middle, middle + num_std * std, middle - num_std * std
+
+
+def atr(high, low, close, window: int = 14) -> np.ndarray:
+    """Average True Range using Wilder's smoothing."""
+    high, low, close = _as_2d(high), _as_2d(low), _as_2d(close)
+    prev_close = np.vstack([np.full((1, close.shape[1]), np.nan), close[:-1]])
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    return _ewma(true_range, 1.0 / window, min_periods=window)
+
+
+def realized_volatility(close, window: int = 20, periods_per_year: int = TRADING_DAYS_PER_YEAR) -> np.ndarray:
+    """Annualized rolling standard deviation of daily log returns."""
+    arr = _as_2d(close)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_returns = np.diff(np.log(arr), axis=0, prepend=np.nan)
+    return _rolling_std(log_returns, window) * np.sqrt(periods_per_year)
+
+
+def drawdown(close) -> np.ndarray:
+    """Fractional drawdown from the running peak (0 at a new high, negative below it)."""
+    arr = _as_2d(close)
+    peak = np.fmax.accumulate(arr, axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return arr / peak - 1.0
+
+
+def _last_valid(values: np.ndarray) -> np.ndarray:
+    """Return the most recent non-NaN value in each column."""
+    values = _as_2d(values)
+    if values.shape[0] == 0:
+        return np.full(values.shape[1], np.nan)
+    if not np.isnan(values[-1]).any():
+        return values[-1].copy()
+    valid = ~np.isnan(values)
+    has_value = valid.any(axis=0)
+    last_idx = values.shape[0] - 1 - np.argmax(valid[::-1], axis=0)
+    out = values[last_idx, np.arange(values.shape[1])]
+    out[~has_value] = np.nan
+    return out
+
+
+def _tail(arr: np.ndarray, rows: int):
+    """The last rows of arr, or None when there are too few or any is NaN.
+
+    Window indicators only need these rows for their latest value; with a gap
+    in them the latest valid value lies further back and needs the full series.
+    """
+    if rows <= 0 or arr.shape[0] < rows:
+        return None
+    tail = arr[-rows:]
+    return None if np.isnan(tail).any() else tail
+
+
+def compute_indicators(close, high=None, low=None, windows: dict = None) -> dict:
+    """Compute the latest value of every indicator for each column of close.
+
+    Returns {indicator name: 1-D array with one value per ticker}. ATR is only
+    included when high and low are given. Moving-window indicators are
+    computed from the last window of rows when it is complete, and recursive
+    ones (EMA, RSI, MACD, ATR) over the full history.
+    """
+    w = dict(DEFAULT_WINDOWS, **(windows or {}))
+    close = _as_2d(close)
+    latest = {"close": _last_valid(close)}
+
+    for window in w["sma"]:
+        tail = _tail(close, window)
+        latest[f"sma_{window}"] = tail.mean(axis=0) if tail is not None else _last_valid(sma(close, window))
+    # The MACD reuses the EMAs computed for the table when the spans match
+    fast, slow, signal = w["macd"]
+    emas = {span: ema(close, span) for span in dict.fromkeys((*w["ema"], fast, slow))}
+    for span in w["ema"]:
+        latest[f"ema_{span}"] = _last_valid(emas[span])
+
+    latest[f"rsi_{w['rsi']}"] = _last_valid(rsi(close, w["rsi"]))
+
+    line, signal_line, histogram = _macd_from_emas(emas[fast], emas[slow], signal)
+    latest["macd"] = _last_valid(line)
+    latest["macd_signal"] = _last_valid(signal_line)
+    latest["macd_hist"] = _last_valid(histogram)
+
+    tail = _tail(close, w["bollinger"])
+    if tail is not None:
+        middle, std = tail.mean(axis=0), tail.std(axis=0)
+        latest["bb_upper"] = middle + w["bollinger_std"] * std
+        latest["bb_lower"] = middle - w["bollinger_std"] * std
+    else:
+        middle, upper, lower = bollinger(close, w["bollinger"], w["bollinger_std"])
+        latest["bb_upper"] = _last_valid(upper)
+        latest["bb_lower"] = _last_valid(lower)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        latest["bb_pct_b"] = (latest["close"] - latest["bb_lower"]) / (latest["bb_upper"] - latest["bb_lower"])
+
+    if high is not None and low is not None:
+        latest[f"atr_{w['atr']}"] = _last_valid(atr(high, low, close, w["atr"]))
+
+    tail = _tail(close, w["volatility"] + 1)
+    if tail is not None and w["volatility"] > 1:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            log_returns = np.diff(np.log(tail), axis=0)
+        volatility = log_returns.std(axis=0, ddof=1) * np.sqrt(TRADING_DAYS_PER_YEAR)
+    else:
+        volatility = _last_valid(realized_volatility(close, w["volatility"]))
+    latest[f"volatility_{w['volatility']}d"] = volatility
+
+    dd = drawdown(close)
+    latest["drawdown"] = _last_valid(dd)
+    latest["max_drawdown"] = np.fmin.reduce(dd, axis=0) if dd.size else np.full(close.shape[1], np.nan)
+
+    return latest
+
+
+def indicator_table(histories: dict, windows: dict = None) -> pd.DataFrame:
+    """Build a (ticker x indicator) table from {ticker: history DataFrame}.
+
+    The histories are aligned on their dates into 2-D arrays so all tickers are
+    computed in one pass.
+    """
+    frames = {t: h for t, h in histories.items() if h is not None and not h.empty}
+    if not frames:
+        return pd.DataFrame()
+
+    close = pd.DataFrame({t: h["Close"] for t, h in frames.items()})
+    high = pd.DataFrame({t: h["High"] for t, h in frames.items()}).reindex(close.index)
+    low = pd.DataFrame({t: h["Low"] for t, h in frames.items()}).reindex(close.index)
+
+    latest = compute_indicators(close.to_numpy(), high.to_numpy(), low.to_numpy(), windows)
+    return pd.DataFrame(latest, index=close.columns)
+
+
+def format_indicator_summary(row: pd.Series, as_of=None, windows: dict = None) -> str:
+    """Render one ticker's indicators as a compact, prompt-friendly block."""
+    w = dict(DEFAULT_WINDOWS, **(windows or {}))
+
+    def fmt(name, pct=False):
+        value = row.get(name, np.nan)
+        if pd.isna(value):
+            return "N/A"
+        return f"{value * 100:.1f}%" if pct else f"{value:,.2f}"
+
+    sma_part = ", ".join(f"SMA{n} {fmt(f'sma_{n}')}" for n in w["sma"])
+    ema_part = ", ".join(f"EMA{n} {fmt(f'ema_{n}')}" for n in w["ema"])
+    rsi_name = f"rsi_{w['rsi']}"
+    atr_name = f"atr_{w['atr']}"
+    vol_name = f"volatility_{w['volatility']}d"
+
+    header = "Technical Indicators"
+    if as_of is not None:
+        header += f" (as of {as_of})"
+
+    return (
+        f"{header}:\n"
+        f"Close: {fmt('close')} | {sma_part} | {ema_part}\n"
+        f"RSI{w['rsi']}: {fmt(rsi_name)} | MACD: {fmt('macd')} "
+        f"(signal {fmt('macd_signal')}, hist {fmt('macd_hist')})\n"
+        f"Bollinger: {fmt('bb_lower')} - {fmt('bb_upper')} (%B {fmt('bb_pct_b')}) | "
+        f"ATR{w['atr']}: {fmt(atr_name)}\n"
+        f"Volatility ({w['volatility']}d, annualized): {fmt(vol_name, pct=True)} | "
+        f"Drawdown: {fmt('drawdown', pct=True)} (max {fmt('max_drawdown', pct=True)})\n"
+    )
@@ -0,0 +1,209 @@
+import hashlib
+import json
+import os
+import threading
+from crewai import LLM
+from cache_store import SQLiteTTLCache
+from rate_limiter import (LLM_RATE_LIMIT, LLM_RATE_MAX_RETRIES, get_rate_scheduler, is_rate_limit_error,
+                          retry_after_seconds)
+from tracing import add_task_tokens, current_span, span, task_attributes
+
+# The response cache is opt-in; LLM_CACHE_BYPASS skips lookups without disabling writes
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE", "false").lower() in ("1", "true", "yes")
+LLM_CACHE_BYPASS = os.getenv("LLM_CACHE_BYPASS", "false").lower() in ("1", "true", "yes")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join("db", "llm_cache.sqlite3"))
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2000"))
+
+# Sampling parameters that change the response and therefore belong in the key
+_KEY_PARAMS = ("temperature", "top_p", "max_tokens", "max_completion_tokens", "stop", "seed",
+               "presence_penalty", "frequency_penalty", "response_format")
+
+# Constructor settings carried over when an LLM is copied (the ones LLM.__copy__ passes on)
+_COPY_FIELDS = ("is_litellm", "temperature", "top_p", "n", "max_completion_tokens", "max_tokens",
+                "presence_penalty", "frequency_penalty", "logit_bias", "response_format", "seed", "logprobs",
+                "top_logprobs", "base_url", "api_base", "api_version", "api_key", "callbacks",
+                "reasoning_effort", "stream", "stop", "prefer_upload")
+
+
+def _estimate_tokens(text: str) -> int:
+    """Rough token estimate (about four characters per token)."""
+    return max(1, len(text) // 4)
+
+
+def _prompt_text(messages) -> str:
+    return messages if isinstance(messages, str) else json.dumps(messages, default=str)
+
+
+# crewai wraps LLM.call in its own short 429 retry loop; calling the unwrapped
+# method lets every 429 reach the shared scheduler, which backs off for all crews
+_provider_call = getattr(LLM.call, "__wrapped__", LLM.call)
+
+
+class LLMResponseCache:
+    """Content-addressed store of LLM responses with hit-rate and saved-token accounting."""
+
+    def __init__(self, path: str = LLM_CACHE_PATH, ttl: float = LLM_CACHE_TTL,
+                 max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self._store = SQLiteTTLCache(path, max_entries=max_entries)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_tokens = 0
+
+    @staticmethod
+    def make_key(model: str, messages, params: dict) -> str:
+        """Hash the model, messages and sampling parameters into a cache key."""
+        payload = json.dumps(
+            {"model": model, "messages": messages, "params": params},
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        entry = self._store.get(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.saved_tokens += entry["tokens"]
+        return entry["response"]
+
+    def set(self, key: str, response: str, prompt: str):
+        tokens = _estimate_tokens(prompt) + _estimate_tokens(response)
+        self._store.set(key, {"response": response, "tokens": tokens}, self.ttl)
+
+    def clear(self):
+        self._store.clear()
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.saved_tokens = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "saved_tokens": self.saved_tokens,
+            "entries": self._store.stats()["entries"],
+        }
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> LLMResponseCache:
+    """Return the process-wide LLM response cache, creating it on first use."""
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = LLMResponseCache()
+        return _response_cache
+
+
+class CachedLLM(LLM):
+    """LLM that serves repeated prompts from the local response cache.
+
+    Only plain text completions are cached; calls that pass tools go straight
+    to the provider because their results can trigger side effects. Caching is
+    controlled by LLM_CACHE and can be bypassed per instance with
+    set_cache_bypass() or globally with LLM_CACHE_BYPASS.
+
+    Calls that reach the provider are paced by the shared rate scheduler
+    (LLM_RATE_LIMIT), which reserves the prompt estimate plus max_tokens
+    before each request and refunds the unused part afterwards.
+    """
+
+    def __copy__(self):
+        # LLM.__copy__ always builds a plain LLM, and Agent.copy / Crew.copy go
+        # through it, so per-run crew copies would lose the cache and scheduler
+        settings = {name: getattr(self, name) for name in _COPY_FIELDS if hasattr(self, name)}
+        extra = {k: v for k, v in (self.additional_params or {}).items() if k != "model" and k not in settings}
+        copied = type(self)(model=self.model, **settings, **extra)
+        if getattr(self, "_cache_bypass", False):
+            copied.set_cache_bypass(True)
+        return copied
+
+    def __deepcopy__(self, memo=None):
+        return self.__copy__()
+
+    def set_cache_bypass(self, bypass: bool = True):
+        self._cache_bypass = bypass
+
+    def _cache_params(self) -> dict:
+        params = {name: getattr(self, name, None) for name in _KEY_PARAMS}
+        params.update(getattr(self, "additional_params", None) or {})
+        return params
+
+    def _call_upstream(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs):
+        if not LLM_RATE_LIMIT:
+            return super().call(messages, tools=tools, callbacks=callbacks,
+                                available_functions=available_functions, **kwargs)
+
+        scheduler = get_rate_scheduler()
+        prompt_tokens = _estimate_tokens(_prompt_text(messages))
+        reserved = prompt_tokens + int(self.max_tokens or 0)
+        # Crew copies are per report run, so waiting calls are shared fairly between runs
+        crew = getattr(kwargs.get("from_agent"), "crew", None)
+        job = id(crew) if crew is not None else threading.get_ident()
+
+        waited = 0.0
+        for attempt in range(LLM_RATE_MAX_RETRIES + 1):
+            waited += scheduler.acquire(reserved, job)
+            try:
+                response = _provider_call(self, messages, tools=tools, callbacks=callbacks,
+                                          available_functions=available_functions, **kwargs)
+            except Exception as e:
+                # A failed call used no tokens; without the refund every retry drains the bucket again
+                scheduler.settle(reserved, 0)
+                if not is_rate_limit_error(e) or attempt == LLM_RATE_MAX_RETRIES:
+                    raise
+                pause = scheduler.record_rate_limited(retry_after_seconds(e))
+                print(f"Groq rate limit hit; pausing all LLM calls for {pause:.1f}s")
+                continue
+
+            scheduler.record_success()
+            current_span().set(rate_wait_ms=round(waited * 1000, 1), rate_limited=attempt)
+            used = prompt_tokens + (_estimate_tokens(response) if isinstance(response, str) else 0)
+            scheduler.settle(reserved, used)
+            return response
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs):
+        task = kwargs.get("from_task")
+        attributes = {"task": getattr(kwargs.get("from_agent"), "role", None), **task_attributes(task)}
+        with span("llm.call", model=self.model, **attributes) as current:
+            response = self._call_cached(messages, tools, callbacks, available_functions, **kwargs)
+            prompt_tokens = _estimate_tokens(_prompt_text(messages))
+            completion_tokens = _estimate_tokens(response) if isinstance(response, str) else 0
+            current.set(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        add_task_tokens(task, prompt_tokens + completion_tokens)
+        return response
+
+    # Keep crewai from wrapping this method in its own 429 retry loop as well:
+    # retries here already go through the scheduler (or LLM.call's loop when it is off)
+    call._crewai_rate_limit_wrapped = True
+
+    def _call_cached(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs):
+        if not LLM_CACHE_ENABLED or tools:
+            return self._call_upstream(messages, tools, callbacks, available_functions, **kwargs)
+
+        cache = get_response_cache()
+        key = cache.make_key(self.model, messages, self._cache_params())
+        bypass = LLM_CACHE_BYPASS or getattr(self, "_cache_bypass", False)
+
+        if not bypass:
+            cached = cache.get(key)
+            if cached is not None:
+                current_span().set(cached=True)
+                return cached
+
+        response = self._call_upstream(messages, tools, callbacks, available_functions, **kwargs)
+        if isinstance(response, str) and response:
+            cache.set(key, response, _prompt_text(messages))
+        return response
@@ -0,0 +1,111 @@
+import os
+import re
+from datetime import date, timedelta
+import yfinance as yf
+from cache_store import SQLiteTTLCache
+from price_store import PriceStore
+from tracing import span
+
+# Time-to-live per kind of yfinance data, in seconds
+QUOTE_TTL = int(os.getenv("YF_QUOTE_TTL", "60"))                  # quote info
+STATEMENT_TTL = int(os.getenv("YF_STATEMENT_TTL", str(24 * 3600)))  # financial statements
+NEWS_TTL = int(os.getenv("YF_NEWS_TTL", str(15 * 60)))              # news headlines
+
+CACHE_PATH = os.getenv("YF_CACHE_PATH", os.path.join("db", "yf_cache.sqlite3"))
+CACHE_MAX_ENTRIES = int(os.getenv("YF_CACHE_MAX_ENTRIES", "5000"))
+
+# Upper bound on concurrent yfinance requests made by the batch helpers
+MAX_FETCH_WORKERS = int(os.getenv("MAX_FETCH_WORKERS", "8"))
+
+_cache = SQLiteTTLCache(CACHE_PATH, max_entries=CACHE_MAX_ENTRIES)
+
+# Daily bars are kept in a local incremental store instead of the TTL cache
+_price_store = PriceStore()
+
+_PERIOD_DAYS = {"d": 1, "wk": 7, "mo": 31, "y": 366}
+
+# Hit/miss counters broken down by data kind
+_kind_stats = {}
+
+
+def cached(kind: str, ticker: str, loader, ttl: float, extra: str = ""):
+    """Look up a yfinance payload in the cache, loading and storing it on a miss."""
+    key = f"{kind}:{ticker.upper()}:{extra}"
+    counters = _kind_stats.setdefault(kind, {"hits": 0, "misses": 0})
+
+    sentinel = object()
+    value = _cache.get(key, sentinel)
+    if value is not sentinel:
+        counters["hits"] += 1
+        return value
+
+    counters["misses"] += 1
+    # Only misses are traced: they are the calls that go out to Yahoo Finance
+    with span(f"yfinance.{kind}", ticker=ticker.upper()):
+        value = loader()
+    _cache.set(key, value, ttl)
+    return value
+
+
+def get_info(ticker: str) -> dict:
+    """Return ``Ticker.info`` for ticker, cached for QUOTE_TTL seconds."""
+    return cached("info", ticker, lambda: yf.Ticker(ticker).info, QUOTE_TTL)
+
+
+def _period_start(period: str):
+    """Translate a yfinance period string such as "1mo" or "5y" into a start date."""
+    if period == "max":
+        return None
+    if period == "ytd":
+        return date(date.today().year, 1, 1)
+    match = re.fullmatch(r"(\d+)(d|wk|mo|y)", period)
+    if not match:
+        raise ValueError(f"Unsupported history period: {period}")
+    return date.today() - timedelta(days=int(match.group(1)) * _PERIOD_DAYS[match.group(2)])
+
+
+def get_history(ticker: str, period: str = "1mo"):
+    """Return daily bars for ticker over period from the local price store.
+
+    Only bars newer than the last stored one are downloaded, at most once per
+    PRICE_STORE_REFRESH seconds.
+    """
+    return _price_store.get_history(ticker.upper(), start=_period_start(period))
+
+
+def get_histories(tickers: list, period: str = "1mo") -> dict:
+    """Return {ticker: history DataFrame} for many tickers.
+
+    Missing bars for all stale tickers are fetched with a single ``yf.download``
+    call before the ranges are read from the local price store.
+    """
+    tickers = [t.upper() for t in tickers]
+    start = _period_start(period)
+    _price_store.update_many(tickers)
+    return {t: _price_store.get_history(t, start=start, refresh=False) for t in tickers}
+
+
+def get_statements(ticker: str):
+    """Return (income_stmt, balance_sheet, cashflow) for ticker, cached for STATEMENT_TTL seconds."""
+    def load():
+        stock = yf.Ticker(ticker)
+        return stock.income_stmt, stock.balance_sheet, stock.cashflow
+
+    return cached("statements", ticker, load, STATEMENT_TTL)
+
+
+def get_news(ticker: str) -> list:
+    """Return ``Ticker.news`` for ticker, cached for NEWS_TTL seconds."""
+    return cached("news", ticker, lambda: yf.Ticker(ticker).news, NEWS_TTL)
+
+
+def cache_stats() -> dict:
+    """Return overall and per-kind cache hit/miss counters."""
+    stats = _cache.stats()
+    stats["by_kind"] = {kind: dict(counters) for kind, counters in _kind_stats.items()}
+    return stats
+
+
+def clear_cache():
+    _cache.clear()
+    _kind_stats.clear()
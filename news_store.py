@@ -0,0 +1,262 @@
+"""Per-ticker news store with near-duplicate collapsing and ranked selection.
+
+Every headline fetched for a ticker is remembered in a small SQLite store.
+A fetch only processes items whose id it has not stored yet, however late
+they arrive; each new headline gets a MinHash signature over its character
+shingles and joins the story cluster of the most similar stored headline
+when their estimated similarity reaches NEWS_DEDUP_THRESHOLD, so syndicated
+copies of one story count once. ``top`` ranks one representative per story
+by recency, relevance to the company and how widely it was carried.
+"""
+import hashlib
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from market_data import get_news
+from ticker_index import get_ticker_index, is_generic_name, normalize_name
+
+NEWS_STORE_PATH = os.getenv("NEWS_STORE_PATH", os.path.join("db", "news.sqlite3"))
+# Stories handed to the news agent
+NEWS_TOP_K = int(os.getenv("NEWS_TOP_K", "7"))
+# Estimated shingle similarity (0-1) at which two headlines are the same story
+NEWS_DEDUP_THRESHOLD = float(os.getenv("NEWS_DEDUP_THRESHOLD", "0.5"))
+# Hours after which a story's recency weight has halved
+NEWS_HALF_LIFE_HOURS = float(os.getenv("NEWS_HALF_LIFE_HOURS", "48"))
+# Stored items older than this are dropped
+NEWS_RETENTION_DAYS = int(os.getenv("NEWS_RETENTION_DAYS", "30"))
+
+_SHINGLE_SIZE = 4
+_NUM_PERMUTATIONS = 64
+# Hashes and permutation coefficients stay below 2**31, so a * x + b fits in uint64
+_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(20240601)
+_PERM_A = _rng.integers(1, _PRIME, _NUM_PERMUTATIONS, dtype=np.uint64)[:, None]
+_PERM_B = _rng.integers(0, _PRIME, _NUM_PERMUTATIONS, dtype=np.uint64)[:, None]
+
+
+def _normalize_text(text: str) -> str:
+    return " ".join(re.sub(r"[^a-z0-9 ]+", " ", (text or "").lower()).split())
+
+
+def minhash(text: str) -> np.ndarray:
+    """MinHash signature of the character shingles of text."""
+    text = _normalize_text(text)
+    shingles = {text[i:i + _SHINGLE_SIZE] for i in range(max(1, len(text) - _SHINGLE_SIZE + 1))}
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") % _PRIME
+         for s in shingles],
+        dtype=np.uint64,
+    )
+    return ((_PERM_A * hashes + _PERM_B) % _PRIME).min(axis=1)
+
+
+def similarity(signatures: np.ndarray, signature: np.ndarray) -> np.ndarray:
+    """Estimated Jaccard similarity of one signature against each row of signatures."""
+    return (signatures == signature).mean(axis=1)
+
+
+def _timestamp(value) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str) and value:
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+        except ValueError:
+            pass
+    return 0.0
+
+
+def mentions_ticker(title: str, ticker: str) -> bool:
+    """Whether title cites ticker as a symbol: "$ON", "(ON)" or a standalone uppercase "ON".
+
+    The match is case-sensitive so short tickers (ON, A, IT, NOW) do not hit
+    ordinary words. In an all-caps headline, and for one-letter tickers that
+    read like "A" or "I", only "$ON" and "(ON)" count.
+    """
+    title = title or ""
+    symbol = re.escape(ticker.upper())
+    if re.search(rf"\${symbol}(?![\w.-])|\({symbol}\)", title):
+        return True
+    if title == title.upper() or len(ticker) == 1:
+        return False
+    return re.search(rf"(?<![\w$.-]){symbol}(?![\w.-])", title) is not None
+
+
+def normalize_item(raw: dict) -> dict:
+    """Flatten a yfinance news item (old flat or current nested "content" layout).
+
+    Returns a dict with id, title, summary, publisher, link and
+    providerPublishTime (epoch seconds), the keys the fetchers read.
+    """
+    content = raw.get("content") or raw
+    provider = content.get("provider") or {}
+    url = (content.get("canonicalUrl") or content.get("clickThroughUrl") or {})
+    link = raw.get("link") or (url.get("url") if isinstance(url, dict) else None)
+    title = (content.get("title") or "").strip()
+    return {
+        "id": str(raw.get("id") or raw.get("uuid") or link or title),
+        "title": title,
+        "summary": (content.get("summary") or content.get("description") or "").strip(),
+        "publisher": raw.get("publisher") or (provider.get("displayName") if isinstance(provider, dict) else None),
+        "link": link,
+        "providerPublishTime": _timestamp(raw.get("providerPublishTime") or content.get("pubDate")),
+    }
+
+
+class NewsStore:
+    """SQLite store of seen news items per ticker, clustered into stories."""
+
+    def __init__(self, path: str = NEWS_STORE_PATH, threshold: float = NEWS_DEDUP_THRESHOLD,
+                 half_life_hours: float = NEWS_HALF_LIFE_HOURS, retention_days: int = NEWS_RETENTION_DAYS):
+        self.path = path
+        self.threshold = threshold
+        self.half_life = half_life_hours * 3600
+        self.retention = retention_days * 86400
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS items (
+                ticker TEXT NOT NULL,
+                item_id TEXT NOT NULL,
+                title TEXT NOT NULL,
+                summary TEXT,
+                publisher TEXT,
+                link TEXT,
+                published REAL NOT NULL,
+                fetched_at REAL NOT NULL,
+                story TEXT NOT NULL,
+                signature BLOB NOT NULL,
+                PRIMARY KEY (ticker, item_id)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_items_published ON items(ticker, published)")
+        self._conn.commit()
+
+    def update(self, ticker: str, raw_items: list) -> int:
+        """Store the items not seen before for ticker; returns how many were new."""
+        ticker = ticker.upper()
+        items = [normalize_item(raw) for raw in raw_items or []]
+        items = [item for item in items if item["title"]]
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM items WHERE published < ?", (now - self.retention,))
+            rows = self._conn.execute(
+                "SELECT item_id, story, signature FROM items WHERE ticker = ?", (ticker,)
+            ).fetchall()
+            seen = {row[0] for row in rows}
+            stories = [row[1] for row in rows]
+            signatures = [np.frombuffer(row[2], dtype=np.uint64) for row in rows]
+
+            added = 0
+            for item in sorted(items, key=lambda i: i["providerPublishTime"]):
+                if item["id"] in seen:
+                    continue
+                signature = minhash(item["title"])
+                story = item["id"]
+                if signatures:
+                    scores = similarity(np.vstack(signatures), signature)
+                    best = int(scores.argmax())
+                    if scores[best] >= self.threshold:
+                        story = stories[best]
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO items VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (ticker, item["id"], item["title"], item["summary"], item["publisher"], item["link"],
+                     item["providerPublishTime"] or now, now, story, signature.tobytes()),
+                )
+                seen.add(item["id"])
+                stories.append(story)
+                signatures.append(signature)
+                added += 1
+            self._conn.commit()
+        return added
+
+    def top(self, ticker: str, limit: int = NEWS_TOP_K, names=()) -> list:
+        """Return up to limit stories for ticker, best first, as normalized item dicts.
+
+        Each story is represented by its earliest headline; "sources" is how
+        many stored items were collapsed into it. A story scores higher the
+        newer its latest item, when its title mentions the ticker (see
+        mentions_ticker) or its text one of names, and (logarithmically) the
+        more sources carried it.
+        """
+        ticker = ticker.upper()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT item_id, title, summary, publisher, link, published, story FROM items "
+                "WHERE ticker = ? ORDER BY published",
+                (ticker,),
+            ).fetchall()
+
+        stories = {}
+        for item_id, title, summary, publisher, link, published, story in rows:
+            entry = stories.get(story)
+            if entry is None:
+                stories[story] = entry = {
+                    "id": item_id, "title": title, "summary": summary or "", "publisher": publisher,
+                    "link": link, "providerPublishTime": published, "sources": 0, "latest": published,
+                }
+            entry["sources"] += 1
+            entry["latest"] = max(entry["latest"], published)
+
+        terms = [t for t in (_normalize_text(n) for n in names if n) if t]
+        now = time.time()
+
+        def score(entry):
+            text = f" {_normalize_text(entry['title'] + ' ' + entry['summary'])} "
+            relevance = 1.0 if (mentions_ticker(entry["title"], ticker)
+                                or any(f" {term} " in text for term in terms)) else 0.0
+            recency = 0.5 ** (max(0.0, now - entry["latest"]) / self.half_life)
+            return recency * (1 + relevance) * (1 + math.log(entry["sources"]))
+
+        ranked = sorted(stories.values(), key=score, reverse=True)[:limit]
+        for entry in ranked:
+            del entry["latest"]
+        return ranked
+
+    def clear(self, ticker: str = None):
+        with self._lock:
+            if ticker is None:
+                self._conn.execute("DELETE FROM items")
+            else:
+                self._conn.execute("DELETE FROM items WHERE ticker = ?", (ticker.upper(),))
+            self._conn.commit()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_news_store() -> NewsStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = NewsStore()
+        return _store
+
+
+def ranked_news(ticker: str, limit: int = NEWS_TOP_K) -> list:
+    """Fetch news for ticker (cached for YF_NEWS_TTL), store new items and return the top stories."""
+    store = get_news_store()
+    store.update(ticker, get_news(ticker))
+    name = normalize_name(get_ticker_index().names.get(ticker.upper()) or "")
+    names = [name] if name else []
+    # Headlines often use just the first word ("JPMorgan", "Berkshire"), unless it is as generic as
+    # "General" or as short as the "on" of "ON Semiconductor", which would match like the ticker did
+    first_word = name.split()[0] if name else ""
+    if len(first_word) > 2 and first_word != name and not is_generic_name(first_word):
+        names.append(first_word)
+    return store.top(ticker, limit, names=names)
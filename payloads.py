@@ -0,0 +1,332 @@
+"""Typed fetcher results and a compact serializer for prompt inputs.
+
+The string fetchers in custom_tools spell every field out on its own line,
+print raw integers for market caps and include full news links. These
+payloads hold the same data as typed fields; ``serialize`` renders them as a
+few dense lines with missing fields dropped, large numbers scaled to K/M/B/T
+and output cut to a token budget, dropping the least important lines first.
+``serialize_task`` shares one budget between the payloads of one task prompt.
+"""
+import math
+import os
+from dataclasses import dataclass, field, fields
+from datetime import datetime
+from typing import Optional
+
+import pandas as pd
+
+from fundamentals import PERCENT_RATIOS, RATIO_LABELS
+from indicators import DEFAULT_WINDOWS
+
+# Approximate tokens the serialized payloads of one task prompt may use together
+PAYLOAD_TOKEN_BUDGET = int(os.getenv("PAYLOAD_TOKEN_BUDGET", "300"))
+
+_SCALES = ((1e12, "T"), (1e9, "B"), (1e6, "M"), (1e3, "K"))
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (about four characters per token)."""
+    return max(1, len(text) // 4)
+
+
+def _number(value) -> Optional[float]:
+    """Return value as a finite float, or None for missing, NaN and non-numeric values."""
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+
+def format_number(value, kind: str = "num") -> Optional[str]:
+    """Format a number for a prompt, or return None if it is missing.
+
+    kind is "num", "money" (prefixed with $) or "pct" (a fraction shown as a
+    percentage). Magnitudes of ten thousand and up are scaled to K/M/B/T.
+    """
+    value = _number(value)
+    if value is None:
+        return None
+    if kind == "pct":
+        return f"{value * 100:.1f}%"
+
+    prefix = "$" if kind == "money" else ""
+    sign = "-" if value < 0 else ""
+    magnitude = abs(value)
+    if magnitude >= 1e4:
+        for threshold, suffix in _SCALES:
+            if magnitude >= threshold:
+                return f"{sign}{prefix}{magnitude / threshold:.1f}{suffix}"
+    return f"{sign}{prefix}{magnitude:.2f}".rstrip("0").rstrip(".")
+
+
+def _pairs(items) -> str:
+    """Join (label, value, kind) triples as "label value | ..." skipping missing values."""
+    parts = []
+    for label, value, kind in items:
+        text = format_number(value, kind)
+        if text is not None:
+            parts.append(f"{label} {text}")
+    return " | ".join(parts)
+
+
+def _field_pairs(payload, names) -> str:
+    meta = {f.name: f.metadata for f in fields(payload)}
+    return _pairs((meta[name]["label"], getattr(payload, name), meta[name].get("kind", "num")) for name in names)
+
+
+def _value(label: str, kind: str = "num"):
+    return field(default=None, metadata={"label": label, "kind": kind})
+
+
+@dataclass(slots=True)
+class Quote:
+    """Company profile and latest quote from ``Ticker.info``."""
+
+    ticker: str
+    name: Optional[str] = None
+    sector: Optional[str] = None
+    industry: Optional[str] = None
+    price: Optional[float] = _value("Price", "money")
+    previous_close: Optional[float] = _value("Prev", "money")
+    open: Optional[float] = _value("Open", "money")
+    day_high: Optional[float] = _value("High", "money")
+    day_low: Optional[float] = _value("Low", "money")
+    week52_high: Optional[float] = _value("52w High", "money")
+    week52_low: Optional[float] = _value("52w Low", "money")
+    market_cap: Optional[float] = _value("Mkt Cap", "money")
+    revenue: Optional[float] = _value("Revenue", "money")
+    volume: Optional[float] = _value("Vol")
+    average_volume: Optional[float] = _value("Avg Vol")
+    pe: Optional[float] = _value("P/E")
+    eps: Optional[float] = _value("EPS", "money")
+    debt_to_equity: Optional[float] = _value("D/E")
+    dividend_yield: Optional[float] = _value("Div Yield")
+    book_value: Optional[float] = _value("Book/Share", "money")
+    price_to_book: Optional[float] = _value("P/B")
+    beta: Optional[float] = _value("Beta")
+
+    @classmethod
+    def from_info(cls, ticker: str, info: dict) -> "Quote":
+        return cls(
+            ticker=ticker,
+            name=info.get("longName") or info.get("shortName"),
+            sector=info.get("sector"),
+            industry=info.get("industry"),
+            price=info.get("currentPrice", info.get("regularMarketPrice")),
+            previous_close=info.get("previousClose"),
+            open=info.get("open"),
+            day_high=info.get("dayHigh"),
+            day_low=info.get("dayLow"),
+            week52_high=info.get("fiftyTwoWeekHigh"),
+            week52_low=info.get("fiftyTwoWeekLow"),
+            market_cap=info.get("marketCap"),
+            revenue=info.get("totalRevenue"),
+            volume=info.get("volume"),
+            average_volume=info.get("averageVolume"),
+            pe=info.get("forwardPE", info.get("trailingPE")),
+            eps=info.get("trailingEps"),
+            debt_to_equity=info.get("debtToEquity"),
+            dividend_yield=info.get("dividendYield"),
+            book_value=info.get("bookValue"),
+            price_to_book=info.get("priceToBook"),
+            beta=info.get("beta"),
+        )
+
+    def lines(self) -> list:
+        profile = ", ".join(part for part in (self.sector, self.industry) if part)
+        header = f"{self.ticker}: {self.name or self.ticker}" + (f" ({profile})" if profile else "")
+        return [
+            header,
+            _field_pairs(self, ("price", "previous_close", "open", "day_high", "day_low")),
+            _field_pairs(self, ("market_cap", "revenue", "pe", "eps", "price_to_book", "debt_to_equity")),
+            _field_pairs(self, ("week52_high", "week52_low", "beta", "dividend_yield", "book_value")),
+            _field_pairs(self, ("volume", "average_volume")),
+        ]
+
+
+# Latest-period statement lines, grouped as they are printed
+_STATEMENT_ITEMS = (
+    ("Income", 0, ("Total Revenue", "Gross Profit", "Operating Income", "Net Income")),
+    ("Balance", 1, ("Total Assets", "Total Debt", "Stockholders Equity", "Cash And Cash Equivalents")),
+    ("Cash Flow", 2, ("Operating Cash Flow", "Investing Cash Flow", "Financing Cash Flow")),
+)
+_SHORT_LABELS = {
+    "Total Revenue": "Revenue", "Stockholders Equity": "Equity", "Cash And Cash Equivalents": "Cash",
+    "Operating Cash Flow": "Operating", "Investing Cash Flow": "Investing", "Financing Cash Flow": "Financing",
+}
+
+
+@dataclass(slots=True)
+class Financials:
+    """Latest statement line items plus a few periods of ratio history."""
+
+    ticker: str
+    period: Optional[str] = None
+    statements: dict = field(default_factory=dict)
+    ratio_periods: list = field(default_factory=list)
+    ratios: dict = field(default_factory=dict)
+
+    @classmethod
+    def from_statements(cls, ticker: str, statements, ratio_table: pd.DataFrame = None,
+                        periods: int = 4) -> "Financials":
+        """Build from (income, balance, cashflow) frames and a fundamentals.compute_ratios table."""
+        payload = cls(ticker=ticker)
+        for group, index, items in _STATEMENT_ITEMS:
+            frame = statements[index]
+            if frame is None or frame.empty:
+                continue
+            latest = frame.columns[0]
+            if payload.period is None:
+                payload.period = str(pd.Timestamp(latest).date())
+            payload.statements[group] = {
+                _SHORT_LABELS.get(item, item): frame.loc[item, latest] for item in items if item in frame.index
+            }
+
+        if ratio_table is not None and not ratio_table.empty:
+            recent = ratio_table.tail(periods)
+            payload.ratio_periods = [str(p.year) for p in recent.index.get_level_values("period")]
+            payload.ratios = {column: list(recent[column]) for _, column in RATIO_LABELS}
+        return payload
+
+    def lines(self) -> list:
+        lines = [f"{self.ticker} financials" + (f" (latest period {self.period})" if self.period else "")]
+        for group, items in self.statements.items():
+            pairs = _pairs((label, value, "money") for label, value in items.items())
+            if pairs:
+                lines.append(f"{group}: {pairs}")
+
+        if self.ratio_periods:
+            lines.append(f"Ratios {'/'.join(self.ratio_periods)}:")
+            for label, column in RATIO_LABELS:
+                kind = "pct" if column in PERCENT_RATIOS else "num"
+                values = [format_number(v, kind) for v in self.ratios.get(column, [])]
+                if any(v is not None for v in values):
+                    lines.append(f"{label} " + "/".join(v or "-" for v in values))
+        return lines
+
+
+@dataclass(slots=True)
+class NewsItem:
+    title: str
+    publisher: Optional[str] = None
+    published: Optional[str] = None
+    link: Optional[str] = None
+    sources: int = 1
+
+
+@dataclass(slots=True)
+class NewsDigest:
+    """Top-ranked distinct stories for a ticker."""
+
+    ticker: str
+    items: list = field(default_factory=list)
+
+    @classmethod
+    def from_items(cls, ticker: str, raw_items: list, limit: int = 7) -> "NewsDigest":
+        items = []
+        for raw in (raw_items or [])[:limit]:
+            published = raw.get("providerPublishTime")
+            items.append(NewsItem(
+                title=raw.get("title") or "Untitled",
+                publisher=raw.get("publisher"),
+                published=datetime.fromtimestamp(published).strftime("%Y-%m-%d") if published else None,
+                link=raw.get("link"),
+                sources=raw.get("sources", 1),
+            ))
+        return cls(ticker=ticker, items=items)
+
+    def lines(self, links: bool = False) -> list:
+        lines = [f"{self.ticker} news ({len(self.items)} items):"]
+        for item in self.items:
+            carried = f"{item.sources} sources" if item.sources > 1 else None
+            meta = ", ".join(part for part in (item.publisher, item.published, carried) if part)
+            line = f"- {item.title}" + (f" ({meta})" if meta else "")
+            if links and item.link:
+                line += f" {item.link}"
+            lines.append(line)
+        return lines
+
+
+@dataclass(slots=True)
+class Technicals:
+    """Latest technical indicator values from indicators.indicator_table."""
+
+    ticker: str
+    as_of: Optional[str] = None
+    values: dict = field(default_factory=dict)
+    windows: dict = field(default_factory=lambda: dict(DEFAULT_WINDOWS))
+
+    @classmethod
+    def from_row(cls, ticker: str, row: pd.Series, as_of=None, windows: dict = None) -> "Technicals":
+        return cls(ticker=ticker, as_of=str(as_of) if as_of is not None else None,
+                   values={name: row[name] for name in row.index},
+                   windows=dict(DEFAULT_WINDOWS, **(windows or {})))
+
+    def lines(self) -> list:
+        w, v = self.windows, self.values
+        return [
+            f"{self.ticker} technicals" + (f" (as of {self.as_of})" if self.as_of else ""),
+            _pairs([("Close", v.get("close"), "num")]
+                   + [(f"SMA{n}", v.get(f"sma_{n}"), "num") for n in w["sma"]]
+                   + [(f"EMA{n}", v.get(f"ema_{n}"), "num") for n in w["ema"]]),
+            _pairs([(f"RSI{w['rsi']}", v.get(f"rsi_{w['rsi']}"), "num"), ("MACD", v.get("macd"), "num"),
+                    ("Signal", v.get("macd_signal"), "num"), ("Hist", v.get("macd_hist"), "num")]),
+            _pairs([("BB Low", v.get("bb_lower"), "num"), ("BB High", v.get("bb_upper"), "num"),
+                    ("%B", v.get("bb_pct_b"), "num"), (f"ATR{w['atr']}", v.get(f"atr_{w['atr']}"), "num")]),
+            _pairs([(f"Vol{w['volatility']}d", v.get(f"volatility_{w['volatility']}d"), "pct"),
+                    ("Drawdown", v.get("drawdown"), "pct"), ("Max DD", v.get("max_drawdown"), "pct")]),
+        ]
+
+
+def serialize(payload, budget: int = PAYLOAD_TOKEN_BUDGET) -> str:
+    """Render a payload's lines in order until the token budget is reached.
+
+    Lines come most important first, so the ones dropped to stay within the
+    budget are the least important; the output says how many were left out.
+    """
+    return serialize_task([payload], budget)[0]
+
+
+def _omitted(total: int, kept: int) -> str:
+    return f"({total - kept} more lines omitted)" if kept < total else ""
+
+
+def serialize_task(payloads: list, budget: int = PAYLOAD_TOKEN_BUDGET) -> list:
+    """Render the payloads of one task prompt within one shared token budget.
+
+    Lines are taken in rounds (every payload's first line, then every
+    second line, ...), so each payload keeps its most important lines and
+    none of them can use up the budget alone. The budget covers the
+    "(N more lines omitted)" notes too; only the header lines, which every
+    payload keeps, can go over it. Returns one string per payload.
+    """
+    lines = [[line for line in payload.lines() if line] for payload in payloads]
+    kept = [[] for _ in payloads]
+    # Counted in characters, since estimate_tokens of the joined text is what the budget limits
+    limit = budget * 4 + 3
+    used, full = 0, False
+    for depth in range(max((len(l) for l in lines), default=0)):
+        for position, payload_lines in enumerate(lines):
+            if depth >= len(payload_lines):
+                continue
+            line = payload_lines[depth]
+            if depth:
+                # The notes every payload would need if this were the last line taken
+                counts = [len(k) + (p == position) for p, k in enumerate(kept)]
+                notes = sum(len(_omitted(len(l), count)) + 1 for l, count in zip(lines, counts) if count < len(l))
+                if used + len(line) + 1 + notes > limit:
+                    full = True
+                    break
+            kept[position].append(line)
+            used += len(line) + 1
+        if full:
+            break
+
+    rendered = []
+    for payload_lines, payload_kept in zip(lines, kept):
+        note = _omitted(len(payload_lines), len(payload_kept))
+        rendered.append("\n".join(payload_kept + ([note] if note else [])) + "\n")
+    return rendered
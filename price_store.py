@@ -0,0 +1,233 @@
+import glob
+import os
+import threading
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+PRICE_STORE_DIR = os.getenv("PRICE_STORE_DIR", os.path.join("db", "prices"))
+# Years of daily bars to download the first time a ticker is seen
+PRICE_STORE_LOOKBACK_YEARS = int(os.getenv("PRICE_STORE_LOOKBACK_YEARS", "5"))
+# Seconds before a stored ticker is checked again for new bars
+PRICE_STORE_REFRESH = int(os.getenv("PRICE_STORE_REFRESH", "60"))
+
+# Column layout of each stored bar; the date is kept as days since the epoch
+COLUMNS = ("Date", "Open", "High", "Low", "Close", "Volume")
+OHLCV = list(COLUMNS[1:])
+
+# Relative tolerance when checking that an overlapping bar has not been re-adjusted
+_ADJUSTMENT_TOLERANCE = 1e-6
+
+
+def _to_days(index: pd.DatetimeIndex) -> np.ndarray:
+    """Convert a (possibly tz-aware) bar index to float days since the epoch."""
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.values.astype("datetime64[D]").astype(np.int64).astype(float)
+
+
+def _to_index(days: np.ndarray) -> pd.DatetimeIndex:
+    return pd.DatetimeIndex(days.astype(np.int64).astype("datetime64[D]"), name="Date")
+
+
+def _frame_to_bars(frame: pd.DataFrame) -> np.ndarray:
+    """Convert a yfinance OHLCV frame to an (N, 6) bar array."""
+    frame = frame.dropna(subset=["Close"])
+    bars = np.empty((len(frame), len(COLUMNS)))
+    bars[:, 0] = _to_days(frame.index)
+    bars[:, 1:] = frame[OHLCV].to_numpy(dtype=float)
+    return bars
+
+
+def _frame_for(data: pd.DataFrame, ticker: str) -> pd.DataFrame:
+    """Extract one ticker's frame from a ``yf.download`` result."""
+    if isinstance(data.columns, pd.MultiIndex):
+        if ticker in data.columns.get_level_values(0):
+            return data[ticker].dropna(how="all")
+        return pd.DataFrame()
+    return data.dropna(how="all")
+
+
+class PriceStore:
+    """Local store of daily OHLCV bars with incremental updates from yfinance.
+
+    Each ticker's bars live in a single .npy file that is memory-mapped on read,
+    so date ranges are served as views without copying or network calls. New
+    bars are fetched as a delta from the last stored bar; every write goes to a
+    new versioned file, so readers holding an older map are never disturbed.
+    """
+
+    def __init__(self, root: str = PRICE_STORE_DIR, lookback_years: int = PRICE_STORE_LOOKBACK_YEARS,
+                 refresh_interval: float = PRICE_STORE_REFRESH):
+        self.root = root
+        self.lookback_years = lookback_years
+        self.refresh_interval = refresh_interval
+        self._maps = {}
+        self._checked = {}
+        self._backfilled = set()
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _lock(self, ticker: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(ticker, threading.Lock())
+
+    def _files(self, ticker: str) -> list:
+        return sorted(glob.glob(os.path.join(self.root, ticker, "bars.*.npy")))
+
+    def load(self, ticker: str):
+        """Return the stored (N, 6) bar array for ticker as a read-only memory map, or None."""
+        ticker = ticker.upper()
+        files = self._files(ticker)
+        if not files:
+            return None
+
+        path, bars = self._maps.get(ticker, (None, None))
+        if path != files[-1]:
+            bars = np.load(files[-1], mmap_mode="r")
+            self._maps[ticker] = (files[-1], bars)
+        return bars
+
+    def _write(self, ticker: str, bars: np.ndarray):
+        directory = os.path.join(self.root, ticker)
+        os.makedirs(directory, exist_ok=True)
+
+        tmp_path = os.path.join(directory, f".tmp-{os.getpid()}-{threading.get_ident()}.npy")
+        np.save(tmp_path, bars)
+        os.replace(tmp_path, os.path.join(directory, f"bars.{time.time_ns():020d}.npy"))
+
+        # Remove superseded versions; another process may still have one mapped
+        for old in self._files(ticker)[:-1]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+    def _merge(self, ticker: str, stored, fresh: pd.DataFrame):
+        """Append freshly fetched bars to the stored ones and persist the result."""
+        new_bars = _frame_to_bars(fresh)
+        if stored is None or len(stored) == 0:
+            bars = new_bars
+        elif len(new_bars) == 0:
+            return
+        else:
+            # A changed overlapping bar means yfinance re-adjusted the history
+            # (split or dividend), so the stored series must be re-downloaded.
+            overlap = np.isin(new_bars[:, 0], stored[:, 0])
+            if overlap.any():
+                first = new_bars[overlap][0]
+                old = stored[np.searchsorted(stored[:, 0], first[0])]
+                if not np.allclose(old[1:5], first[1:5], rtol=_ADJUSTMENT_TOLERANCE):
+                    self._write(ticker, self._download_full(ticker))
+                    self._backfilled.discard(ticker)
+                    return
+            keep = stored[stored[:, 0] < new_bars[0, 0]]
+            bars = np.vstack([keep, new_bars])
+
+        if len(bars):
+            self._write(ticker, bars)
+
+    def _delta_start(self, stored) -> date:
+        """First date to request: the last two stored bars are re-fetched for overlap checks."""
+        if stored is None or len(stored) == 0:
+            return date.today() - timedelta(days=365 * self.lookback_years)
+        overlap_from = stored[max(len(stored) - 2, 0), 0]
+        return date(1970, 1, 1) + timedelta(days=int(overlap_from))
+
+    def _download_full(self, ticker: str) -> np.ndarray:
+        start = date.today() - timedelta(days=365 * self.lookback_years)
+        return _frame_to_bars(yf.Ticker(ticker).history(start=start.isoformat(), auto_adjust=True))
+
+    def _is_fresh(self, ticker: str) -> bool:
+        return time.time() - self._checked.get(ticker, 0) < self.refresh_interval
+
+    def update(self, ticker: str, force: bool = False):
+        """Fetch bars newer than the last stored one for ticker."""
+        ticker = ticker.upper()
+        with self._lock(ticker):
+            if not force and self._is_fresh(ticker):
+                return
+            stored = self.load(ticker)
+            start = self._delta_start(stored)
+            fresh = yf.Ticker(ticker).history(start=start.isoformat(), auto_adjust=True)
+            self._merge(ticker, stored, fresh)
+            self._checked[ticker] = time.time()
+
+    def update_many(self, tickers: list, force: bool = False):
+        """Fetch the missing bars for many tickers with a single ``yf.download`` call."""
+        tickers = [t.upper() for t in tickers]
+        stale = [t for t in tickers if force or not self._is_fresh(t)]
+        if not stale:
+            return
+
+        stored = {t: self.load(t) for t in stale}
+        start = min(self._delta_start(bars) for bars in stored.values())
+        data = yf.download(
+            stale,
+            start=start.isoformat(),
+            group_by="ticker",
+            auto_adjust=True,
+            threads=True,
+            progress=False,
+        )
+
+        for ticker in stale:
+            fresh = _frame_for(data, ticker)
+            if fresh.empty:
+                continue
+            with self._lock(ticker):
+                current = self.load(ticker)
+                fresh = fresh[fresh.index >= pd.Timestamp(self._delta_start(current)).tz_localize(fresh.index.tz)]
+                self._merge(ticker, current, fresh)
+                self._checked[ticker] = time.time()
+
+    def _backfill(self, ticker: str, start):
+        """Download bars older than the first stored one, once per ticker and process."""
+        ticker = ticker.upper()
+        with self._lock(ticker):
+            if ticker in self._backfilled:
+                return
+            self._backfilled.add(ticker)
+            stored = self.load(ticker)
+            if stored is None or len(stored) == 0:
+                return
+            first_day = date(1970, 1, 1) + timedelta(days=int(stored[0, 0]))
+            older = _frame_to_bars(yf.Ticker(ticker).history(
+                start=pd.Timestamp(start).date().isoformat(), end=first_day.isoformat(), auto_adjust=True,
+            ))
+            older = older[older[:, 0] < stored[0, 0]]
+            if len(older):
+                self._write(ticker, np.vstack([older, stored]))
+
+    def get_bars(self, ticker: str, start=None, end=None, refresh: bool = True):
+        """Return a zero-copy (N, 6) view of the stored bars between start and end (inclusive)."""
+        if refresh:
+            try:
+                self.update(ticker)
+            except Exception as e:
+                # Serve what is stored locally if yfinance is unreachable
+                if self.load(ticker) is None:
+                    raise
+                print(f"Price store update failed for {ticker}, serving stored bars: {e}")
+
+        bars = self.load(ticker)
+        if bars is None:
+            return np.empty((0, len(COLUMNS)))
+
+        if refresh and start is not None and pd.Timestamp(start).date() < date(1970, 1, 1) + timedelta(days=int(bars[0, 0])):
+            self._backfill(ticker, start)
+            bars = self.load(ticker)
+
+        days = bars[:, 0]
+        lo = 0 if start is None else np.searchsorted(days, _to_days(pd.DatetimeIndex([pd.Timestamp(start)]))[0], "left")
+        hi = len(days) if end is None else np.searchsorted(days, _to_days(pd.DatetimeIndex([pd.Timestamp(end)]))[0], "right")
+        return bars[lo:hi]
+
+    def get_history(self, ticker: str, start=None, end=None, refresh: bool = True) -> pd.DataFrame:
+        """Return stored bars as a DataFrame shaped like ``Ticker.history()`` output."""
+        bars = self.get_bars(ticker, start, end, refresh)
+        return pd.DataFrame(bars[:, 1:], index=_to_index(bars[:, 0]), columns=OHLCV, copy=False)
@@ -0,0 +1,249 @@
+import itertools
+import os
+import re
+import sqlite3
+import threading
+import time
+
+# Requests and tokens per minute allowed for the Groq model; shared by every
+# crew, thread and process that points at the same LLM_RATE_DB_PATH
+LLM_RATE_LIMIT = os.getenv("LLM_RATE_LIMIT", "true").lower() in ("1", "true", "yes")
+GROQ_RPM = float(os.getenv("GROQ_RPM", "30"))
+GROQ_TPM = float(os.getenv("GROQ_TPM", "30000"))
+LLM_RATE_DB_PATH = os.getenv("LLM_RATE_DB_PATH", os.path.join("db", "llm_rate.sqlite3"))
+# Attempts per call after a 429 before the error is raised to the crew
+LLM_RATE_MAX_RETRIES = int(os.getenv("LLM_RATE_MAX_RETRIES", "5"))
+
+# Backoff after consecutive 429s doubles from the base up to the cap
+_BACKOFF_BASE = 2.0
+_BACKOFF_CAP = 60.0
+# Longest single sleep while waiting, so new arrivals and backoffs are noticed
+_MAX_SLEEP = 1.0
+# Jobs not served for this long are forgotten by the fairness bookkeeping
+_FAIRNESS_WINDOW = 600.0
+
+_RETRY_IN = re.compile(r"try again in (?:(\d+)m)?([\d.]+)(ms|s)", re.IGNORECASE)
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """Return True if error (or anything it was raised from) is an HTTP 429."""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+        if status == 429 or "RateLimit" in type(error).__name__ or "rate limit" in str(error).lower():
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+def retry_after_seconds(error: BaseException):
+    """Return the provider's suggested wait from a 429, or None if it gave none."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        value = headers.get("retry-after")
+        if value is not None:
+            return float(value)
+    except (AttributeError, TypeError, ValueError):
+        pass
+
+    # Groq puts it in the message: "Please try again in 1m2.5s" / "in 350ms"
+    match = _RETRY_IN.search(str(error))
+    if match is None:
+        return None
+    minutes, amount, unit = match.groups()
+    seconds = float(amount) / 1000 if unit.lower() == "ms" else float(amount)
+    return seconds + 60 * int(minutes or 0)
+
+
+class _Waiter:
+    __slots__ = ("job", "seq")
+
+    def __init__(self, job, seq: int):
+        self.job = job
+        self.seq = seq
+
+
+class RateScheduler:
+    """Token buckets for requests and tokens per minute, shared through SQLite.
+
+    Bucket levels live in one SQLite row per limiter, updated inside a
+    ``BEGIN IMMEDIATE`` transaction, so every thread and process using the
+    same file draws from the same budget. Within a process, waiting callers
+    are served round-robin by job: the job that was served least recently
+    goes next, so one large report cannot starve the others. A 429 from the
+    provider blocks the limiter for every process, with the pause doubling on
+    consecutive 429s until a call succeeds.
+    """
+
+    def __init__(self, path: str = LLM_RATE_DB_PATH, rpm: float = GROQ_RPM, tpm: float = GROQ_TPM,
+                 name: str = "groq"):
+        self.path = path
+        self.rpm = rpm
+        self.tpm = tpm
+        self.name = name
+        self._db_lock = threading.Lock()
+        self._condition = threading.Condition()
+        self._waiters = []
+        self._last_served = {}
+        self._seq = itertools.count()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Autocommit mode so the explicit BEGIN IMMEDIATE below controls locking
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS buckets (
+                name TEXT PRIMARY KEY,
+                requests REAL NOT NULL,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                blocked_until REAL NOT NULL DEFAULT 0,
+                strikes INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        self._conn.execute(
+            "INSERT OR IGNORE INTO buckets (name, requests, tokens, updated_at) VALUES (?, ?, ?, ?)",
+            (name, rpm, tpm, time.time()),
+        )
+
+    def acquire(self, tokens: int, job=None) -> float:
+        """Block until one request and tokens are available; return the seconds waited."""
+        tokens = min(tokens, self.tpm)
+        started = time.monotonic()
+        waiter = _Waiter(job, next(self._seq))
+        with self._condition:
+            self._waiters.append(waiter)
+
+        try:
+            while True:
+                with self._condition:
+                    while self._head() is not waiter:
+                        self._condition.wait()
+                wait = self._try_take(tokens)
+                if wait <= 0:
+                    break
+                time.sleep(min(wait, _MAX_SLEEP))
+        finally:
+            with self._condition:
+                self._waiters.remove(waiter)
+                now = time.monotonic()
+                self._last_served[job] = now
+                for stale in [j for j, t in self._last_served.items() if now - t > _FAIRNESS_WINDOW]:
+                    del self._last_served[stale]
+                self._condition.notify_all()
+        return time.monotonic() - started
+
+    def settle(self, reserved: int, used: int):
+        """Return tokens reserved for a call but not used by it."""
+        refund = min(reserved, self.tpm) - used
+        if refund <= 0:
+            return
+        with self._db_lock:
+            self._conn.execute(
+                "UPDATE buckets SET tokens = MIN(?, tokens + ?) WHERE name = ?",
+                (self.tpm, refund, self.name),
+            )
+
+    def record_success(self):
+        """Reset the 429 backoff after a call goes through."""
+        with self._db_lock:
+            self._conn.execute("UPDATE buckets SET strikes = 0 WHERE name = ? AND strikes > 0", (self.name,))
+
+    def record_rate_limited(self, retry_after: float = None) -> float:
+        """Pause the limiter for every process after a 429; return the pause in seconds."""
+        with self._db_lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                strikes, available, updated_at = self._conn.execute(
+                    "SELECT strikes, tokens, updated_at FROM buckets WHERE name = ?", (self.name,)
+                ).fetchone()
+                strikes += 1
+                pause = min(_BACKOFF_CAP, _BACKOFF_BASE * 2 ** (strikes - 1))
+                if retry_after is not None:
+                    pause = max(pause, retry_after)
+                # Moving updated_at forward drops the refill since the last update, so credit the tokens first
+                available = min(self.tpm, available + max(0.0, now - updated_at) * self.tpm / 60)
+                # The provider's window is evidently full, so empty the request bucket too
+                self._conn.execute(
+                    "UPDATE buckets SET strikes = ?, requests = 0, tokens = ?, updated_at = ?, "
+                    "blocked_until = MAX(blocked_until, ?) WHERE name = ?",
+                    (strikes, available, now, now + pause, self.name),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return pause
+
+    def stats(self) -> dict:
+        with self._db_lock:
+            requests, tokens, blocked_until, strikes = self._conn.execute(
+                "SELECT requests, tokens, blocked_until, strikes FROM buckets WHERE name = ?", (self.name,)
+            ).fetchone()
+        with self._condition:
+            waiting = len(self._waiters)
+        return {
+            "rpm": self.rpm,
+            "tpm": self.tpm,
+            "requests_available": requests,
+            "tokens_available": tokens,
+            "blocked_for": max(0.0, blocked_until - time.time()),
+            "strikes": strikes,
+            "waiting": waiting,
+        }
+
+    def _head(self) -> _Waiter:
+        return min(self._waiters, key=lambda w: (self._last_served.get(w.job, 0.0), w.seq))
+
+    def _try_take(self, tokens: float) -> float:
+        """Refill both buckets and take from them if possible; return 0 or the seconds to wait."""
+        with self._db_lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                requests, available, updated_at, blocked_until = self._conn.execute(
+                    "SELECT requests, tokens, updated_at, blocked_until FROM buckets WHERE name = ?",
+                    (self.name,),
+                ).fetchone()
+                elapsed = max(0.0, now - updated_at)
+                requests = min(self.rpm, requests + elapsed * self.rpm / 60)
+                available = min(self.tpm, available + elapsed * self.tpm / 60)
+
+                if now < blocked_until:
+                    wait = blocked_until - now
+                elif requests >= 1 and available >= tokens:
+                    requests -= 1
+                    available -= tokens
+                    wait = 0.0
+                else:
+                    wait = max((1 - requests) * 60 / self.rpm, (tokens - available) * 60 / self.tpm)
+
+                self._conn.execute(
+                    "UPDATE buckets SET requests = ?, tokens = ?, updated_at = ? WHERE name = ?",
+                    (requests, available, now, self.name),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return wait
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_rate_scheduler() -> RateScheduler:
+    """Return the process-wide rate scheduler, creating it on first use."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RateScheduler()
+        return _scheduler
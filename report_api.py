@@ -0,0 +1,286 @@
+"""Headless report service: submit report jobs over HTTP and collect the results.
+
+    python report_api.py --port 8080 --workers 4
+
+Endpoints (JSON unless noted):
+    POST /jobs              {"ticker": "AAPL"} or {"tickers": ["AAPL", "MSFT"]}
+    GET  /jobs              queued, running and recently finished jobs with their status
+    GET  /jobs/<id>         one job's status
+    GET  /jobs/<id>/report  the finished report as Markdown (text/markdown)
+    GET  /reports           stored reports, newest first (?ticker=AAPL&since=<epoch>&limit=50)
+    GET  /reports/<run id>  a stored report as Markdown, without regenerating it
+    GET  /health            worker and queue counts
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+from urllib.parse import parse_qs
+
+from dotenv import load_dotenv
+
+# Load environment variables before the modules that read them at import
+load_dotenv()
+
+from report_service import ReportService, normalize_ticker
+
+REPORT_API_HOST = os.getenv("REPORT_API_HOST", "127.0.0.1")
+REPORT_API_PORT = int(os.getenv("REPORT_API_PORT", "8080"))
+REPORT_API_WORKERS = int(os.getenv("REPORT_API_WORKERS", "4"))
+# Jobs waiting for a worker; submissions beyond this are rejected with 503
+REPORT_API_QUEUE_SIZE = int(os.getenv("REPORT_API_QUEUE_SIZE", "1000"))
+# Finished jobs are forgotten after this many seconds, and beyond this many (oldest first)
+REPORT_API_JOB_TTL = int(os.getenv("REPORT_API_JOB_TTL", "3600"))
+REPORT_API_MAX_FINISHED = int(os.getenv("REPORT_API_MAX_FINISHED", "1000"))
+# Largest request body accepted; a job submission is a few hundred bytes
+REPORT_API_MAX_BODY = int(os.getenv("REPORT_API_MAX_BODY", str(64 * 1024)))
+
+_REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found",
+            405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large", 503: "Service Unavailable"}
+
+
+class ReportJobQueue:
+    """Bounded queue of report jobs drained by a fixed pool of async workers.
+
+    Finished jobs stay listed for job_ttl seconds, and at most max_finished
+    of them are kept; their reports remain available under /reports.
+    """
+
+    def __init__(self, service: ReportService, workers: int = REPORT_API_WORKERS,
+                 queue_size: int = REPORT_API_QUEUE_SIZE, job_ttl: float = REPORT_API_JOB_TTL,
+                 max_finished: int = REPORT_API_MAX_FINISHED):
+        self.service = service
+        self.workers = workers
+        self.job_ttl = job_ttl
+        self.max_finished = max_finished
+        self.jobs = {}
+        self._queue = asyncio.Queue(maxsize=queue_size)
+        self._tasks = []
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def submit(self, ticker: str) -> dict:
+        """Queue a report for ticker.
+
+        Raises ValueError for an unknown ticker and asyncio.QueueFull when the
+        queue is at capacity.
+        """
+        job = {
+            "id": uuid.uuid4().hex,
+            "ticker": normalize_ticker(ticker),
+            "status": "queued",
+            "submitted_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "error": None,
+            "run_id": None,
+        }
+        self._queue.put_nowait(job["id"])
+        self.jobs[job["id"]] = job
+        self._expire()
+        return job
+
+    def _expire(self):
+        """Drop finished jobs past job_ttl, then the oldest ones beyond max_finished."""
+        finished = [job for job in self.jobs.values() if job["finished_at"] is not None]
+        finished.sort(key=lambda job: job["finished_at"])
+        cutoff = time.time() - self.job_ttl
+        excess = len(finished) - self.max_finished
+        for position, job in enumerate(finished):
+            if position < excess or job["finished_at"] < cutoff:
+                del self.jobs[job["id"]]
+
+    def stats(self) -> dict:
+        statuses = [job["status"] for job in self.jobs.values()]
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize(),
+            "running": statuses.count("running"),
+            "done": statuses.count("done"),
+            "failed": statuses.count("failed"),
+        }
+
+    def report(self, job_id: str):
+        job = self.jobs.get(job_id)
+        if job is None or job["status"] != "done":
+            return None
+        return self.service.artifacts.read(job["run_id"])
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            job = self.jobs[job_id]
+            job["status"] = "running"
+            job["started_at"] = time.time()
+            try:
+                # crew.kickoff is blocking, so it runs on a thread
+                # The service stores every finished run in the artifact store
+                result = await asyncio.to_thread(self.service.generate, job["ticker"])
+                job["run_id"] = result.run_id
+                # The service still serves a report it could not store, but this API reads it from the store
+                if await asyncio.to_thread(self.service.artifacts.get, result.run_id) is None:
+                    raise RuntimeError(f"report {result.run_id} was generated but could not be stored")
+                job["status"] = "done"
+            except Exception as e:
+                job["status"] = "failed"
+                job["error"] = str(e)
+                print(f"Report job {job_id} for {job['ticker']} failed: {e}")
+            finally:
+                job["finished_at"] = time.time()
+                self._queue.task_done()
+                self._expire()
+
+
+class ReportAPIServer:
+    """Minimal asyncio HTTP/1.1 front end for a ReportJobQueue (one request per connection)."""
+
+    def __init__(self, queue: ReportJobQueue):
+        self.queue = queue
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            status, body, content_type = await self._dispatch(reader)
+        except Exception as e:
+            status, body, content_type = 400, json.dumps({"error": str(e)}), "application/json"
+
+        payload = body.encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            f"Content-Type: {content_type}; charset=utf-8\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            "Connection: close\r\n\r\n".encode("ascii") + payload
+        )
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _dispatch(self, reader: asyncio.StreamReader):
+        request_line = (await reader.readline()).decode("latin-1").strip()
+        if not request_line:
+            raise ValueError("empty request")
+        method, target, _ = request_line.split(" ", 2)
+
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get("content-length", "0"))
+        if length < 0:
+            raise ValueError("invalid Content-Length")
+        if length > REPORT_API_MAX_BODY:
+            return self._json(413, {"error": f"request body over {REPORT_API_MAX_BODY} bytes"})
+        raw_body = await reader.readexactly(length) if length else b""
+        path, _, query = target.partition("?")
+        parts = [p for p in path.split("/") if p]
+
+        if parts == ["health"]:
+            return self._json(200, self.queue.stats())
+
+        if parts == ["jobs"]:
+            if method == "GET":
+                return self._json(200, {"jobs": list(self.queue.jobs.values())})
+            if method == "POST":
+                return self._submit(json.loads(raw_body or b"{}"))
+            return self._json(405, {"error": "method not allowed"})
+
+        if len(parts) >= 2 and parts[0] == "jobs" and method == "GET":
+            job = self.queue.jobs.get(parts[1])
+            if job is None:
+                return self._json(404, {"error": "job not found"})
+            if len(parts) == 2:
+                return self._json(200, job)
+            if parts[2:] == ["report"]:
+                report = self.queue.report(parts[1])
+                if report is None:
+                    return self._json(409, {"error": f"job is {job['status']}"})
+                return 200, report, "text/markdown"
+
+        if parts and parts[0] == "reports" and method == "GET":
+            artifacts = self.queue.service.artifacts
+            if len(parts) == 1:
+                params = {k: v[-1] for k, v in parse_qs(query).items()}
+                found = await asyncio.to_thread(
+                    artifacts.list, params.get("ticker"),
+                    float(params["since"]) if "since" in params else None, None, int(params.get("limit", 50)),
+                )
+                return self._json(200, {"reports": [a.to_dict() for a in found]})
+            if len(parts) == 2:
+                report = await asyncio.to_thread(artifacts.read, parts[1])
+                if report is None:
+                    return self._json(404, {"error": "report not found"})
+                return 200, report, "text/markdown"
+
+        return self._json(404, {"error": "not found"})
+
+    def _submit(self, payload: dict):
+        if not isinstance(payload, dict):
+            return self._json(400, {"error": "request body must be a JSON object"})
+        # A string would be iterated into one job per character ("AAPL" -> A, A, P, L)
+        if payload.get("tickers") is not None and not isinstance(payload["tickers"], list):
+            return self._json(400, {"error": "'tickers' must be a list"})
+        tickers = payload.get("tickers") or ([payload["ticker"]] if payload.get("ticker") else [])
+        tickers = [t for t in tickers if isinstance(t, str) and t.strip()]
+        if not tickers:
+            return self._json(400, {"error": "provide 'ticker' or 'tickers'"})
+
+        jobs = []
+        for ticker in tickers:
+            try:
+                jobs.append(self.queue.submit(ticker))
+            except ValueError as e:
+                return self._json(400, {"error": str(e), "accepted": jobs})
+            except asyncio.QueueFull:
+                return self._json(503, {"error": "job queue is full", "accepted": jobs})
+        return self._json(202, {"jobs": jobs})
+
+    @staticmethod
+    def _json(status: int, data):
+        return status, json.dumps(data), "application/json"
+
+
+async def serve(host: str, port: int, workers: int, queue_size: int):
+    from agents_tasks import get_crew
+
+    # One crew run per worker; the service still coalesces duplicate tickers
+    service = ReportService(get_crew, max_workers=workers)
+    queue = ReportJobQueue(service, workers=workers, queue_size=queue_size)
+    queue.start()
+
+    server = await asyncio.start_server(ReportAPIServer(queue).handle, host, port)
+    print(f"Report API listening on http://{host}:{port} with {workers} workers")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await queue.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless stock report API")
+    parser.add_argument("--host", default=REPORT_API_HOST)
+    parser.add_argument("--port", type=int, default=REPORT_API_PORT)
+    parser.add_argument("--workers", type=int, default=REPORT_API_WORKERS, help="concurrent crew runs")
+    parser.add_argument("--queue-size", type=int, default=REPORT_API_QUEUE_SIZE, help="maximum queued jobs")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.queue_size))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import markdown
+import pdfkit
+
+from tracing import span
+
+WKHTMLTOPDF_PATH = os.getenv("WKHTMLTOPDF_PATH", r"C:\Program Files\wkhtmltopdf\bin\wkhtmltopdf.exe")
+# Rendered reports kept in memory; the least recently used are dropped first
+RENDER_CACHE_SIZE = int(os.getenv("RENDER_CACHE_SIZE", "32"))
+# Seconds a failed PDF conversion is remembered before the next request tries again
+RENDER_PDF_RETRY_SECONDS = float(os.getenv("RENDER_PDF_RETRY_SECONDS", "30"))
+
+
+class RenderedReport:
+    """HTML and PDF bytes produced from one report's Markdown."""
+
+    def __init__(self, digest: str, html: str, pdf: bytes = None, pdf_error: str = None):
+        self.digest = digest
+        self.html = html
+        self.pdf = pdf
+        self.pdf_error = pdf_error
+        self.rendered_at = time.monotonic()
+
+    @property
+    def html_bytes(self) -> bytes:
+        return self.html.encode("utf-8")
+
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def content_digest(markdown_text: str) -> str:
+    return hashlib.sha256(markdown_text.encode("utf-8")).hexdigest()
+
+
+def _render_pdf(html: str):
+    """Return (pdf bytes, None) or (None, error message) if wkhtmltopdf is unavailable."""
+    try:
+        config = pdfkit.configuration(wkhtmltopdf=WKHTMLTOPDF_PATH)
+        return pdfkit.from_string(html, False, configuration=config), None
+    except Exception as e:
+        print(f"PDF generation error: {e}")
+        return None, str(e)
+
+
+def render_report(markdown_text: str) -> RenderedReport:
+    """Convert report Markdown to HTML and PDF once per distinct content.
+
+    Results are keyed by a hash of the Markdown, so Streamlit reruns of the same
+    report reuse the cached bytes instead of re-rendering or starting another
+    wkhtmltopdf process. A failed PDF conversion is only kept for
+    RENDER_PDF_RETRY_SECONDS, so reruns do not retry it every time but a
+    transient wkhtmltopdf failure does not disable the PDF for good.
+    """
+    digest = content_digest(markdown_text)
+    with _cache_lock:
+        rendered = _cache.get(digest)
+        if rendered is not None and (
+                rendered.pdf_error is None or time.monotonic() - rendered.rendered_at < RENDER_PDF_RETRY_SECONDS):
+            _cache.move_to_end(digest)
+            return rendered
+
+    with span("render.report", chars=len(markdown_text)) as current:
+        with span("render.html"):
+            html = markdown.markdown(markdown_text)
+        with span("render.pdf"):
+            pdf, pdf_error = _render_pdf(html)
+        current.set(pdf=pdf is not None)
+    rendered = RenderedReport(digest, html, pdf, pdf_error)
+
+    with _cache_lock:
+        _cache[digest] = rendered
+        _cache.move_to_end(digest)
+        while len(_cache) > RENDER_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return rendered
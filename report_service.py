@@ -0,0 +1,301 @@
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from artifact_store import get_artifact_store, new_run_id
+from custom_tools import prefetch_report_inputs
+from ticker_index import resolve_ticker
+from tracing import bind_task, record_span, span, task_attributes, task_tokens, unbind_task
+
+# Seconds a finished report is reused for new requests on the same ticker
+REPORT_FRESHNESS_SECONDS = int(os.getenv("REPORT_FRESHNESS_SECONDS", "900"))
+# Crew runs allowed at the same time across all tickers
+REPORT_MAX_WORKERS = int(os.getenv("REPORT_MAX_WORKERS", "4"))
+
+
+def normalize_ticker(company_stock: str) -> str:
+    """Resolve a ticker or company name to its symbol; raises ValueError for unknown input."""
+    return resolve_ticker(company_stock)
+
+
+class ReportResult:
+    """A finished crew run for one ticker.
+
+    crew_output is a crewai CrewOutput, or an artifact_store.StoredReport for a
+    report loaded back from the artifact store.
+    """
+
+    def __init__(self, ticker: str, crew_output, created_at: float, run_id: str = None):
+        self.ticker = ticker
+        self.crew_output = crew_output
+        self.created_at = created_at
+        self.run_id = run_id
+
+    @property
+    def markdown(self) -> str:
+        return self.crew_output.raw
+
+    def age(self) -> float:
+        return time.time() - self.created_at
+
+
+class ReportEvent:
+    """One progress update from a running report.
+
+    kind is "prefetch" (market data is ready), "token" (an LLM output chunk),
+    "task" (a task finished), "done" or "error". section is the role of the
+    agent the event belongs to, when there is one.
+    """
+
+    def __init__(self, kind: str, section: str = None, text: str = "", data=None):
+        self.kind = kind
+        self.section = section
+        self.text = text
+        self.data = data
+
+
+class ReportJob:
+    """A report run whose progress events can be read by any number of sessions."""
+
+    def __init__(self, ticker: str, run_id: str = None):
+        self.ticker = ticker
+        self.run_id = run_id or new_run_id()
+        self.future = Future()
+        self._events = []
+        self._condition = threading.Condition()
+
+    def publish(self, event: ReportEvent):
+        with self._condition:
+            self._events.append(event)
+            self._condition.notify_all()
+
+    def events_since(self, index: int, timeout: float = None) -> list:
+        """Return events after index, waiting up to timeout seconds for new ones."""
+        with self._condition:
+            if timeout and len(self._events) <= index and not self.future.done():
+                self._condition.wait(timeout)
+            return self._events[index:]
+
+    @property
+    def done(self) -> bool:
+        return self.future.done()
+
+    def result(self, timeout: float = None) -> ReportResult:
+        return self.future.result(timeout)
+
+
+# Maps running task ids to (job, agent role) so streamed tokens reach the right job
+_task_routes = {}
+_task_routes_lock = threading.Lock()
+_event_listeners_registered = False
+# Start times of running tasks by task id, for the "task" trace spans
+_task_started = {}
+
+
+def _route_stream_chunk(source, event):
+    with _task_routes_lock:
+        route = _task_routes.get(getattr(event, "task_id", None))
+    if route is not None:
+        job, section = route
+        job.publish(ReportEvent("token", section, event.chunk))
+
+
+def _event_task_id(event) -> str:
+    task_id = getattr(event, "task_id", None) or getattr(getattr(event, "task", None), "id", None)
+    return str(task_id) if task_id is not None else None
+
+
+def _trace_task_started(source, event):
+    task_id = _event_task_id(event)
+    if task_attributes(task_id):
+        with _task_routes_lock:
+            _task_started[task_id] = (time.time(), time.perf_counter())
+
+
+def _trace_task_finished(source, event):
+    task_id = _event_task_id(event)
+    with _task_routes_lock:
+        started = _task_started.pop(task_id, None)
+    if started is None:
+        return
+    error = getattr(event, "error", None)
+    record_span("task", started[0], time.perf_counter() - started[1],
+                status="error" if error else "ok", error=str(error) if error else None,
+                tokens=task_tokens(task_id), **task_attributes(task_id))
+
+
+def _register_event_listeners():
+    """Subscribe to crewai's stream and task events once, on the first report run."""
+    global _event_listeners_registered
+    with _task_routes_lock:
+        if _event_listeners_registered:
+            return
+        _event_listeners_registered = True
+
+    try:
+        from crewai.events import crewai_event_bus
+        import crewai.events as events
+    except ImportError:
+        try:
+            from crewai.utilities.events import crewai_event_bus
+            import crewai.utilities.events as events
+        except ImportError:
+            # Older crewai without an event bus: task outputs still stream, tokens and task spans do not
+            return
+    crewai_event_bus.on(events.LLMStreamChunkEvent)(_route_stream_chunk)
+    for name, handler in (("TaskStartedEvent", _trace_task_started),
+                          ("TaskCompletedEvent", _trace_task_finished),
+                          ("TaskFailedEvent", _trace_task_finished)):
+        if hasattr(events, name):
+            crewai_event_bus.on(getattr(events, name))(handler)
+
+
+class ReportService:
+    """Single-flight report generation shared by every Streamlit session.
+
+    Concurrent requests for the same normalized ticker join the crew run that
+    is already in flight instead of starting another one, and a finished
+    report is served from memory (or from the artifact store, e.g. after a
+    restart) until it is older than the freshness window.
+    Each run uses its own copy of the crew so simultaneous runs for different
+    tickers never share task state.
+    """
+
+    def __init__(self, crew_factory, freshness_seconds: float = REPORT_FRESHNESS_SECONDS,
+                 max_workers: int = REPORT_MAX_WORKERS, artifacts=None):
+        self._crew_factory = crew_factory
+        self.artifacts = artifacts if artifacts is not None else get_artifact_store()
+        self.freshness_seconds = freshness_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="report")
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._completed = {}
+
+    def start(self, company_stock: str, force: bool = False) -> ReportJob:
+        """Return a job for the report, reusing a fresh or in-flight run when possible."""
+        ticker = normalize_ticker(company_stock)
+        with self._lock:
+            if not force:
+                result = self._completed.get(ticker) or self._stored(ticker)
+                if result is not None and result.age() < self.freshness_seconds:
+                    self._completed[ticker] = result
+                    job = ReportJob(ticker, result.run_id)
+                    job.future.set_result(result)
+                    job.publish(ReportEvent("done", text=result.markdown, data=result))
+                    return job
+
+            job = self._in_flight.get(ticker)
+            if job is None:
+                job = ReportJob(ticker)
+                self._in_flight[ticker] = job
+                self._executor.submit(self._run, job)
+            return job
+
+    def submit(self, company_stock: str, force: bool = False) -> Future:
+        """Return a future for the report, reusing a fresh or in-flight run when possible."""
+        return self.start(company_stock, force).future
+
+    def generate(self, company_stock: str, force: bool = False) -> ReportResult:
+        """Block until the report for company_stock is available."""
+        return self.submit(company_stock, force).result()
+
+    def cached(self, company_stock: str):
+        """Return the last finished report for a ticker regardless of age, or None."""
+        ticker = normalize_ticker(company_stock)
+        with self._lock:
+            result = self._completed.get(ticker)
+        return result or self._stored(ticker)
+
+    def _stored(self, ticker: str):
+        """Load the newest report for ticker from the artifact store, or return None."""
+        artifact = self.artifacts.latest(ticker)
+        report = self.artifacts.load(artifact.run_id) if artifact is not None else None
+        if report is None:
+            return None
+        return ReportResult(ticker, report, artifact.created_at, artifact.run_id)
+
+    def _save(self, result: ReportResult):
+        crew_output = result.crew_output
+        usage = getattr(crew_output, "token_usage", None)
+        meta = {
+            "tasks": [{"agent": t.agent, "raw": t.raw} for t in getattr(crew_output, "tasks_output", None) or []],
+            "token_usage": usage.model_dump() if hasattr(usage, "model_dump") else usage,
+        }
+        try:
+            self.artifacts.save(result.run_id, result.ticker, result.markdown, meta, result.created_at)
+        except Exception as e:
+            # The report is still served from memory; only its stored copy is missing
+            print(f"Could not store report {result.run_id} for {result.ticker}: {e}")
+
+    def _run(self, job: ReportJob):
+        routes = {}
+        try:
+            with span("report.run", ticker=job.ticker):
+                _register_event_listeners()
+                crew = self._crew_factory().copy()
+                inputs = prefetch_report_inputs(job.ticker)
+                job.publish(ReportEvent("prefetch", data=inputs))
+
+                def on_task_done(task_output):
+                    job.publish(ReportEvent("task", task_output.agent, task_output.raw))
+
+                crew.task_callback = on_task_done
+                routes = {str(task.id): (job, task.agent.role) for task in crew.tasks if task.agent}
+                with _task_routes_lock:
+                    _task_routes.update(routes)
+                for task_id, (_, role) in routes.items():
+                    bind_task(task_id, ticker=job.ticker, task=role)
+
+                with span("crew.kickoff") as kickoff:
+                    crew_output = crew.kickoff(inputs=inputs)
+                    usage = getattr(crew_output, "token_usage", None)
+                    kickoff.set(tokens=getattr(usage, "total_tokens", None))
+                result = ReportResult(job.ticker, crew_output, time.time(), job.run_id)
+                self._save(result)
+        except Exception as e:
+            job.publish(ReportEvent("error", text=str(e)))
+            self._finish(job, error=e)
+            return
+        finally:
+            with _task_routes_lock:
+                for task_id in routes:
+                    _task_routes.pop(task_id, None)
+                    _task_started.pop(task_id, None)
+            for task_id in routes:
+                unbind_task(task_id)
+
+        job.publish(ReportEvent("done", text=result.markdown, data=result))
+        self._finish(job, result=result)
+
+    def _finish(self, job: ReportJob, result: ReportResult = None, error: Exception = None):
+        with self._lock:
+            if self._in_flight.get(job.ticker) is job:
+                del self._in_flight[job.ticker]
+            if result is not None:
+                self._completed[job.ticker] = result
+                self._evict_expired()
+
+        if error is not None:
+            job.future.set_exception(error)
+        else:
+            job.future.set_result(result)
+
+    def _evict_expired(self):
+        expired = [t for t, r in self._completed.items() if r.age() >= self.freshness_seconds]
+        for ticker in expired:
+            del self._completed[ticker]
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_report_service() -> ReportService:
+    """Return the process-wide report service, creating it on first use."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            from agents_tasks import get_crew
+            _service = ReportService(get_crew)
+        return _service
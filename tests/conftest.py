@@ -0,0 +1,23 @@
+import os
+import sys
+import tempfile
+
+# The modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Read at import by the modules under test: keep every local store and the
+# trace file out of the real db/ and reports/ directories
+_WORK_DIR = tempfile.mkdtemp(prefix="tests_")
+os.environ.update({
+    "TRACING": "false",
+    "TRACE_PATH": os.path.join(_WORK_DIR, "traces.jsonl"),
+    "TRACE_PROFILE_DIR": os.path.join(_WORK_DIR, "profiles"),
+    "YF_CACHE_PATH": os.path.join(_WORK_DIR, "yf_cache.sqlite3"),
+    "PRICE_STORE_DIR": os.path.join(_WORK_DIR, "prices"),
+    "NEWS_STORE_PATH": os.path.join(_WORK_DIR, "news.sqlite3"),
+    "WEB_CACHE_PATH": os.path.join(_WORK_DIR, "web_cache.sqlite3"),
+    "ARTIFACT_DIR": os.path.join(_WORK_DIR, "reports"),
+    "LLM_CACHE_PATH": os.path.join(_WORK_DIR, "llm_cache.sqlite3"),
+    "LLM_RATE_DB_PATH": os.path.join(_WORK_DIR, "llm_rate.sqlite3"),
+    "LITELLM_LOCAL_MODEL_COST_MAP": "True",
+})
@@ -0,0 +1,123 @@
+import base64
+import socketserver
+import threading
+
+import pytest
+
+import email_queue
+from email_queue import EmailQueue, SMTPConnectionPool
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: records every envelope, can fail the next DATA commands."""
+
+    def _reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode("ascii"))
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self._reply("220 localhost test server")
+        sender, recipients = None, []
+        for raw in self.rfile:
+            command = raw.decode("ascii").strip()
+            verb = command[:4].upper()
+            if verb in ("EHLO", "HELO"):
+                self._reply("250 localhost")
+            elif verb == "MAIL":
+                sender, recipients = command.split(":", 1)[1].strip("<> "), []
+                self._reply("250 OK")
+            elif verb == "RCPT":
+                recipients.append(command.split(":", 1)[1].strip("<> "))
+                self._reply("250 OK")
+            elif verb == "DATA":
+                with server.lock:
+                    failing = server.fail_data > 0
+                    server.fail_data -= failing
+                if failing:
+                    self._reply("451 Try again later")
+                    continue
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                for line in self.rfile:
+                    if line == b".\r\n":
+                        break
+                    lines.append(line)
+                with server.lock:
+                    server.envelopes.append((sender, recipients, b"".join(lines).decode("ascii")))
+                self._reply("250 OK")
+            elif verb in ("NOOP", "RSET"):
+                self._reply("250 OK")
+            elif verb == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Not implemented")
+
+
+@pytest.fixture
+def smtp_server():
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _SMTPHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.connections, server.envelopes, server.fail_data = 0, [], 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _queue(server, **kwargs):
+    pool = SMTPConnectionPool("127.0.0.1", server.server_address[1], security="none", size=1)
+    return EmailQueue("reports@example.com", pool, workers=1, backoff=0, **kwargs)
+
+
+def test_recipients_are_batched_over_one_pooled_connection(smtp_server):
+    queue = _queue(smtp_server, max_recipients=2)
+    try:
+        result = queue.submit("a@example.com, b@example.com; c@example.com", "Report", "Attached",
+                              "AAPL.pdf", b"%PDF-1.4 report").result(timeout=10)
+    finally:
+        queue.close()
+
+    assert result.delivered == ["a@example.com", "b@example.com", "c@example.com"]
+    assert [recipients for _, recipients, _ in smtp_server.envelopes] == [
+        ["a@example.com", "b@example.com"], ["c@example.com"]]
+    assert queue.pool.opened == 1
+    assert smtp_server.connections == 1
+    # The recipient list stays hidden from the recipients
+    assert all("To: undisclosed-recipients:;" in data for _, _, data in smtp_server.envelopes)
+
+
+def test_attachment_is_encoded_once_per_report(smtp_server, monkeypatch):
+    calls = []
+    encode = base64.encodebytes
+    monkeypatch.setattr(email_queue.base64, "encodebytes", lambda data: calls.append(data) or encode(data))
+    queue = _queue(smtp_server, max_recipients=1)
+    try:
+        for recipients in (["a@example.com", "b@example.com"], ["c@example.com"]):
+            queue.submit(recipients, "Report", "Attached", "AAPL.pdf", b"%PDF-1.4 report").result(timeout=10)
+    finally:
+        queue.close()
+
+    assert len(smtp_server.envelopes) == 3
+    assert calls == [b"%PDF-1.4 report"]
+    encoded = encode(b"%PDF-1.4 report").decode("ascii").strip()
+    assert all(encoded in data for _, _, data in smtp_server.envelopes)
+
+
+def test_transient_failure_is_retried(smtp_server):
+    smtp_server.fail_data = 1
+    queue = _queue(smtp_server)
+    try:
+        result = queue.submit(["a@example.com"], "Report", "Body").result(timeout=10)
+    finally:
+        queue.close()
+
+    assert result.delivered == ["a@example.com"]
+    assert result.attempts == 2
+    assert len(smtp_server.envelopes) == 1
+    # The connection that failed is discarded, not reused
+    assert queue.pool.opened == 2
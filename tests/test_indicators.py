@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicators import atr, bollinger, compute_indicators, ema, rsi, sma
+
+
+def _history(rows=400, gap=None, seed=7):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, rows)))
+    high = close * (1 + rng.uniform(0, 0.02, rows))
+    low = close * (1 - rng.uniform(0, 0.02, rows))
+    frame = pd.DataFrame({"Close": close, "High": high, "Low": low})
+    if gap is not None:
+        frame.iloc[gap] = np.nan
+    return frame
+
+
+def _reference(frame, sma_window=20, ema_span=12, rsi_window=14, bb_window=20, bb_std=2.0, atr_window=14):
+    """The same indicators from pandas; gaps are carried forward before smoothing, as the EWMA does."""
+    close, high, low = frame["Close"], frame["High"], frame["Low"]
+    delta = close.diff()
+    wilder = dict(alpha=1 / rsi_window, adjust=False, min_periods=rsi_window)
+    gain = delta.clip(lower=0).ffill().ewm(**wilder).mean()
+    loss = (-delta).clip(lower=0).ffill().ewm(**wilder).mean()
+    prev_close = close.shift()
+    true_range = pd.concat([high - low, (high - prev_close).abs(), (low - prev_close).abs()], axis=1).max(axis=1)
+    true_range[high.isna() | low.isna()] = np.nan
+    middle = close.rolling(bb_window).mean()
+    std = close.rolling(bb_window).std(ddof=0)
+    return {
+        "sma": close.rolling(sma_window).mean(),
+        "ema": close.ffill().ewm(span=ema_span, adjust=False, min_periods=ema_span).mean(),
+        "rsi": 100 - 100 / (1 + gain / loss),
+        "bb_upper": middle + bb_std * std,
+        "bb_lower": middle - bb_std * std,
+        "atr": true_range.ffill().ewm(alpha=1 / atr_window, adjust=False, min_periods=atr_window).mean(),
+    }
+
+
+@pytest.mark.parametrize("gap", [None, slice(150, 156)])
+def test_series_match_pandas(gap):
+    frame = _history(gap=gap)
+    close, high, low = (frame[c].to_numpy() for c in ("Close", "High", "Low"))
+    expected = _reference(frame)
+    middle, upper, lower = bollinger(close, 20, 2.0)
+
+    np.testing.assert_allclose(sma(close, 20)[:, 0], expected["sma"], rtol=1e-9)
+    np.testing.assert_allclose(ema(close, 12)[:, 0], expected["ema"], rtol=1e-9)
+    np.testing.assert_allclose(rsi(close, 14)[:, 0], expected["rsi"], rtol=1e-9)
+    np.testing.assert_allclose(upper[:, 0], expected["bb_upper"], rtol=1e-9)
+    np.testing.assert_allclose(lower[:, 0], expected["bb_lower"], rtol=1e-9)
+    np.testing.assert_allclose(atr(high, low, close, 14)[:, 0], expected["atr"], rtol=1e-9)
+
+
+@pytest.mark.parametrize("gap", [None, slice(150, 156), slice(-8, -3)])
+def test_latest_values_match_pandas(gap):
+    # A gap in the last window makes compute_indicators fall back to the full series
+    frame = _history(gap=gap)
+    latest = compute_indicators(frame["Close"].to_numpy(), frame["High"].to_numpy(), frame["Low"].to_numpy(),
+                                windows={"sma": (20,), "ema": (12,)})
+    expected = {name: series.dropna().iloc[-1] for name, series in _reference(frame).items()}
+
+    for name, key in (("sma", "sma_20"), ("ema", "ema_12"), ("rsi", "rsi_14"), ("bb_upper", "bb_upper"),
+                      ("bb_lower", "bb_lower"), ("atr", "atr_14")):
+        assert latest[key][0] == pytest.approx(expected[name], rel=1e-9), key
+
+
+def test_empty_history():
+    latest = compute_indicators(np.empty((0, 2)), np.empty((0, 2)), np.empty((0, 2)))
+    assert all(values.shape == (2,) and np.isnan(values).all() for values in latest.values())
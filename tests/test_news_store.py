@@ -0,0 +1,69 @@
+import time
+
+import pytest
+
+from news_store import NewsStore
+
+
+def _item(item_id, title, hours_ago=0.0, publisher="Wire", summary=""):
+    return {"id": item_id, "title": title, "summary": summary, "publisher": publisher,
+            "link": f"https://example.com/{item_id}", "providerPublishTime": time.time() - hours_ago * 3600}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return NewsStore(path=str(tmp_path / "news.sqlite3"))
+
+
+def test_syndicated_copies_collapse_into_one_story(store):
+    title = "Apple unveils new iPhone lineup with faster chips and longer battery life"
+    added = store.update("AAPL", [
+        _item("a", title, hours_ago=3, publisher="Reuters"),
+        _item("b", title + " - report", hours_ago=2, publisher="Yahoo"),
+        _item("c", "Apple unveils new iPhone line-up with faster chips, longer battery life", hours_ago=1),
+        _item("d", "Federal Reserve holds interest rates steady", hours_ago=1),
+    ])
+    assert added == 4
+
+    stories = {story["title"]: story for story in store.top("AAPL", limit=10)}
+    assert len(stories) == 2
+    # The earliest headline represents the story
+    assert stories[title]["sources"] == 3
+    assert stories[title]["publisher"] == "Reuters"
+    assert stories["Federal Reserve holds interest rates steady"]["sources"] == 1
+
+
+def test_repeat_update_adds_nothing(store):
+    items = [_item("a", "Apple reports record quarter"), _item("b", "Apple opens store in Mumbai")]
+    assert store.update("AAPL", items) == 2
+    assert store.update("AAPL", items) == 0
+    assert len(store.top("AAPL", limit=10)) == 2
+
+
+def test_late_item_with_older_timestamp_is_stored(store):
+    store.update("AAPL", [_item("new", "Apple reports record quarter", hours_ago=1)])
+    assert store.update("AAPL", [_item("late", "Apple settles patent dispute", hours_ago=12)]) == 1
+    assert {story["id"] for story in store.top("AAPL", limit=10)} == {"new", "late"}
+
+
+def test_newer_stories_rank_first(store):
+    store.update("AAPL", [
+        _item("old", "Apple settles patent dispute", hours_ago=96),
+        _item("mid", "Apple opens store in Mumbai", hours_ago=24),
+        _item("new", "Apple reports record quarter", hours_ago=1),
+    ])
+    assert [story["id"] for story in store.top("AAPL", limit=10)] == ["new", "mid", "old"]
+
+
+def test_short_ticker_matches_only_as_a_symbol(store):
+    store.update("ON", [
+        _item("word", "Stocks turn on rally as investors focus on earnings", hours_ago=1),
+        _item("caps", "MARKETS TURN ON RATE HOPES", hours_ago=1),
+        _item("symbol", "Chipmakers slide; $ON leads losses", hours_ago=2),
+        _item("paren", "Onsemi (ON) cuts guidance for silicon carbide", hours_ago=2),
+        _item("name", "ON Semiconductor to buy power chip unit", hours_ago=2),
+    ])
+    ranked = [story["id"] for story in store.top("ON", limit=10, names=["on semiconductor"])]
+    # Relevance doubles the score, which outweighs the extra hour of age
+    assert set(ranked[:3]) == {"symbol", "paren", "name"}
+    assert set(ranked[3:]) == {"word", "caps"}
@@ -0,0 +1,55 @@
+import time
+
+import pytest
+
+from payloads import NewsDigest, Quote, Technicals, estimate_tokens, serialize, serialize_task
+
+INFO = {
+    "longName": "Apple Inc.", "sector": "Technology", "industry": "Consumer Electronics",
+    "currentPrice": 227.52, "previousClose": 225.1, "open": 226.0, "dayHigh": 228.9, "dayLow": 224.3,
+    "fiftyTwoWeekHigh": 237.23, "fiftyTwoWeekLow": 164.08, "marketCap": 3.46e12, "totalRevenue": 3.91e11,
+    "volume": 51234567, "averageVolume": 58765432, "forwardPE": 30.1, "trailingEps": 6.57,
+    "debtToEquity": 151.86, "dividendYield": 0.0044, "bookValue": 4.38, "priceToBook": 51.9, "beta": 1.24,
+}
+VALUES = {
+    "close": 227.52, "sma_20": 224.1, "sma_50": 220.7, "sma_200": 205.3, "ema_12": 225.9, "ema_26": 223.4,
+    "rsi_14": 61.2, "macd": 2.5, "macd_signal": 1.9, "macd_hist": 0.6, "bb_lower": 215.2, "bb_upper": 233.0,
+    "bb_pct_b": 0.69, "atr_14": 3.8, "volatility_20d": 0.21, "drawdown": -0.04, "max_drawdown": -0.31,
+}
+
+
+def _payloads():
+    news = [{"title": f"Apple headline number {i} about iPhone sales and services growth", "publisher": "Reuters",
+             "providerPublishTime": time.time() - i * 3600, "sources": 2} for i in range(7)]
+    return [Quote.from_info("AAPL", INFO), NewsDigest.from_items("AAPL", news),
+            Technicals(ticker="AAPL", as_of="2026-10-16", values=VALUES)]
+
+
+@pytest.mark.parametrize("budget", [60, 80, 150, 300])
+def test_task_output_stays_within_budget(budget):
+    payloads = _payloads()
+    rendered = serialize_task(payloads, budget)
+
+    assert sum(estimate_tokens(text) for text in rendered) <= budget
+    assert estimate_tokens("".join(rendered)) <= budget
+    for payload, text in zip(payloads, rendered):
+        lines = text.splitlines()
+        noted = lines[-1].endswith("more lines omitted)")
+        kept = lines[:-1] if noted else lines
+        # Each payload keeps at least its header, in order, and says when it left lines out
+        assert kept and kept == payload.lines()[:len(kept)]
+        assert noted == (len(kept) < len(payload.lines()))
+
+
+def test_headers_are_kept_below_the_minimum_budget():
+    payloads = _payloads()
+    rendered = serialize_task(payloads, 1)
+    assert [text.splitlines() for text in rendered] == [
+        [payload.lines()[0], f"({len(payload.lines()) - 1} more lines omitted)"] for payload in payloads]
+
+
+def test_everything_fits_in_a_large_budget():
+    payloads = _payloads()
+    rendered = serialize_task(payloads, 10_000)
+    assert rendered == ["\n".join(payload.lines()) + "\n" for payload in payloads]
+    assert serialize(payloads[0], 10_000) == rendered[0]
@@ -0,0 +1,74 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import price_store
+from price_store import PriceStore
+
+
+class _Market:
+    """Stands in for yfinance: serves daily bars from a frame and records each requested start."""
+
+    def __init__(self, days=300):
+        index = pd.bdate_range(end=pd.Timestamp.today().normalize() - pd.Timedelta(days=10), periods=days, name="Date")
+        close = 100 + np.arange(days, dtype=float)
+        self.frame = pd.DataFrame({"Open": close - 1, "High": close + 1, "Low": close - 2, "Close": close,
+                                   "Volume": 1000.0}, index=index)
+        self.starts = []
+
+    def add_bars(self, count):
+        index = pd.bdate_range(self.frame.index[-1] + pd.offsets.BDay(), periods=count, name="Date")
+        close = self.frame["Close"].iloc[-1] + 1 + np.arange(count, dtype=float)
+        added = pd.DataFrame({"Open": close - 1, "High": close + 1, "Low": close - 2, "Close": close,
+                              "Volume": 1000.0}, index=index)
+        self.frame = pd.concat([self.frame, added])
+
+    def Ticker(self, ticker):
+        return self
+
+    def history(self, start=None, end=None, auto_adjust=True):
+        self.starts.append(date.fromisoformat(start))
+        frame = self.frame[self.frame.index >= pd.Timestamp(start)]
+        return frame if end is None else frame[frame.index < pd.Timestamp(end)]
+
+
+@pytest.fixture
+def market(monkeypatch):
+    market = _Market()
+    monkeypatch.setattr(price_store, "yf", market)
+    return market
+
+
+def _stored(store, ticker="AAPL"):
+    bars = store.load(ticker)
+    return pd.DataFrame(bars[:, 1:], index=price_store._to_index(bars[:, 0]), columns=price_store.OHLCV)
+
+
+def test_delta_fetch_refetches_the_last_two_bars(market, tmp_path):
+    store = PriceStore(root=str(tmp_path))
+    store.update("AAPL")
+    assert len(store.load("AAPL")) == 300
+
+    market.add_bars(3)
+    store.update("AAPL", force=True)
+    # One delta request starting at the second-to-last stored bar, no full download
+    assert len(market.starts) == 2
+    assert market.starts[-1] == market.frame.index[-5].date()
+    pd.testing.assert_frame_equal(_stored(store), market.frame, check_freq=False, check_index_type=False)
+
+
+def test_readjusted_history_is_downloaded_again(market, tmp_path):
+    store = PriceStore(root=str(tmp_path), lookback_years=5)
+    store.update("AAPL")
+
+    # A 2:1 split re-adjusts every earlier bar, including the overlapping ones
+    market.frame[["Open", "High", "Low", "Close"]] /= 2
+    market.add_bars(1)
+    store.update("AAPL", force=True)
+
+    # The delta request, then a full lookback download
+    assert market.starts[-2] == market.frame.index[-3].date()
+    assert market.starts[-1] < market.frame.index[0].date()
+    pd.testing.assert_frame_equal(_stored(store), market.frame, check_freq=False, check_index_type=False)
@@ -0,0 +1,75 @@
+import time
+
+import pytest
+
+import llm_cache
+import rate_limiter
+from llm_cache import CachedLLM
+from rate_limiter import RateScheduler
+
+
+class _RateLimitError(Exception):
+    status_code = 429
+
+
+@pytest.fixture
+def scheduler(tmp_path, monkeypatch):
+    scheduler = RateScheduler(path=str(tmp_path / "rate.sqlite3"), rpm=600, tpm=6000)
+    monkeypatch.setattr(llm_cache, "get_rate_scheduler", lambda: scheduler)
+    return scheduler
+
+
+def _llm():
+    return CachedLLM(model="groq/llama3-8b-8192", api_key="test", max_tokens=1000)
+
+
+def test_failed_call_refunds_its_reservation(scheduler, monkeypatch):
+    def fail(*args, **kwargs):
+        raise ConnectionError("connection reset")
+
+    monkeypatch.setattr(llm_cache, "_provider_call", fail)
+    with pytest.raises(ConnectionError):
+        _llm().call("hello")
+    # Only the refill since the reservation separates the bucket from full
+    assert scheduler.stats()["tokens_available"] == pytest.approx(6000, abs=10)
+
+
+def test_rate_limited_retries_refund_every_attempt(scheduler, monkeypatch):
+    calls = []
+
+    def provider(*args, **kwargs):
+        calls.append(time.time())
+        if len(calls) == 1:
+            raise _RateLimitError("rate limit reached, please try again in 10ms")
+        return "ok"
+
+    monkeypatch.setattr(llm_cache, "_provider_call", provider)
+    monkeypatch.setattr(rate_limiter, "_BACKOFF_BASE", 0.01)
+    assert _llm().call("hello") == "ok"
+    assert len(calls) == 2
+    stats = scheduler.stats()
+    # The successful attempt kept what it used (prompt and response); the failed one kept nothing
+    used = llm_cache._estimate_tokens("hello") + llm_cache._estimate_tokens("ok")
+    assert stats["tokens_available"] == pytest.approx(6000 - used, abs=10)
+    assert stats["strikes"] == 0
+
+
+def test_backoff_doubles_until_success(scheduler):
+    assert [scheduler.record_rate_limited() for _ in range(3)] == [2.0, 4.0, 8.0]
+    # A longer wait suggested by the provider wins
+    assert scheduler.record_rate_limited(retry_after=30) == 30
+    assert scheduler.stats()["blocked_for"] == pytest.approx(30, abs=1)
+    assert scheduler.stats()["strikes"] == 4
+
+    scheduler.record_success()
+    assert scheduler.record_rate_limited() == 2.0
+
+
+def test_backoff_keeps_tokens_earned_before_it(scheduler):
+    # Empty the token bucket 30 seconds ago: half a minute of refill (3000 tokens) is owed
+    scheduler._conn.execute("UPDATE buckets SET tokens = 0, updated_at = ?", (time.time() - 30,))
+    scheduler.record_rate_limited()
+    stats = scheduler.stats()
+    assert stats["tokens_available"] == pytest.approx(3000, abs=10)
+    assert stats["requests_available"] == 0
+    assert scheduler._try_take(1) == pytest.approx(2.0, abs=0.1)
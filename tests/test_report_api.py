@@ -0,0 +1,106 @@
+import asyncio
+import json
+import uuid
+
+import pytest
+
+import report_api
+from artifact_store import ArtifactStore
+from report_api import ReportAPIServer, ReportJobQueue
+
+
+class _Result:
+    def __init__(self, run_id):
+        self.run_id = run_id
+
+
+class _Service:
+    """Stands in for ReportService: stores a one-line report per ticker without running a crew."""
+
+    def __init__(self, artifacts):
+        self.artifacts = artifacts
+
+    def generate(self, ticker):
+        run_id = uuid.uuid4().hex
+        self.artifacts.save(run_id, ticker, f"# {ticker} report")
+        return _Result(run_id)
+
+
+@pytest.fixture
+def artifacts(tmp_path):
+    return ArtifactStore(root=str(tmp_path / "reports"))
+
+
+def _request(server, method, target, body=None, headers=None):
+    payload = json.dumps(body).encode("utf-8") if body is not None else b""
+    lines = [f"{method} {target} HTTP/1.1", "Host: localhost", f"Content-Length: {len(payload)}"]
+    lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+    reader = asyncio.StreamReader()
+    reader.feed_data(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + payload)
+    reader.feed_eof()
+    return server._dispatch(reader)
+
+
+def test_submit_and_poll_job(artifacts):
+    async def scenario():
+        queue = ReportJobQueue(_Service(artifacts), workers=1)
+        server = ReportAPIServer(queue)
+        status, body, _ = await _request(server, "POST", "/jobs", {"ticker": "AAPL"})
+        assert status == 202
+        job_id = json.loads(body)["jobs"][0]["id"]
+
+        status, body, _ = await _request(server, "GET", f"/jobs/{job_id}")
+        assert status == 200 and json.loads(body)["status"] == "queued"
+        status, _, _ = await _request(server, "GET", f"/jobs/{job_id}/report")
+        assert status == 409
+
+        queue.start()
+        await asyncio.wait_for(queue._queue.join(), timeout=10)
+        await queue.stop()
+
+        status, body, _ = await _request(server, "GET", f"/jobs/{job_id}")
+        job = json.loads(body)
+        assert status == 200 and job["status"] == "done" and job["ticker"] == "AAPL"
+        status, body, content_type = await _request(server, "GET", f"/jobs/{job_id}/report")
+        assert (status, body, content_type) == (200, "# AAPL report", "text/markdown")
+
+        status, body, _ = await _request(server, "GET", "/reports?ticker=aapl")
+        reports = json.loads(body)["reports"]
+        assert status == 200 and [r["run_id"] for r in reports] == [job["run_id"]]
+        status, _, _ = await _request(server, "GET", "/jobs/unknown")
+        assert status == 404
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("body", [{"tickers": "AAPL"}, {"tickers": {"AAPL": 1}}, ["AAPL"], {}])
+def test_malformed_submission_is_rejected(artifacts, body):
+    async def scenario():
+        queue = ReportJobQueue(_Service(artifacts), workers=1)
+        status, _, _ = await _request(ReportAPIServer(queue), "POST", "/jobs", body)
+        assert status == 400
+        assert queue.jobs == {}
+
+    asyncio.run(scenario())
+
+
+def test_oversized_body_is_rejected(artifacts, monkeypatch):
+    monkeypatch.setattr(report_api, "REPORT_API_MAX_BODY", 64)
+
+    async def scenario():
+        queue = ReportJobQueue(_Service(artifacts), workers=1)
+        status, _, _ = await _request(ReportAPIServer(queue), "POST", "/jobs", {"tickers": ["AAPL"] * 20})
+        assert status == 413
+        assert queue.jobs == {}
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_returns_503(artifacts):
+    async def scenario():
+        queue = ReportJobQueue(_Service(artifacts), workers=1, queue_size=1)
+        status, body, _ = await _request(ReportAPIServer(queue), "POST", "/jobs", {"tickers": ["AAPL", "MSFT"]})
+        assert status == 503
+        assert [job["ticker"] for job in json.loads(body)["accepted"]] == ["AAPL"]
+
+    asyncio.run(scenario())
@@ -0,0 +1,44 @@
+import time
+
+import pytest
+
+import report_render
+from report_render import render_report
+
+
+@pytest.fixture
+def pdf_calls(monkeypatch):
+    """Replace wkhtmltopdf with a converter that fails once, then succeeds."""
+    calls = []
+
+    def render_pdf(html):
+        calls.append(html)
+        return (None, "wkhtmltopdf exited with code 1") if len(calls) == 1 else (b"%PDF-1.4", None)
+
+    monkeypatch.setattr(report_render, "_render_pdf", render_pdf)
+    monkeypatch.setattr(report_render, "_cache", report_render.OrderedDict())
+    monkeypatch.setattr(report_render, "RENDER_PDF_RETRY_SECONDS", 0.2)
+    return calls
+
+
+def test_failed_pdf_is_retried_after_the_retry_window(pdf_calls):
+    failed = render_report("# AAPL report")
+    assert failed.pdf is None and failed.pdf_error
+    # Reruns within the window reuse the failure instead of starting wkhtmltopdf again
+    assert render_report("# AAPL report") is failed
+    assert len(pdf_calls) == 1
+
+    time.sleep(0.25)
+    retried = render_report("# AAPL report")
+    assert retried.pdf == b"%PDF-1.4" and retried.pdf_error is None
+    assert len(pdf_calls) == 2
+
+
+def test_successful_render_is_reused(pdf_calls):
+    pdf_calls.append("first call already failed")
+    rendered = render_report("# MSFT report")
+    assert rendered.pdf == b"%PDF-1.4"
+
+    time.sleep(0.25)
+    assert render_report("# MSFT report") is rendered
+    assert len(pdf_calls) == 2
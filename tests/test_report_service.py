@@ -0,0 +1,16 @@
+from agents_tasks import build_crew, get_llm
+from llm_cache import CachedLLM
+
+
+def test_run_copy_keeps_cached_llm():
+    crew = build_crew(get_llm())
+    run_crew = crew.copy()
+
+    llms = [agent.llm for agent in run_crew.agents] + [run_crew.manager_agent.llm]
+    for llm in llms:
+        assert isinstance(llm, CachedLLM)
+        assert llm.model == get_llm().model
+        assert llm.max_tokens == get_llm().max_tokens
+        assert llm.stream == get_llm().stream
+    # Each run gets its own instances, not the shared one
+    assert all(llm is not get_llm() for llm in llms)
@@ -0,0 +1,35 @@
+import os
+
+import pytest
+
+import ticker_index
+from ticker_index import TickerIndex, resolve_ticker
+
+LISTINGS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "listings.csv")
+
+
+@pytest.fixture
+def index(monkeypatch):
+    index = TickerIndex.from_files(LISTINGS)
+    monkeypatch.setattr(ticker_index, "_index", index)
+    return index
+
+
+@pytest.mark.parametrize("text, symbol", [
+    ("aapl", "AAPL"), ("$msft", "MSFT"), ("Apple", "AAPL"), ("nvidea", "NVDA"),
+    ("jp morgan", "JPM"), ("berkshire hath", "BRK-B"), ("ROKU", "ROKU"), ("$roku", "ROKU"),
+])
+def test_resolve_ticker(index, text, symbol):
+    assert resolve_ticker(text) == symbol
+
+
+@pytest.mark.parametrize("text", ["google", "roku", "Bank", "General", "american"])
+def test_unclear_input_is_not_passed_through(index, text):
+    with pytest.raises(ValueError):
+        resolve_ticker(text)
+
+
+@pytest.mark.parametrize("text, symbol", [("Ford", "F"), ("ford", "F"), ("FORD", "FORD"), ("$ford", "FORD")])
+def test_name_wins_unless_typed_as_a_symbol(index, text, symbol):
+    index.add("FORD", "Forward Industries, Inc.")
+    assert resolve_ticker(text) == symbol
@@ -0,0 +1,94 @@
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from web_cache import WebCache
+
+
+class _Handler(BaseHTTPRequestHandler):
+    pages = {}
+    requests = []
+
+    def do_GET(self):
+        body = self.pages[self.path].encode("utf-8")
+        etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+        self.requests.append((self.path, self.headers.get("If-None-Match")))
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    _Handler.pages, _Handler.requests = {}, []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _html(paragraphs):
+    return "<html><body>" + "".join(f"<p>{p}</p>" for p in paragraphs) + "</body></html>"
+
+
+def _paragraph(topic):
+    # Long enough that each paragraph is a chunk of its own
+    return " ".join(f"{topic} revenue grew in quarter {i}." for i in range(20))
+
+
+def test_unchanged_page_is_revalidated_not_downloaded(server, tmp_path):
+    _Handler.pages["/a"] = _html([_paragraph("cloud"), _paragraph("retail")])
+    cache = WebCache(path=str(tmp_path / "web.sqlite3"), ttl=0)
+
+    first = cache.fetch(server + "/a")
+    second = cache.fetch(server + "/a")
+    assert not first.cached and second.cached
+    assert second.text == first.text and second.digest == first.digest
+    assert _Handler.requests[-1][1] is not None
+    assert cache.stats["page_downloads"] == 1 and cache.stats["page_revalidated"] == 1
+
+
+def test_edited_paragraph_reembeds_one_chunk(server, tmp_path):
+    paragraphs = [_paragraph("cloud"), _paragraph("retail"), _paragraph("devices")]
+    _Handler.pages["/a"] = _html(paragraphs)
+    cache = WebCache(path=str(tmp_path / "web.sqlite3"), ttl=0)
+    cache.search(server + "/a", "cloud revenue")
+    assert cache.stats["chunks_embedded"] == 3
+
+    paragraphs[1] = _paragraph("wholesale")
+    _Handler.pages["/a"] = _html(paragraphs)
+    cache.search(server + "/a", "wholesale revenue")
+    assert cache.stats["page_downloads"] == 2
+    assert cache.stats["chunks_embedded"] == 4
+    assert cache.stats["chunk_hits"] == 2
+
+
+def test_eviction_keeps_tables_within_bounds(server, tmp_path):
+    for path in ("/a", "/b", "/c"):
+        _Handler.pages[path] = _html([_paragraph(path.strip("/")), _paragraph(path.strip("/") * 2)])
+    cache = WebCache(path=str(tmp_path / "web.sqlite3"), ttl=0, max_pages=2, max_chunks=3)
+    for path in ("/a", "/b", "/c"):
+        cache.search(server + path, "revenue")
+
+    count = lambda table: cache._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    assert count("pages") == 2
+    assert count("texts") <= 2
+    assert count("embeddings") == 3
+    # The least recently used page went first
+    urls = {row[0] for row in cache._conn.execute("SELECT url FROM pages")}
+    assert urls == {server + "/b", server + "/c"}
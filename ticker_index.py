@@ -0,0 +1,363 @@
+"""Offline ticker resolution from local listing files.
+
+User input such as "aapl", "$MSFT", "Apple" or "nvidea" is resolved to a
+canonical symbol before a report starts, without an LLM round trip or a
+yfinance request:
+
+    python ticker_index.py apple "berkshire hath" nvidea
+    python ticker_index.py --download   # fetch the full Nasdaq Trader symbol directories
+
+The index is built once from TICKER_LISTING_PATH (comma-separated; missing
+files are skipped). Each file is either a CSV with Symbol and Security Name
+columns or a pipe-separated Nasdaq Trader directory file (nasdaqlisted.txt,
+otherlisted.txt). Lookups try, in order: exact symbol, exact company name,
+a unique company name prefix (trie) and fuzzy name matching (trigrams).
+"""
+import argparse
+import csv
+import os
+import re
+import threading
+import time
+import urllib.request
+
+TICKER_LISTING_PATH = os.getenv(
+    "TICKER_LISTING_PATH",
+    ",".join(os.path.join("data", name) for name in ("listings.csv", "nasdaqlisted.txt", "otherlisted.txt")),
+)
+# Reject input typed as a ticker ("TSLA", "$tsla") that is not in the listings instead of passing it through
+TICKER_STRICT = os.getenv("TICKER_STRICT", "false").lower() in ("1", "true", "yes")
+# Minimum trigram similarity (0-1) for a fuzzy name match to resolve on its own
+TICKER_FUZZY_THRESHOLD = float(os.getenv("TICKER_FUZZY_THRESHOLD", "0.45"))
+# Share of a company name (0-1) a unique prefix must cover to resolve on its own ("Bank" is not Bank of America)
+TICKER_PREFIX_MIN_SCORE = float(os.getenv("TICKER_PREFIX_MIN_SCORE", "0.6"))
+
+NASDAQ_TRADER_URLS = {
+    "nasdaqlisted.txt": "https://www.nasdaqtrader.com/dynamic/SymDir/nasdaqlisted.txt",
+    "otherlisted.txt": "https://www.nasdaqtrader.com/dynamic/SymDir/otherlisted.txt",
+}
+
+# Looks like a ticker: BRK-B, BRK.B, 0700.HK, ^GSPC
+_SYMBOL_SHAPE = re.compile(r"^\^?[A-Z0-9]{1,6}([.-][A-Z]{1,3})?$")
+# Trailing words that do not tell companies apart
+_NAME_SUFFIXES = {
+    "inc", "incorporated", "corp", "corporation", "co", "company", "ltd", "limited", "plc", "llc",
+    "lp", "sa", "se", "nv", "ag", "holdings", "holding", "group", "the",
+}
+# Words many company names share; input made only of these never resolves without confirmation
+GENERIC_NAME_WORDS = {
+    "general", "american", "america", "national", "international", "united", "first", "global", "bank",
+    "bancorp", "financial", "capital", "trust", "energy", "industries", "technologies", "technology",
+    "systems", "services", "resources", "pharmaceuticals", "therapeutics", "motors", "electric", "partners",
+    "investors", "fund", "of", "and", "the", "new", "north", "south", "western", "eastern", "pacific",
+}
+_SHARE_CLASS = re.compile(r"\b(class [a-z]|common stock|ordinary shares|american depositary shares?|ads)\b.*$")
+
+
+def normalize_symbol(symbol: str) -> str:
+    """Upper-case a symbol in yfinance form ("$brk.b" -> "BRK-B")."""
+    return symbol.strip().lstrip("$").upper().replace(".", "-").replace("/", "-")
+
+
+def normalize_name(name: str) -> str:
+    """Lower-case a company name without punctuation, share class or legal suffixes."""
+    name = name.lower().split(" - ")[0].replace("&", " and ")
+    name = _SHARE_CLASS.sub("", name)
+    words = re.sub(r"[^a-z0-9 ]+", " ", name).split()
+    while len(words) > 1 and words[-1] in _NAME_SUFFIXES:
+        words.pop()
+    if len(words) > 1 and words[0] == "the":
+        words.pop(0)
+    return " ".join(words)
+
+
+def is_explicit_symbol(text: str) -> bool:
+    """True for input clearly typed as a ticker: "$tsla", or upper case as typed such as "TSLA"."""
+    text = (text or "").strip()
+    return bool(_SYMBOL_SHAPE.match(text.lstrip("$").upper())) and (text.startswith("$") or text == text.upper())
+
+
+def is_generic_name(name: str) -> bool:
+    """True when a normalized name consists only of words many companies share ("general", "bank of")."""
+    words = name.split()
+    return not words or all(word in GENERIC_NAME_WORDS for word in words)
+
+
+def _trigrams(text: str) -> set:
+    # Spaces are dropped so "jp morgan" and "jpmorgan" share their trigrams
+    padded = f"  {text.replace(' ', '')} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def load_listing(path: str) -> list:
+    """Return (symbol, name) pairs from a listing CSV or a Nasdaq Trader directory file."""
+    with open(path, "r", encoding="utf-8-sig", newline="") as file:
+        header = file.readline()
+        delimiter = "|" if "|" in header else ","
+        file.seek(0)
+        rows = csv.DictReader(file, delimiter=delimiter)
+        pairs = []
+        for row in rows:
+            symbol = row.get("Symbol") or row.get("ACT Symbol") or ""
+            name = row.get("Security Name") or row.get("Name") or ""
+            # The directory files end with a "File Creation Time" line and list test issues
+            if not symbol or not name or symbol.startswith("File Creation Time") or row.get("Test Issue") == "Y":
+                continue
+            pairs.append((normalize_symbol(symbol), name.strip()))
+    return pairs
+
+
+class Resolution:
+    """A symbol matched for some input, how it was matched and how confident the match is (0-1)."""
+
+    def __init__(self, symbol: str, name: str, method: str, score: float = 1.0):
+        self.symbol = symbol
+        self.name = name
+        self.method = method
+        self.score = score
+
+    def label(self) -> str:
+        return f"{self.symbol} — {self.name}"
+
+    def __repr__(self):
+        return f"Resolution({self.symbol!r}, {self.name!r}, {self.method!r}, {self.score:.2f})"
+
+
+class _Trie:
+    """Prefix tree mapping keys to the symbols stored under them."""
+
+    _END = ""
+
+    def __init__(self):
+        self._root = {}
+
+    def insert(self, key: str, symbol: str):
+        node = self._root
+        for char in key:
+            node = node.setdefault(char, {})
+        symbols = node.setdefault(self._END, [])
+        if symbol not in symbols:
+            symbols.append(symbol)
+
+    def find(self, prefix: str, limit: int = None) -> list:
+        """Symbols under keys starting with prefix; shorter keys first, at most limit of them."""
+        node = self._root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return []
+        found, level = [], [node]
+        while level and (limit is None or len(found) < limit):
+            next_level = []
+            for current in level:
+                for char in sorted(current):
+                    if char == self._END:
+                        found.extend(s for s in current[char] if s not in found)
+                    else:
+                        next_level.append(current[char])
+            level = next_level
+        return found if limit is None else found[:limit]
+
+
+class TickerIndex:
+    """In-memory symbol and company name index with exact, prefix and fuzzy lookups."""
+
+    def __init__(self, listings=()):
+        self.names = {}
+        self._by_name = {}
+        self._normalized = {}
+        self._symbols = _Trie()
+        self._name_trie = _Trie()
+        self._grams = {}
+        self._gram_counts = {}
+        for symbol, name in listings:
+            self.add(symbol, name)
+
+    @classmethod
+    def from_files(cls, paths) -> "TickerIndex":
+        if isinstance(paths, str):
+            paths = [p.strip() for p in paths.split(",") if p.strip()]
+        index = cls()
+        for path in paths:
+            if os.path.exists(path):
+                for symbol, name in load_listing(path):
+                    index.add(symbol, name)
+        return index
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, symbol: str):
+        return normalize_symbol(symbol) in self.names
+
+    def add(self, symbol: str, name: str):
+        symbol = normalize_symbol(symbol)
+        if symbol in self.names:
+            return
+        self.names[symbol] = name
+        self._symbols.insert(symbol, symbol)
+
+        normalized = normalize_name(name)
+        if not normalized:
+            return
+        self._normalized[symbol] = normalized
+        self._by_name.setdefault(normalized, []).append(symbol)
+        self._name_trie.insert(normalized, symbol)
+        grams = _trigrams(normalized)
+        self._gram_counts[symbol] = len(grams)
+        for gram in grams:
+            self._grams.setdefault(gram, []).append(symbol)
+
+    def _resolution(self, symbol: str, method: str, score: float = 1.0) -> Resolution:
+        return Resolution(symbol, self.names[symbol], method, score)
+
+    def fuzzy(self, text: str, limit: int = 5, min_score: float = 0.3) -> list:
+        """Closest company names by trigram similarity, best first.
+
+        The score averages the Dice coefficient with the share of the query's
+        trigrams found in the name, so a close but shorter query still scores well.
+        """
+        query = _trigrams(normalize_name(text))
+        shared = {}
+        for gram in query:
+            for symbol in self._grams.get(gram, ()):
+                shared[symbol] = shared.get(symbol, 0) + 1
+        scored = []
+        for symbol, common in shared.items():
+            size = self._gram_counts[symbol]
+            score = (2 * common / (len(query) + size) + common / len(query)) / 2
+            if score >= min_score:
+                scored.append((score, symbol))
+        scored.sort(key=lambda item: (-item[0], len(self._normalized[item[1]]), item[1]))
+        return [self._resolution(symbol, "fuzzy", round(score, 3)) for score, symbol in scored[:limit]]
+
+    def resolve(self, text: str):
+        """Return the Resolution for text, or None if nothing matches confidently.
+
+        Input typed as a ticker ("TSLA", "$tsla") is looked up as a symbol
+        first; anything else is matched as a company name first and only
+        then as a symbol, so "Ford" gives F rather than FORD.
+        """
+        if not text or not text.strip():
+            return None
+        symbol = normalize_symbol(text)
+        if is_explicit_symbol(text) and symbol in self.names:
+            return self._resolution(symbol, "symbol")
+        match = self._resolve_name(text)
+        if match is None and symbol in self.names:
+            return self._resolution(symbol, "symbol")
+        return match
+
+    def _resolve_name(self, text: str):
+        name = normalize_name(text)
+        if not name:
+            return None
+        if name in self._by_name:
+            return self._resolution(self._by_name[name][0], "name")
+        if is_generic_name(name):
+            return None
+        if len(name) >= 3:
+            matches = self._name_trie.find(name, limit=2)
+            if len(matches) == 1:
+                score = len(name) / len(self._normalized[matches[0]])
+                if score >= TICKER_PREFIX_MIN_SCORE:
+                    return self._resolution(matches[0], "prefix", round(score, 3))
+
+        best = self.fuzzy(text, limit=2)
+        # A near tie between two companies needs the user to pick one
+        if best and best[0].score >= TICKER_FUZZY_THRESHOLD and (len(best) == 1 or best[0].score - best[1].score >= 0.05):
+            return best[0]
+        return None
+
+    def suggest(self, text: str, limit: int = 8) -> list:
+        """Completions for partial input: symbol prefixes, then name prefixes, then fuzzy matches."""
+        if not text or not text.strip():
+            return []
+        suggestions = {}
+        symbol, name = normalize_symbol(text), normalize_name(text)
+        for found in self._symbols.find(symbol, limit):
+            suggestions.setdefault(found, self._resolution(found, "symbol" if found == symbol else "prefix"))
+        if name and len(suggestions) < limit:
+            for found in self._name_trie.find(name, limit):
+                suggestions.setdefault(found, self._resolution(found, "prefix"))
+        if name and len(suggestions) < limit:
+            for match in self.fuzzy(text, limit):
+                suggestions.setdefault(match.symbol, match)
+        return list(suggestions.values())[:limit]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_ticker_index() -> TickerIndex:
+    """Return the process-wide index, building it from TICKER_LISTING_PATH on first use."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = TickerIndex.from_files(TICKER_LISTING_PATH)
+        return _index
+
+
+def resolve_ticker(text: str, strict: bool = TICKER_STRICT) -> str:
+    """Return the canonical symbol for a ticker or company name.
+
+    Input that matches nothing is passed through only when it was clearly
+    typed as a ticker (see is_explicit_symbol) and strict is off; otherwise
+    ValueError is raised, listing a few suggestions.
+    """
+    text = (text or "").strip()
+    if not text:
+        raise ValueError("No ticker or company name given")
+    index = get_ticker_index()
+    resolution = index.resolve(text)
+    if resolution is not None:
+        return resolution.symbol
+
+    if is_explicit_symbol(text) and not (strict and len(index)):
+        return text.lstrip("$").upper()
+    suggestions = ", ".join(s.label() for s in index.suggest(text, limit=3))
+    raise ValueError(f"Unknown ticker or company '{text}'" + (f"; did you mean {suggestions}?" if suggestions else ""))
+
+
+def download_listings(directory: str = "data") -> list:
+    """Download the Nasdaq Trader symbol directories (needs network access)."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for name, url in NASDAQ_TRADER_URLS.items():
+        path = os.path.join(directory, name)
+        with urllib.request.urlopen(url, timeout=30) as response:
+            data = response.read()
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as file:
+            file.write(data)
+        os.replace(temp_path, path)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resolve tickers and company names offline")
+    parser.add_argument("queries", nargs="*")
+    parser.add_argument("--download", action="store_true", help="fetch the Nasdaq Trader symbol directories")
+    parser.add_argument("--limit", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.download:
+        for path in download_listings():
+            print(f"Wrote {path}")
+
+    started = time.perf_counter()
+    index = get_ticker_index()
+    print(f"{len(index)} symbols indexed in {(time.perf_counter() - started) * 1000:.1f} ms")
+    for query in args.queries:
+        started = time.perf_counter()
+        resolution = index.resolve(query)
+        elapsed = (time.perf_counter() - started) * 1e6
+        print(f"{query!r}: {resolution!r} ({elapsed:.0f} µs)")
+        for suggestion in index.suggest(query, args.limit):
+            print(f"    {suggestion.label()} [{suggestion.method}]")
+
+
+if __name__ == "__main__":
+    main()
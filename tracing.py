@@ -0,0 +1,334 @@
+"""Local tracing: timed spans written to a JSONL file, with latency summaries.
+
+    with span("tool.fetch_news", ticker="AAPL") as s:
+        ...
+        s.set(articles=7)
+
+Every span becomes one JSON line in TRACE_PATH with its name, duration,
+trace/parent ids and attributes (ticker, task, tokens, ...). Nothing leaves
+the machine. Summaries per span name:
+
+    python tracing.py [--since 3600] [--name "llm.*"] [--by ticker]
+
+Spans whose name matches TRACE_PROFILE (comma-separated glob patterns) also
+run under cProfile; the stats are written to TRACE_PROFILE_DIR and the file
+name is stored on the span as "profile".
+"""
+import argparse
+import contextvars
+import cProfile
+import fnmatch
+import functools
+import inspect
+import json
+import math
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+TRACING_ENABLED = os.getenv("TRACING", "true").lower() in ("1", "true", "yes")
+TRACE_PATH = os.getenv("TRACE_PATH", os.path.join("db", "traces.jsonl"))
+# The trace file is rotated to TRACE_PATH + ".1" when it grows past this size
+TRACE_MAX_BYTES = int(os.getenv("TRACE_MAX_BYTES", str(50 * 2**20)))
+TRACE_PROFILE = [p.strip() for p in os.getenv("TRACE_PROFILE", "").split(",") if p.strip()]
+TRACE_PROFILE_DIR = os.getenv("TRACE_PROFILE_DIR", os.path.join("db", "profiles"))
+
+# Attributes a span inherits from its parent unless it sets them itself
+_INHERITED = ("ticker", "task")
+
+_current = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """One timed operation; attributes can be added while it is open."""
+
+    def __init__(self, name: str, parent=None, **attributes):
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.trace_id = parent.trace_id if parent is not None else uuid.uuid4().hex
+        self.parent_id = parent.span_id if parent is not None else None
+        self.attributes = {}
+        if parent is not None:
+            self.attributes.update({k: parent.attributes[k] for k in _INHERITED if k in parent.attributes})
+        self.attributes.update({k: v for k, v in attributes.items() if v is not None})
+        self.start = time.time()
+        self.status = "ok"
+        self.error = None
+
+    def set(self, **attributes):
+        self.attributes.update({k: v for k, v in attributes.items() if v is not None})
+
+    def to_record(self, duration: float) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": round(self.start, 6),
+            "duration_ms": round(duration * 1000, 3),
+            "status": self.status,
+            "error": self.error,
+            "thread": threading.current_thread().name,
+            "attributes": self.attributes,
+        }
+
+
+class _NoSpan:
+    """Stand-in returned by current_span() outside any span; attributes are dropped."""
+
+    def set(self, **attributes):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+class JSONLSink:
+    """Appends span records to a JSON Lines file, rotating it at max_bytes."""
+
+    def __init__(self, path: str = TRACE_PATH, max_bytes: int = TRACE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._file = None
+
+    def write(self, record: dict):
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            if self._file is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(line)
+            self._file.flush()
+            if self._file.tell() > self.max_bytes:
+                self._file.close()
+                self._file = None
+                os.replace(self.path, self.path + ".1")
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+_sink = JSONLSink()
+
+
+def set_sink(sink):
+    """Send spans somewhere else (anything with a write(record) method); returns the previous sink."""
+    global _sink
+    previous, _sink = _sink, sink
+    return previous
+
+
+def current_span():
+    """Return the innermost open span on this thread, or a no-op stand-in."""
+    return _current.get() or _NO_SPAN
+
+
+def _profile_path(name: str) -> str:
+    os.makedirs(TRACE_PROFILE_DIR, exist_ok=True)
+    safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in name)
+    return os.path.join(TRACE_PROFILE_DIR, f"{safe}.{time.strftime('%Y%m%d-%H%M%S')}.{uuid.uuid4().hex[:6]}.prof")
+
+
+def _start_profiler(name: str):
+    if not any(fnmatch.fnmatchcase(name, pattern) for pattern in TRACE_PROFILE):
+        return None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiler is already active on this interpreter (Python 3.12+)
+        return None
+    return profiler
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Time the enclosed block as a span named name and write it to the sink."""
+    if not TRACING_ENABLED:
+        yield Span(name, **attributes)
+        return
+
+    current = Span(name, _current.get(), **attributes)
+    token = _current.set(current)
+    profiler = _start_profiler(name) if TRACE_PROFILE else None
+    started = time.perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        current.status = "error"
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        duration = time.perf_counter() - started
+        _current.reset(token)
+        if profiler is not None:
+            profiler.disable()
+            path = _profile_path(name)
+            profiler.dump_stats(path)
+            current.set(profile=path)
+        _write(current.to_record(duration))
+
+
+def record_span(name: str, start: float, duration: float, status: str = "ok", error: str = None, **attributes):
+    """Write a span whose start and end were observed separately (e.g. from event callbacks)."""
+    if not TRACING_ENABLED:
+        return
+    finished = Span(name, **attributes)
+    finished.start = start
+    finished.status = status
+    finished.error = error
+    _write(finished.to_record(duration))
+
+
+def _write(record: dict):
+    try:
+        _sink.write(record)
+    except Exception as e:
+        # Tracing must never break a report run
+        print(f"Trace write failed: {e}")
+
+
+def traced(name: str = None):
+    """Decorator form of span(); a leading ``ticker`` argument is recorded as an attribute."""
+    def decorate(fn):
+        span_name = name or fn.__qualname__
+        params = list(inspect.signature(fn).parameters)
+        takes_ticker = bool(params) and params[0] == "ticker"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            ticker = kwargs.get("ticker", args[0] if args else None) if takes_ticker else None
+            with span(span_name, ticker=ticker.strip().upper() if isinstance(ticker, str) else None):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# Attributes and token counts for crewai tasks by task id, so LLM calls made
+# on crewai's own threads can still be attributed to a ticker and task
+_task_attributes = {}
+_task_tokens = {}
+_task_lock = threading.Lock()
+
+
+def _task_key(task) -> str:
+    return str(getattr(task, "id", task))
+
+
+def bind_task(task, /, **attributes):
+    with _task_lock:
+        _task_attributes[_task_key(task)] = attributes
+        _task_tokens[_task_key(task)] = 0
+
+
+def unbind_task(task):
+    with _task_lock:
+        _task_attributes.pop(_task_key(task), None)
+        _task_tokens.pop(_task_key(task), None)
+
+
+def task_attributes(task) -> dict:
+    """Return the attributes bound to a crewai task (or task id), or {} if it is not bound."""
+    if task is None:
+        return {}
+    with _task_lock:
+        return dict(_task_attributes.get(_task_key(task), {}))
+
+
+def add_task_tokens(task, tokens: int):
+    if task is None:
+        return
+    with _task_lock:
+        key = _task_key(task)
+        if key in _task_tokens:
+            _task_tokens[key] += tokens
+
+
+def task_tokens(task) -> int:
+    with _task_lock:
+        return _task_tokens.get(_task_key(task), 0)
+
+
+def _percentile(ordered: list, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    index = min(len(ordered), max(1, math.ceil(fraction * len(ordered)))) - 1
+    return ordered[index]
+
+
+def load_spans(path: str = TRACE_PATH, since: float = None) -> list:
+    """Read span records from the trace file (and its rotated predecessor)."""
+    records = []
+    for candidate in (path + ".1", path):
+        if not os.path.exists(candidate):
+            continue
+        with open(candidate, "r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if since is None or record["start"] >= since:
+                    records.append(record)
+    return records
+
+
+def summarize(records: list, by: str = None) -> dict:
+    """Group spans by name (and optionally an attribute) with count, p50, p95, max and errors in ms."""
+    groups = {}
+    for record in records:
+        key = record["name"]
+        if by:
+            key = f"{key} [{record['attributes'].get(by, '-')}]"
+        groups.setdefault(key, []).append(record)
+
+    summary = {}
+    for key, group in sorted(groups.items()):
+        durations = sorted(r["duration_ms"] for r in group)
+        summary[key] = {
+            "count": len(durations),
+            "p50_ms": _percentile(durations, 0.50),
+            "p95_ms": _percentile(durations, 0.95),
+            "max_ms": durations[-1],
+            "total_ms": sum(durations),
+            "errors": sum(1 for r in group if r["status"] != "ok"),
+        }
+    return summary
+
+
+def format_summary(summary: dict) -> str:
+    lines = [f"{'span':<48}{'count':>7}{'p50 ms':>11}{'p95 ms':>11}{'max ms':>11}{'total s':>10}{'errors':>8}"]
+    for key, row in summary.items():
+        lines.append(
+            f"{key:<48}{row['count']:>7}{row['p50_ms']:>11.1f}{row['p95_ms']:>11.1f}"
+            f"{row['max_ms']:>11.1f}{row['total_ms'] / 1000:>10.2f}{row['errors']:>8}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize local trace spans")
+    parser.add_argument("--path", default=TRACE_PATH)
+    parser.add_argument("--since", type=float, help="only spans from the last N seconds")
+    parser.add_argument("--name", help="glob pattern for span names, e.g. 'tool.*'")
+    parser.add_argument("--by", help="also group by this attribute, e.g. ticker or task")
+    args = parser.parse_args()
+
+    records = load_spans(args.path, time.time() - args.since if args.since else None)
+    if args.name:
+        records = [r for r in records if fnmatch.fnmatchcase(r["name"], args.name)]
+    if not records:
+        print(f"No spans in {args.path}")
+        return
+    print(format_summary(summarize(records, args.by)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+"""Local cache for web pages and chunk embeddings used by the research tools.
+
+Pages are fetched at most once per WEB_PAGE_TTL; after that a conditional
+request (ETag / Last-Modified) revalidates them, so an unchanged page is not
+downloaded or parsed again. Extracted page text is stored once per content
+hash, and chunk embeddings are keyed by chunk hash and embedding model, so
+only chunks whose text changed are ever embedded. Every table is bounded and
+evicts its least recently used rows.
+
+The default embedder is a local feature-hashing model (numpy only, no
+downloads). WEB_EMBEDDING="sentence-transformers/<model>" uses a local
+sentence-transformers model instead, if that package is installed.
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from html.parser import HTMLParser
+
+import numpy as np
+import requests
+
+from tracing import span
+
+WEB_CACHE_PATH = os.getenv("WEB_CACHE_PATH", os.path.join("db", "web_cache.sqlite3"))
+# Seconds a fetched page is served without revalidating it
+WEB_PAGE_TTL = int(os.getenv("WEB_PAGE_TTL", str(6 * 3600)))
+WEB_CACHE_MAX_PAGES = int(os.getenv("WEB_CACHE_MAX_PAGES", "500"))
+WEB_CACHE_MAX_CHUNKS = int(os.getenv("WEB_CACHE_MAX_CHUNKS", "20000"))
+WEB_FETCH_TIMEOUT = float(os.getenv("WEB_FETCH_TIMEOUT", "15"))
+# Larger responses are cut off at this size
+WEB_MAX_PAGE_BYTES = int(os.getenv("WEB_MAX_PAGE_BYTES", str(2 * 2**20)))
+WEB_CHUNK_CHARS = int(os.getenv("WEB_CHUNK_CHARS", "1000"))
+WEB_EMBEDDING = os.getenv("WEB_EMBEDDING", "hashing")
+
+_USER_AGENT = "Mozilla/5.0 (compatible; stock-report-research/1.0)"
+_SKIPPED_TAGS = {"script", "style", "noscript", "svg", "template", "iframe"}
+_BLOCK_TAGS = {"p", "div", "br", "li", "tr", "section", "article", "h1", "h2", "h3", "h4", "h5", "h6", "title"}
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self._skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIPPED_TAGS:
+            self._skipping += 1
+        elif tag in _BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in _SKIPPED_TAGS:
+            self._skipping = max(0, self._skipping - 1)
+        elif tag in _BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self._skipping:
+            self.parts.append(data)
+
+
+def extract_text(html: str) -> str:
+    """Visible text of an HTML document, one block per line."""
+    parser = _TextExtractor()
+    parser.feed(html)
+    parser.close()
+    lines = (" ".join(line.split()) for line in "".join(parser.parts).splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def chunk_text(text: str, size: int = WEB_CHUNK_CHARS) -> list:
+    """Split text into chunks of at most size characters, on line boundaries where possible."""
+    chunks, current = [], ""
+    for line in text.splitlines():
+        while len(line) > size:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(line[:size])
+            line = line[size:]
+        if current and len(current) + len(line) + 1 > size:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n{line}" if current else line
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class HashingEmbedder:
+    """Local bag-of-words embedder: hashed unigrams and bigrams, sublinear counts, L2 normalized."""
+
+    def __init__(self, dimensions: int = 512):
+        self.dimensions = dimensions
+        self.model = f"hashing-{dimensions}"
+
+    def _features(self, text: str) -> list:
+        words = re.findall(r"[a-z0-9]+", text.lower())
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def embed(self, texts: list) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+                vectors[row, digest % self.dimensions] += 1.0 if digest >> 63 else -1.0
+        vectors = np.sign(vectors) * np.log1p(np.abs(vectors))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+
+class SentenceTransformerEmbedder:
+    """A local sentence-transformers model (the package is optional)."""
+
+    def __init__(self, model: str):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError(f"WEB_EMBEDDING={model} needs the sentence-transformers package") from e
+        self.model = model
+        self._model = SentenceTransformer(model)
+
+    def embed(self, texts: list) -> np.ndarray:
+        return np.asarray(self._model.encode(texts, normalize_embeddings=True), dtype=np.float32)
+
+
+def make_embedder(spec: str = WEB_EMBEDDING):
+    if spec.startswith("hashing"):
+        _, _, dimensions = spec.partition("-")
+        return HashingEmbedder(int(dimensions) if dimensions else 512)
+    return SentenceTransformerEmbedder(spec)
+
+
+class Page:
+    """Extracted text of a fetched page; cached is False when it was downloaded for this call."""
+
+    def __init__(self, url: str, text: str, digest: str, cached: bool):
+        self.url = url
+        self.text = text
+        self.digest = digest
+        self.cached = cached
+
+
+class WebCache:
+    """SQLite-backed page and embedding cache with LRU bounds on every table."""
+
+    def __init__(self, path: str = WEB_CACHE_PATH, ttl: float = WEB_PAGE_TTL, max_pages: int = WEB_CACHE_MAX_PAGES,
+                 max_chunks: int = WEB_CACHE_MAX_CHUNKS, embedder=None):
+        self.path = path
+        self.ttl = ttl
+        self.max_pages = max_pages
+        self.max_chunks = max_chunks
+        self._embedder = embedder
+        self._lock = threading.Lock()
+        self._session = requests.Session()
+        self._session.headers["User-Agent"] = _USER_AGENT
+        self.stats = {"page_hits": 0, "page_revalidated": 0, "page_downloads": 0,
+                      "chunk_hits": 0, "chunks_embedded": 0}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                digest TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS texts (
+                digest TEXT PRIMARY KEY,
+                text TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS embeddings (
+                digest TEXT NOT NULL,
+                model TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (digest, model)
+            );
+            CREATE INDEX IF NOT EXISTS idx_pages_last_access ON pages(last_access);
+            CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings(last_access);
+            """
+        )
+        self._conn.commit()
+
+    @property
+    def embedder(self):
+        if self._embedder is None:
+            self._embedder = make_embedder()
+        return self._embedder
+
+    def _cached_page(self, url: str):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT p.digest, p.etag, p.last_modified, p.fetched_at, t.text FROM pages p "
+                "JOIN texts t ON t.digest = p.digest WHERE p.url = ?", (url,)
+            ).fetchone()
+
+    def _store_page(self, url: str, text: str, digest: str, etag: str, last_modified: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("INSERT OR IGNORE INTO texts (digest, text) VALUES (?, ?)", (digest, text))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (url, digest, etag, last_modified, fetched_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, digest, etag, last_modified, now, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _touch_page(self, url: str, revalidated: bool):
+        now = time.time()
+        column = "fetched_at = ?, last_access = ?" if revalidated else "last_access = ?"
+        with self._lock:
+            self._conn.execute(f"UPDATE pages SET {column} WHERE url = ?",
+                               (now, now, url) if revalidated else (now, url))
+            self._conn.commit()
+
+    def fetch(self, url: str) -> Page:
+        """Return the text of url, from the cache when it is fresh or unchanged on the server."""
+        with span("web.fetch", url=url) as current:
+            row = self._cached_page(url)
+            if row is not None and time.time() - row[3] < self.ttl:
+                self._touch_page(url, revalidated=False)
+                self.stats["page_hits"] += 1
+                current.set(cached=True)
+                return Page(url, row[4], row[0], cached=True)
+
+            headers = {}
+            if row is not None:
+                if row[1]:
+                    headers["If-None-Match"] = row[1]
+                if row[2]:
+                    headers["If-Modified-Since"] = row[2]
+            with self._session.get(url, headers=headers, timeout=WEB_FETCH_TIMEOUT, stream=True) as response:
+                if response.status_code == 304 and row is not None:
+                    self._touch_page(url, revalidated=True)
+                    self.stats["page_revalidated"] += 1
+                    current.set(cached=True, revalidated=True)
+                    return Page(url, row[4], row[0], cached=True)
+                response.raise_for_status()
+                content_type = response.headers.get("Content-Type", "text/html")
+                if not content_type.startswith(("text/", "application/xhtml")):
+                    raise ValueError(f"Unsupported content type {content_type} at {url}")
+                body = bytearray()
+                for block in response.iter_content(64 * 1024):
+                    body.extend(block)
+                    if len(body) >= WEB_MAX_PAGE_BYTES:
+                        break
+                raw = bytes(body[:WEB_MAX_PAGE_BYTES]).decode(response.encoding or "utf-8", errors="replace")
+                etag, last_modified = response.headers.get("ETag"), response.headers.get("Last-Modified")
+
+            text = extract_text(raw) if "html" in content_type else raw.strip()
+            digest = content_hash(text)
+            self._store_page(url, text, digest, etag, last_modified)
+            self.stats["page_downloads"] += 1
+            current.set(cached=False, bytes=len(body), changed=row is None or row[0] != digest)
+            return Page(url, text, digest, cached=False)
+
+    def embed(self, chunks: list) -> np.ndarray:
+        """Embedding matrix for chunks; only chunks without a stored vector for this model are embedded."""
+        model = self.embedder.model
+        digests = [content_hash(chunk) for chunk in chunks]
+        with span("web.embed", model=model, chunks=len(chunks)) as current:
+            vectors = {}
+            with self._lock:
+                for start in range(0, len(digests), 500):
+                    batch = digests[start:start + 500]
+                    rows = self._conn.execute(
+                        f"SELECT digest, vector FROM embeddings WHERE model = ? AND digest IN "
+                        f"({','.join('?' * len(batch))})", (model, *batch)
+                    ).fetchall()
+                    vectors.update((d, np.frombuffer(v, dtype=np.float32)) for d, v in rows)
+                if vectors:
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_access = ? WHERE digest = ? AND model = ?",
+                        [(time.time(), d, model) for d in vectors],
+                    )
+                    self._conn.commit()
+
+            missing = {d: chunk for d, chunk in zip(digests, chunks) if d not in vectors}
+            if missing:
+                fresh = self.embedder.embed(list(missing.values()))
+                now = time.time()
+                with self._lock:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO embeddings (digest, model, vector, last_access) VALUES (?, ?, ?, ?)",
+                        [(d, model, v.astype(np.float32).tobytes(), now) for d, v in zip(missing, fresh)],
+                    )
+                    self._evict()
+                    self._conn.commit()
+                vectors.update(zip(missing, fresh))
+
+            self.stats["chunk_hits"] += len(chunks) - len(missing)
+            self.stats["chunks_embedded"] += len(missing)
+            current.set(embedded=len(missing))
+        if not chunks:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.vstack([vectors[d] for d in digests])
+
+    def search(self, url: str, query: str, top_k: int = 3) -> list:
+        """Return the top_k (score, chunk) pairs of the page at url for query, best first."""
+        chunks = chunk_text(self.fetch(url).text)
+        if not chunks:
+            return []
+        matrix = self.embed(chunks)
+        scores = matrix @ self.embedder.embed([query])[0]
+        best = np.argsort(-scores)[:top_k]
+        return [(float(scores[i]), chunks[i]) for i in best]
+
+    def clear(self):
+        with self._lock:
+            self._conn.executescript("DELETE FROM pages; DELETE FROM texts; DELETE FROM embeddings;")
+            self._conn.commit()
+
+    def _evict(self):
+        # Least recently used pages and vectors over the limits go first, then orphaned texts
+        for table, limit in (("pages", self.max_pages), ("embeddings", self.max_chunks)):
+            overflow = self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] - limit
+            if overflow > 0:
+                self._conn.execute(
+                    f"DELETE FROM {table} WHERE rowid IN "
+                    f"(SELECT rowid FROM {table} ORDER BY last_access ASC LIMIT ?)", (overflow,)
+                )
+        self._conn.execute("DELETE FROM texts WHERE digest NOT IN (SELECT digest FROM pages)")
+
+
+_web_cache = None
+_web_cache_lock = threading.Lock()
+
+
+def get_web_cache() -> WebCache:
+    global _web_cache
+    with _web_cache_lock:
+        if _web_cache is None:
+            _web_cache = WebCache()
+        return _web_cache
@@ -0,0 +1,55 @@
+"""Web research tools for the agents, served through the local web cache.
+
+Drop-in replacements for crewai_tools' ScrapeWebsiteTool and
+WebsiteSearchTool: instead of downloading a page on every use and embedding
+it into a chroma store, pages and chunk embeddings come from web_cache.
+"""
+from typing import Type
+
+from crewai.tools import BaseTool
+from pydantic import BaseModel, Field
+
+from web_cache import get_web_cache
+
+# Characters of page text returned by the scrape tool
+SCRAPE_MAX_CHARS = 4000
+
+
+class ScrapeWebsiteInput(BaseModel):
+    website_url: str = Field(..., description="Full URL of the page to read")
+
+
+class WebsiteSearchInput(BaseModel):
+    website_url: str = Field(..., description="Full URL of the page to search")
+    search_query: str = Field(..., description="What to look for on the page")
+
+
+class CachedScrapeWebsiteTool(BaseTool):
+    name: str = "Read website content"
+    description: str = "Read the text content of a web page, given its full URL."
+    args_schema: Type[BaseModel] = ScrapeWebsiteInput
+
+    def _run(self, website_url: str) -> str:
+        try:
+            text = get_web_cache().fetch(website_url).text
+        except Exception as e:
+            return f"Error reading {website_url}: {e}"
+        if len(text) > SCRAPE_MAX_CHARS:
+            text = text[:SCRAPE_MAX_CHARS] + f"\n... ({len(text) - SCRAPE_MAX_CHARS} more characters)"
+        return text or f"No readable text at {website_url}"
+
+
+class CachedWebsiteSearchTool(BaseTool):
+    name: str = "Search in a specific website"
+    description: str = "Find the passages of a web page most relevant to a query, given the page URL and the query."
+    args_schema: Type[BaseModel] = WebsiteSearchInput
+    top_k: int = 3
+
+    def _run(self, website_url: str, search_query: str) -> str:
+        try:
+            results = get_web_cache().search(website_url, search_query, self.top_k)
+        except Exception as e:
+            return f"Error searching {website_url}: {e}"
+        if not results:
+            return f"No readable text at {website_url}"
+        return "\n\n".join(f"[{i + 1}] {chunk}" for i, (_, chunk) in enumerate(results))